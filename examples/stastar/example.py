@@ -2,6 +2,7 @@ import yaml
 import time
 from multi_agent_path_finding.common.environment import Environment
 from multi_agent_path_finding.common.point import Point2D, Point3D
+from multi_agent_path_finding.common.search_trace import SearchTrace
 from multi_agent_path_finding.stastar.stastar import SpaceTimeAstar
 
 if __name__ == "__main__":
@@ -10,6 +11,7 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--input", "-i", type=str, help="Input file path")
     parser.add_argument("--output", "-o", type=str, help="Output file path")
+    parser.add_argument("--trace", "-t", type=str, help="Search trace file path")
     args = parser.parse_args()
 
     with open(args.input, "r") as stream:
@@ -38,15 +40,19 @@ if __name__ == "__main__":
         dynamic_obstacles,
     )
 
+    trace = SearchTrace(input_data["space_limits"]) if args.trace else None
     planner = SpaceTimeAstar(
         Point(*input_data["start_point"]),
         Point(*input_data["goal_point"]),
         environment,
+        trace=trace,
     )
 
     start_time = time.time()
     result = planner.plan()
     print(f"Time elapsed: {time.time() - start_time}")
+    if trace is not None:
+        trace.save(args.trace)
     if result is None:
         print("No path found")
     else:
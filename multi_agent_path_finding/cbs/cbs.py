@@ -1,51 +1,114 @@
 import time
-from copy import deepcopy
-from itertools import combinations
-from typing import List, Tuple, Set
+from typing import Dict, List, Set, Tuple
 
+from multi_agent_path_finding.cbs.ct_heuristic import CT_HEURISTICS
 from multi_agent_path_finding.cbs.ct_node import CTNode
 from multi_agent_path_finding.common.conflict import (
     Conflict,
     VertexConflict,
     EdgeConflict,
+    ConflictGraph,
+    ConflictType,
+    find_conflicts,
+    find_first_conflict,
 )
 from multi_agent_path_finding.common.constraint import (
     Constraint,
+    ConstraintTable,
     VertexConstraint,
     EdgeConstraint,
+    PositiveConstraint,
+    PositiveEdgeConstraint,
+    PositiveVertexConstraint,
+    ZobristTable,
 )
 from multi_agent_path_finding.common.environment import Environment
+from multi_agent_path_finding.common.heuristic import TrueDistanceHeuristic
+from multi_agent_path_finding.common.mdd import MDD, MDDCache, classify_conflict
 from multi_agent_path_finding.common.point import Point
+from multi_agent_path_finding.common.priority_queue import PriorityQueue
+from multi_agent_path_finding.od_astar.od_astar import OperatorDecompositionAstar
 from multi_agent_path_finding.stastar.stastar import SpaceTimeAstar
 
 
 class ConflictBasedSearch:
     def __init__(
-        self, start_points: List[Point], goal_points: List[Point], env: Environment
+        self,
+        start_points: List[Point],
+        goal_points: List[Point],
+        env: Environment,
+        heuristic: TrueDistanceHeuristic = None,
+        planner_class: type = SpaceTimeAstar,
+        prioritize_conflicts: bool = False,
+        mdd_cache_size: int = 1_000_000,
+        ct_heuristic: str = None,
+        bypass: bool = False,
+        disjoint_splitting: bool = False,
+        merge_bound: int = None,
     ):
         # check if the length of start_points and goal_points are the same
         if len(start_points) != len(goal_points):
             raise ValueError(
                 f"Length of start_points and goal_points are not the same: {len(start_points)} != {len(goal_points)}"
             )
+        # a goal in another connected component would be searched for without end
+        for agent_id, (start_point, goal_point) in enumerate(zip(start_points, goal_points)):
+            if not env.is_reachable(start_point, goal_point):
+                raise ValueError(
+                    f"Goal point of agent {agent_id} is not reachable from its start: {start_point} -> {goal_point}"
+                )
 
         self.start_points = start_points
         self.goal_points = goal_points
         self.robot_num = len(start_points)
         self.env = env
+        # optional true-distance heuristic shared by all individual planners
+        self.heuristic = heuristic
+        # individual planner with the SpaceTimeAstar contract, e.g. SafeIntervalPathPlanning
+        self.planner_class = planner_class
 
-        self.open_set: Set[CTNode] = set()
+        # ties on the cost are broken towards fewer conflicts, then by insertion order,
+        # the cost is raised by the CT heuristic if any
+        self.open_set = PriorityQueue(
+            key=lambda node: (node.cost + node.h_score, node.num_of_conflicts)
+        )
+        # fingerprints of the constraint sets of the generated CT nodes
+        self.zobrist_table = ZobristTable()
+        self.fingerprints: Set[int] = set()
+        # number of CT nodes generated by the last plan
+        self.ct_size = 0
+        # split on cardinal, then semi-cardinal conflicts first, classified by
+        # the MDDs of the agents, cached up to mdd_cache_size MDD nodes
+        self.prioritize_conflicts = prioritize_conflicts
+        self.mdd_cache = MDDCache(mdd_cache_size)
+        # "cg", "dg" or "wdg" to order the CT nodes by cost plus an admissible
+        # estimate of the cost still to be added, see ct_heuristic.py
+        if ct_heuristic is not None and ct_heuristic not in CT_HEURISTICS:
+            raise ValueError(f"Unknown CT heuristic: {ct_heuristic}")
+        self.ct_heuristic = CT_HEURISTICS[ct_heuristic](self) if ct_heuristic else None
+        # adopt a child path of the same cost with fewer conflicts instead of splitting
+        self.bypass = bypass
+        # split a conflict into a negative and a positive constraint of one of
+        # its agents, so the solutions of the children are disjoint
+        self.disjoint_splitting = disjoint_splitting
+        # merge two meta-agents into one, planned jointly by
+        # OperatorDecompositionAstar, once the conflicts between their members
+        # have split CT nodes more than merge_bound times; None never merges
+        self.merge_bound = merge_bound
+        self.conflict_counts: Dict[Tuple[int, int], int] = {}
+        self.meta_agent_planners: Dict[Tuple[int, ...], OperatorDecompositionAstar] = {}
         self.individual_planners = [
-            SpaceTimeAstar(start_point, goal_point, env)
+            planner_class(
+                start_point,
+                goal_point,
+                env,
+                distance_map=heuristic.get_distance_map(goal_point) if heuristic else None,
+            )
             for start_point, goal_point in zip(start_points, goal_points)
         ]
 
     def plan(self):
-        root_node = CTNode(
-            constraints={},
-            solution=[],
-            cost=0,
-        )
+        root_node = CTNode(solution=[])
         for agent_id, individual_planner in enumerate(self.individual_planners):
             path = individual_planner.plan()
             if not path:
@@ -54,84 +117,131 @@ class ConflictBasedSearch:
             root_node.solution.append(path)
 
         root_node.cost = self.calculate_cost(root_node.solution)
+        self.update_conflict_graph(root_node)
+        if self.ct_heuristic is not None:
+            root_node.h_score = self.ct_heuristic.compute(root_node)
+        self.fingerprints = {root_node.fingerprint}
+        self.conflict_counts = {}
 
         # put root node into the priority queue
 
-        self.open_set.add(root_node)
-        ct_size = 0
+        self.open_set.push(root_node)
+        self.ct_size = 0
         planning_avg_time = 0
         generate_avg_time = 0
         copy_avg_time = 0
 
         while self.open_set:
             # pop the node with the lowest cost
-            cur_node = min(self.open_set)
-            self.open_set.remove(cur_node)
+            cur_node = self.open_set.pop()
             print(f"Current cost: {cur_node.cost}")
-            print(f"CT size: {ct_size}")
+            print(f"CT size: {self.ct_size}")
 
-            # find the first conflict
-            conflict = self.find_first_conflict(cur_node.solution)
+            # find the conflict to split on
+            conflict = self.select_conflict(cur_node)
 
             # if there is no conflict, return the solution
             if not conflict:
                 return cur_node.solution
 
+            if self.merge_bound is not None and self.should_merge(cur_node, conflict):
+                # the node goes back to the open list with the agents of the
+                # conflict planned jointly, or is dropped if they cannot be
+                if self.merge(cur_node, conflict):
+                    if self.ct_heuristic is not None:
+                        cur_node.h_score = self.ct_heuristic.compute(cur_node)
+                    self.open_set.push(cur_node)
+                continue
+
             generate_start_time = time.time()
             # if there is a conflict, generate two new nodes
-            for agent_id in conflict.agent_ids:
-                # if the agent has already passed the conflict time, ignore it
-                if (
-                    type(conflict) == VertexConflict
-                    and len(cur_node.solution[agent_id]) <= conflict.time
-                ) or (
-                    type(conflict) == EdgeConflict
-                    and len(cur_node.solution[agent_id]) <= conflict.times[1]
-                ):
+            new_nodes = []
+            is_bypassed = False
+            for new_constraint in self.generate_constraints(conflict):
+                plan_start_time = time.time()
+                # skip a branch whose constraint set another branch already reached
+                fingerprint = cur_node.fingerprint ^ self.zobrist_table.get_key(new_constraint)
+                if fingerprint in self.fingerprints:
                     continue
+                self.fingerprints.add(fingerprint)
+
                 # generate child node from the current node
                 copy_start_time = time.time()
-                new_node = deepcopy(cur_node)
-                copy_avg_time += time.time() - copy_start_time
-                # print(f"Deepcopy time: {time.time() - deepcopy_start_time}")
-
-                plan_start_time = time.time()
-                # generate constraint from the conflict
-                new_constraint = self.generate_constraint_from_conflict(
-                    agent_id, conflict
+                agent_id = new_constraint.agent_id
+                new_node = cur_node.create_child(
+                    new_constraint, cur_node.solution[agent_id], fingerprint
                 )
-
-                # add the constraint to the child node
-                new_node.constraints.setdefault(agent_id, []).append(new_constraint)
-                new_node.solution[agent_id] = self.individual_planners[agent_id].plan(
-                    constraints=new_node.constraints[agent_id]
-                )
-                # print(f"Plan time: {time.time() - plan_start_time}")
-                if not new_node.solution[agent_id]:
+                copy_avg_time += time.time() - copy_start_time
+                # replan the agents under the constraints of the child node
+                if not self.replan(new_node):
                     continue
-                new_node.cost = self.calculate_cost(new_node.solution)
-                self.open_set.add(new_node)
-                ct_size += 1
                 planning_avg_time += time.time() - plan_start_time
+                if self.bypass and self.is_bypass(cur_node, new_node):
+                    is_bypassed = True
+                    break
+                new_nodes.append(new_node)
+
+            if is_bypassed:
+                # the current node takes the better path and goes back to the
+                # open list, the tree does not grow
+                cur_node.solution = new_node.solution
+                cur_node.conflict_graph = new_node.conflict_graph
+                cur_node.num_of_conflicts = new_node.num_of_conflicts
+                if self.ct_heuristic is not None:
+                    cur_node.h_score = self.ct_heuristic.compute(cur_node)
+                self.open_set.push(cur_node)
+                # the discarded children may still be generated from the current node
+                self.fingerprints.difference_update(node.fingerprint for node in new_nodes)
+                self.fingerprints.discard(new_node.fingerprint)
+                continue
+
+            for new_node in new_nodes:
+                if self.ct_heuristic is not None:
+                    new_node.h_score = self.ct_heuristic.compute(new_node)
+                self.open_set.push(new_node)
+                self.ct_size += 1
             generate_avg_time += time.time() - generate_start_time
 
-            print(f"Planning time: {planning_avg_time / ct_size}")
-            print(f"Copy time: {copy_avg_time / ct_size}")
-            print(f"Generate time: {generate_avg_time / ct_size}")
+            print(f"Planning time: {planning_avg_time / self.ct_size}")
+            print(f"Copy time: {copy_avg_time / self.ct_size}")
+            print(f"Generate time: {generate_avg_time / self.ct_size}")
         return None
 
+    @staticmethod
+    def is_bypass(node: CTNode, new_node: CTNode) -> bool:
+        # the child path resolves conflicts of the node without raising its cost,
+        # and it satisfies the constraints of the node as well
+        return new_node.cost == node.cost and new_node.num_of_conflicts < node.num_of_conflicts
+
+    def generate_constraints(self, conflict: Conflict) -> List[Constraint]:
+        # one constraint per child node
+        if not self.disjoint_splitting:
+            return [
+                self.generate_constraint_from_conflict(agent_id, conflict)
+                for agent_id in conflict.agent_ids
+            ]
+        # the first agent avoids the conflict in one child and takes part in it
+        # in the other, where the other agents avoid it
+        agent_id = conflict.agent_ids[0]
+        return [
+            self.generate_constraint_from_conflict(agent_id, conflict),
+            self.generate_constraint_from_conflict(agent_id, conflict, positive=True),
+        ]
+
     @staticmethod
     def generate_constraint_from_conflict(
-        agent_id: int, conflict: Conflict
+        agent_id: int, conflict: Conflict, positive: bool = False
     ) -> Constraint:
         if isinstance(conflict, VertexConflict):
-            return VertexConstraint(
+            constraint_class = PositiveVertexConstraint if positive else VertexConstraint
+            return constraint_class(
                 agent_id=agent_id,
                 point=conflict.point,
                 time=conflict.time,
             )
         elif isinstance(conflict, EdgeConflict):
-            return EdgeConstraint(
+            constraint_class = PositiveEdgeConstraint if positive else EdgeConstraint
+            return constraint_class(
                 agent_id=agent_id,
                 points=conflict.points[agent_id],
                 times=conflict.times,
@@ -139,12 +249,97 @@ class ConflictBasedSearch:
         else:
             raise ValueError(f"Unknown conflict type: {type(conflict)}")
 
-    @staticmethod
-    def get_state(agent_id: int, time: int, solution: List[List[Tuple[Point, int]]]):
-        if time >= len(solution[agent_id]):
-            return solution[agent_id][-1][0]
+    def should_merge(self, node: CTNode, conflict: Conflict) -> bool:
+        # count the conflict, and merge once the members of the two meta-agents
+        # have conflicted more than merge_bound times over the whole search
+        pair = (min(conflict.agent_ids), max(conflict.agent_ids))
+        self.conflict_counts[pair] = self.conflict_counts.get(pair, 0) + 1
+        num_of_conflicts = sum(
+            self.conflict_counts.get((min(agent_id, other_id), max(agent_id, other_id)), 0)
+            for agent_id in node.get_meta_agent(pair[0])
+            for other_id in node.get_meta_agent(pair[1])
+        )
+        return num_of_conflicts > self.merge_bound
+
+    def merge(self, node: CTNode, conflict: Conflict) -> bool:
+        # merge the meta-agents of the conflict in the node and plan them
+        # jointly under all the constraints of their members, so the node
+        # still stands for the same constraints; False if there is no plan
+        meta_agent = tuple(
+            sorted(sum((node.get_meta_agent(agent_id) for agent_id in conflict.agent_ids), ()))
+        )
+        meta_agents = (
+            node.meta_agents.copy()
+            if node.meta_agents
+            else [(agent_id,) for agent_id in range(self.robot_num)]
+        )
+        for agent_id in meta_agent:
+            meta_agents[agent_id] = meta_agent
+        node.meta_agents = meta_agents
+        if not self.replan_meta_agent(node, meta_agent):
+            return False
+        # conflicts within a meta-agent are ruled out by its joint plan
+        for agent_id in meta_agent:
+            node.conflict_graph = node.conflict_graph.replace_path(
+                agent_id, node.solution[agent_id], self.env.point_to_cell
+            )
+        node.num_of_conflicts = node.conflict_graph.num_of_conflicts
+        return True
+
+    def replan(self, node: CTNode) -> bool:
+        # replan the agents whose paths break the constraint added to the node,
+        # with their meta-agents, False if one of them has no path left
+        constraint = node.constraint
+        if isinstance(constraint, PositiveConstraint):
+            # the constrained agent already takes part in the conflict
+            agent_ids = [
+                agent_id
+                for agent_id, path in enumerate(node.solution)
+                if agent_id != constraint.agent_id and constraint.is_violated_by(path)
+            ]
         else:
-            return solution[agent_id][time][0]
+            agent_ids = [constraint.agent_id]
+        replanned_agent_ids = []
+        for meta_agent in dict.fromkeys(node.get_meta_agent(agent_id) for agent_id in agent_ids):
+            if not self.replan_meta_agent(node, meta_agent):
+                return False
+            replanned_agent_ids.extend(meta_agent)
+        self.update_conflict_graph(node, replanned_agent_ids)
+        return True
+
+    def replan_meta_agent(self, node: CTNode, meta_agent: Tuple[int, ...]) -> bool:
+        # plan the members under their constraints in the node, jointly if
+        # there are several, False if there is no plan
+        if len(meta_agent) == 1:
+            path = self.individual_planners[meta_agent[0]].plan(
+                constraints=node.get_constraints(meta_agent[0])
+            )
+            paths = [path] if path else None
+        else:
+            paths = self.get_meta_agent_planner(meta_agent).plan(
+                [node.get_constraints(agent_id) for agent_id in meta_agent]
+            )
+        if not paths:
+            return False
+        for agent_id, path in zip(meta_agent, paths):
+            node.replace_path(agent_id, path)
+        return True
+
+    def get_meta_agent_planner(self, meta_agent: Tuple[int, ...]) -> OperatorDecompositionAstar:
+        planner = self.meta_agent_planners.get(meta_agent)
+        if planner is None:
+            goal_points = [self.goal_points[agent_id] for agent_id in meta_agent]
+            planner = self.meta_agent_planners[meta_agent] = OperatorDecompositionAstar(
+                [self.start_points[agent_id] for agent_id in meta_agent],
+                goal_points,
+                self.env,
+                distance_maps=(
+                    [self.heuristic.get_distance_map(goal_point) for goal_point in goal_points]
+                    if self.heuristic
+                    else None
+                ),
+            )
+        return planner
 
     def calculate_cost(self, solution: List[List[Tuple[Point, int]]]) -> int:
         cost = 0
@@ -152,35 +347,73 @@ class ConflictBasedSearch:
             cost += len(solution[i]) - 1
         return cost
 
-    def find_first_conflict(self, solution: List[List[Tuple[Point, int]]]) -> Conflict:
-        # Vertex Conflict
-        for agent1, agent2 in combinations(range(self.robot_num), 2):
-            max_time = max(len(solution[agent1]), len(solution[agent2]))
-            for time in range(max_time):
-                point1 = self.get_state(agent1, time, solution)
-                point2 = self.get_state(agent2, time, solution)
-                if point1 == point2:
-                    return VertexConflict(
-                        agent_ids=[agent1, agent2],
-                        point=point1,
-                        time=time,
-                    )
-
-        # Edge Conflict
-        for agent1, agent2 in combinations(range(self.robot_num), 2):
-            max_time = max(len(solution[agent1]), len(solution[agent2]))
-            for time in range(max_time - 1):
-                prev_point1 = self.get_state(agent1, time, solution)
-                next_point1 = self.get_state(agent1, time + 1, solution)
-                prev_point2 = self.get_state(agent2, time, solution)
-                next_point2 = self.get_state(agent2, time + 1, solution)
-
-                if prev_point1 == next_point2 and prev_point2 == next_point1:
-                    return EdgeConflict(
-                        agent_ids=[agent1, agent2],
-                        points={
-                            agent1: (prev_point1, next_point1),
-                            agent2: (prev_point2, next_point2),
-                        },
-                        times=(time, time + 1),
-                    )
+    def find_first_conflict(self, node: CTNode) -> Conflict | None:
+        # the earliest conflict lies between the agents of the earliest conflicting pair
+        pair = node.conflict_graph.get_first_pair()
+        if pair is None:
+            return None
+        return find_first_conflict(node.solution, self.env.point_to_cell, agent_ids=pair)
+
+    def select_conflict(self, node: CTNode) -> Conflict | None:
+        if not self.prioritize_conflicts:
+            return self.find_first_conflict(node)
+        if not node.conflict_graph.pairs:
+            return None
+        # the earliest cardinal conflict, else the earliest semi-cardinal one,
+        # else the earliest conflict
+        selected_conflict = None
+        selected_type = None
+        for conflict in find_conflicts(node.solution, encode=self.env.point_to_cell):
+            mdds = {agent_id: self.get_mdd(node, agent_id) for agent_id in conflict.agent_ids}
+            conflict_type = classify_conflict(conflict, mdds)
+            if conflict_type == ConflictType.CARDINAL:
+                return conflict
+            if selected_conflict is None or (
+                conflict_type == ConflictType.SEMI_CARDINAL
+                and selected_type == ConflictType.NON_CARDINAL
+            ):
+                selected_conflict = conflict
+                selected_type = conflict_type
+        return selected_conflict
+
+    def get_mdd_key(self, node: CTNode, agent_id: int) -> Tuple[int, int, int]:
+        # the agent, its cost and the fingerprint of its constraints in the node
+        constraints = node.get_constraints(agent_id)
+        cost = len(node.solution[agent_id]) - 1
+        return agent_id, cost, self.zobrist_table.get_fingerprint(constraints)
+
+    def get_mdd(self, node: CTNode, agent_id: int) -> MDD:
+        # MDD of the cost of the agent in the node under its constraints
+        key = self.get_mdd_key(node, agent_id)
+        mdd = self.mdd_cache.get(key)
+        if mdd is None:
+            constraints = node.get_constraints(agent_id)
+            cost = key[1]
+            goal_point = self.goal_points[agent_id]
+            distance_map = self.heuristic.get_distance_map(goal_point) if self.heuristic else None
+            mdd = MDD.build(
+                self.env,
+                self.env.point_to_cell(self.start_points[agent_id]),
+                self.env.point_to_cell(goal_point),
+                cost,
+                ConstraintTable.from_constraints(constraints, self.env.point_to_cell),
+                distance_map=distance_map,
+            )
+            self.mdd_cache.put(key, mdd)
+        return mdd
+
+    def update_conflict_graph(self, node: CTNode, agent_ids: List[int] = None) -> None:
+        # the root compares all paths, a child only the replanned ones, by
+        # default the path of the agent of its constraint
+        if node.parent is None:
+            node.conflict_graph = ConflictGraph.from_solution(node.solution, self.env.point_to_cell)
+        else:
+            if agent_ids is None:
+                agent_ids = [node.constraint.agent_id]
+            node.conflict_graph = node.parent.conflict_graph
+            for agent_id in agent_ids:
+                node.conflict_graph = node.conflict_graph.replace_path(
+                    agent_id, node.solution[agent_id], self.env.point_to_cell
+                )
+        # number of conflicts over all agent pairs and times
+        node.num_of_conflicts = node.conflict_graph.num_of_conflicts
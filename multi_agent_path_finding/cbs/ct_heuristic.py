@@ -0,0 +1,219 @@
+from typing import Container, Dict, Hashable, List, Tuple
+
+from multi_agent_path_finding.cbs.ct_node import CTNode
+from multi_agent_path_finding.common.conflict import (
+    ConflictType,
+    find_conflicts,
+    find_first_conflict,
+)
+from multi_agent_path_finding.common.mdd import classify_conflict, is_dependent
+from multi_agent_path_finding.common.priority_queue import PriorityQueue
+
+# components with more vertices are bounded by a greedy matching instead of
+# being solved exactly, as the branch and bound is exponential in their size
+MAX_EXACT_COMPONENT_SIZE = 12
+
+
+def min_vertex_cover(edge_weights: Dict[Tuple[int, int], int]) -> int:
+    """Smallest sum of vertex values x with x_a + x_b >= w for every edge (a, b, w).
+
+    With unit weights this is the size of a minimum vertex cover. Every
+    connected component of at most ``MAX_EXACT_COMPONENT_SIZE`` vertices is
+    solved exactly by branch and bound, assigning the vertices in decreasing
+    degree order and bounding the remaining edges by a greedy matching. A
+    larger component only adds the weight of such a matching, which is still
+    admissible but may be below the exact value.
+    """
+    neighbors: Dict[int, Dict[int, int]] = {}
+    for (vertex, other_vertex), weight in edge_weights.items():
+        if weight <= 0:
+            continue
+        neighbors.setdefault(vertex, {})[other_vertex] = weight
+        neighbors.setdefault(other_vertex, {})[vertex] = weight
+
+    cover = 0
+    visited = set()
+    for root in neighbors:
+        if root in visited:
+            continue
+        component = [root]
+        visited.add(root)
+        for vertex in component:
+            for neighbor in neighbors[vertex]:
+                if neighbor not in visited:
+                    visited.add(neighbor)
+                    component.append(neighbor)
+        component.sort(key=lambda vertex: -len(neighbors[vertex]))
+        if len(component) > MAX_EXACT_COMPONENT_SIZE:
+            cover += get_matching_weight(component, neighbors, set())
+        else:
+            cover += solve_component(component, neighbors)
+    return cover
+
+
+def get_matching_weight(
+    vertices: List[int], neighbors: Dict[int, Dict[int, int]], excluded: Container[int]
+) -> int:
+    # disjoint edges between the vertices need their weights each, so the
+    # weight of a greedy matching is a lower bound of the cover
+    matched = set()
+    weight_sum = 0
+    for vertex in vertices:
+        if vertex in matched:
+            continue
+        for neighbor, weight in neighbors[vertex].items():
+            if neighbor not in excluded and neighbor not in matched and neighbor != vertex:
+                matched.update((vertex, neighbor))
+                weight_sum += weight
+                break
+    return weight_sum
+
+
+def solve_component(component: List[int], neighbors: Dict[int, Dict[int, int]]) -> int:
+    values: Dict[int, int] = {}
+    # the greedy bound of the remaining edges never exceeds the sum of all weights
+    best = sum(max(neighbors[vertex].values()) for vertex in component)
+
+    def branch(index: int, total: int) -> None:
+        nonlocal best
+        # the edges between the unassigned vertices are bounded by a matching
+        if total + get_matching_weight(component[index:], neighbors, values) >= best:
+            return
+        if index == len(component):
+            best = total
+            return
+        vertex = component[index]
+        # the value must cover the edges to the assigned vertices, higher
+        # values only help the unassigned ones
+        min_value = max(
+            [
+                weight - values[neighbor]
+                for neighbor, weight in neighbors[vertex].items()
+                if neighbor in values
+            ]
+            + [0]
+        )
+        has_unassigned_neighbor = any(neighbor not in values for neighbor in neighbors[vertex])
+        max_value = max(neighbors[vertex].values()) if has_unassigned_neighbor else min_value
+        for value in range(min_value, max(min_value, max_value) + 1):
+            values[vertex] = value
+            branch(index + 1, total + value)
+            del values[vertex]
+
+    branch(0, 0)
+    return best
+
+
+class ConflictGraphHeuristic:
+    """CG heuristic of CBSH: a minimum vertex cover of the cardinal conflicts.
+
+    Two agents with a cardinal conflict cannot both keep their cost, so one of
+    every such pair pays at least one more step and the size of a minimum
+    vertex cover of these pairs is an admissible estimate of the cost still to
+    be added to a CT node. The weight of a pair only depends on the costs and
+    the constraints of its agents, so it is cached across CT nodes under the
+    MDD keys of the two agents. A member of a meta-agent may give up cost for
+    its mates, so only the pairs of agents on their own are counted.
+    """
+
+    def __init__(self, solver):
+        self.solver = solver
+        self.edge_weights: Dict[Hashable, int] = {}
+
+    def compute(self, node: CTNode) -> int:
+        edge_weights = {}
+        for pair in node.conflict_graph.pairs:
+            if any(len(node.get_meta_agent(agent_id)) > 1 for agent_id in pair):
+                continue
+            key = tuple(self.solver.get_mdd_key(node, agent_id) for agent_id in pair)
+            weight = self.edge_weights.get(key)
+            if weight is None:
+                weight = self.edge_weights[key] = self.get_edge_weight(node, pair)
+            edge_weights[pair] = weight
+        return min_vertex_cover(edge_weights)
+
+    def get_edge_weight(self, node: CTNode, pair: Tuple[int, int]) -> int:
+        mdds = {agent_id: self.solver.get_mdd(node, agent_id) for agent_id in pair}
+        for conflict in find_conflicts(
+            node.solution, encode=self.solver.env.point_to_cell, agent_ids=pair
+        ):
+            if classify_conflict(conflict, mdds) == ConflictType.CARDINAL:
+                return 1
+        return 0
+
+
+class DependencyGraphHeuristic(ConflictGraphHeuristic):
+    """DG heuristic: a minimum vertex cover of the dependent agent pairs.
+
+    Two agents are dependent when no two of their paths at their current costs
+    are free of conflicts with each other, which their joint MDD tells; every
+    pair with a cardinal conflict is dependent, so the estimate is at least
+    the CG one and still admissible.
+    """
+
+    def get_edge_weight(self, node: CTNode, pair: Tuple[int, int]) -> int:
+        mdds = [self.solver.get_mdd(node, agent_id) for agent_id in pair]
+        return int(is_dependent(*mdds))
+
+
+class WeightedDependencyGraphHeuristic(DependencyGraphHeuristic):
+    """WDG heuristic: a minimum weighted vertex cover of the dependent pairs.
+
+    The weight of a dependent pair is how much the optimal sum of costs of the
+    two agents alone, under their constraints, exceeds their current costs,
+    found by a CBS on the pair. The search stops after ``max_ct_size`` nodes,
+    and its lowest open cost is then a lower bound of the weight.
+    """
+
+    def __init__(self, solver, max_ct_size: int = 100):
+        super().__init__(solver)
+        self.max_ct_size = max_ct_size
+
+    def get_edge_weight(self, node: CTNode, pair: Tuple[int, int]) -> int:
+        if not super().get_edge_weight(node, pair):
+            return 0
+        return max(1, self.get_cost_increase(node, pair))
+
+    def get_cost_increase(self, node: CTNode, pair: Tuple[int, int]) -> int:
+        # the sub-tree only holds the constraints added on top of the node
+        solver = self.solver
+        root_node = CTNode(
+            solution=node.solution,
+            cost=sum(len(node.solution[agent_id]) - 1 for agent_id in pair),
+        )
+        open_set = PriorityQueue(key=lambda sub_node: (sub_node.cost,))
+        open_set.push(root_node)
+        fingerprints = {root_node.fingerprint}
+        lower_bound = root_node.cost
+        ct_size = 0
+        while open_set and ct_size < self.max_ct_size:
+            cur_node = open_set.pop()
+            lower_bound = cur_node.cost
+            conflict = find_first_conflict(
+                cur_node.solution, solver.env.point_to_cell, agent_ids=pair
+            )
+            if conflict is None:
+                break
+            for agent_id in conflict.agent_ids:
+                new_constraint = solver.generate_constraint_from_conflict(agent_id, conflict)
+                fingerprint = cur_node.fingerprint ^ solver.zobrist_table.get_key(new_constraint)
+                if fingerprint in fingerprints:
+                    continue
+                fingerprints.add(fingerprint)
+                path = solver.individual_planners[agent_id].plan(
+                    constraints=node.get_constraints(agent_id)
+                    + cur_node.get_constraints(agent_id)
+                    + [new_constraint]
+                )
+                if not path:
+                    continue
+                open_set.push(cur_node.create_child(new_constraint, path, fingerprint))
+                ct_size += 1
+        return lower_bound - root_node.cost
+
+
+CT_HEURISTICS = {
+    "cg": ConflictGraphHeuristic,
+    "dg": DependencyGraphHeuristic,
+    "wdg": WeightedDependencyGraphHeuristic,
+}
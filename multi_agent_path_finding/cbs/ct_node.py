@@ -1,18 +1,77 @@
 from dataclasses import dataclass
-from typing import List, Tuple, Dict
+from typing import List, Tuple
 
 from multi_agent_path_finding.common.point import Point
-from multi_agent_path_finding.common.constraint import Constraint
+from multi_agent_path_finding.common.conflict import ConflictGraph
+from multi_agent_path_finding.common.constraint import Constraint, PositiveConstraint
 
 
-@dataclass
+# compared and hashed by the fingerprint of its constraint set, the open list
+# orders the nodes by key
+@dataclass(eq=False)
 class CTNode:
-    constraints: Dict[int, List[Constraint]]
+    # path references of all agents, shared with the parent except the replanned one
     solution: List[List[Tuple[Point, int]]]
     cost: int = 0
+    # number of conflicts in the solution, over all agent pairs and times, breaks
+    # ties on the cost
+    num_of_conflicts: int = 0
+    # admissible estimate of the cost still to be added, see ct_heuristic.py
+    h_score: int = 0
+    # conflicting agent pairs of the solution with their numbers of conflicts,
+    # see ConflictGraph
+    conflict_graph: ConflictGraph = None
+    # Zobrist fingerprint of the constraints of the node, see ZobristTable
+    fingerprint: int = 0
+    # members of the meta-agent of every agent, planned jointly, shared with the
+    # parent; None while every agent is on its own
+    meta_agents: List[Tuple[int, ...]] = None
+    # the constraint added to the parent, None at the root; a positive one also
+    # constrains every other agent
+    constraint: Constraint = None
+    parent: "CTNode" = None
 
-    def __lt__(self, other):
-        return self.cost < other.cost
+    def __eq__(self, other):
+        return isinstance(other, CTNode) and self.fingerprint == other.fingerprint
 
     def __hash__(self):
-        return hash(str(self.solution))
+        return self.fingerprint
+
+    def get_meta_agent(self, agent_id: int) -> Tuple[int, ...]:
+        return self.meta_agents[agent_id] if self.meta_agents else (agent_id,)
+
+    def get_constraints(self, agent_id: int) -> List[Constraint]:
+        # constraints of the agent along the chain from the root to this node,
+        # with the ones implied by the positive constraints of other agents
+        constraints = []
+        node = self
+        while node is not None:
+            constraint = node.constraint
+            if constraint is not None:
+                if constraint.agent_id == agent_id:
+                    constraints.append(constraint)
+                elif isinstance(constraint, PositiveConstraint):
+                    constraints.extend(constraint.get_negative_constraints(agent_id)[::-1])
+            node = node.parent
+        return constraints[::-1]
+
+    def create_child(
+        self, constraint: Constraint, path: List[Tuple[Point, int]], fingerprint: int
+    ) -> "CTNode":
+        # only the replanned path is new
+        child = CTNode(
+            solution=self.solution.copy(),
+            cost=self.cost,
+            meta_agents=self.meta_agents,
+            fingerprint=fingerprint,
+            constraint=constraint,
+            parent=self,
+        )
+        child.replace_path(constraint.agent_id, path)
+        return child
+
+    def replace_path(self, agent_id: int, path: List[Tuple[Point, int]]) -> None:
+        # the solution list belongs to the node, the cost changes by the
+        # difference of the paths
+        self.cost += len(path) - len(self.solution[agent_id])
+        self.solution[agent_id] = path
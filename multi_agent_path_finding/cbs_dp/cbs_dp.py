@@ -1,49 +1,70 @@
 import time
-from copy import deepcopy, copy
-from itertools import combinations
-from typing import List, Tuple, Set
+from typing import List, Set, Tuple
 
 from multi_agent_path_finding.cbs_dp.ct_node import CTNode
 from multi_agent_path_finding.common.conflict import (
     Conflict,
     VertexConflict,
     EdgeConflict,
+    ConflictGraph,
+    find_first_conflict,
 )
 from multi_agent_path_finding.common.constraint import (
     Constraint,
     VertexConstraint,
     EdgeConstraint,
+    ZobristTable,
 )
 from multi_agent_path_finding.common.environment import Environment
+from multi_agent_path_finding.common.heuristic import TrueDistanceHeuristic
 from multi_agent_path_finding.common.point import Point
+from multi_agent_path_finding.common.priority_queue import PriorityQueue
 from multi_agent_path_finding.stastar_dp.stastar_dp import SpaceTimeAstarDP
 
 
 class ConflictBasedSearchDP:
-    def __init__(self, start_points: List[Point], goal_points: List[Point], env: Environment):
+    def __init__(
+        self,
+        start_points: List[Point],
+        goal_points: List[Point],
+        env: Environment,
+        heuristic: TrueDistanceHeuristic = None,
+    ):
         # check if the length of start_points and goal_points are the same
         if len(start_points) != len(goal_points):
             raise ValueError(
                 f"Length of start_points and goal_points are not the same: {len(start_points)} != {len(goal_points)}"
             )
+        # a goal in another connected component would be searched for without end
+        for agent_id, (start_point, goal_point) in enumerate(zip(start_points, goal_points)):
+            if not env.is_reachable(start_point, goal_point):
+                raise ValueError(
+                    f"Goal point of agent {agent_id} is not reachable from its start: {start_point} -> {goal_point}"
+                )
 
         self.start_points = start_points
         self.goal_points = goal_points
         self.robot_num = len(start_points)
         self.env = env
+        # optional true-distance heuristic shared by all individual planners
+        self.heuristic = heuristic
 
-        self.open_set: Set[CTNode] = set()
+        # ties on the cost are broken towards fewer conflicts, then by insertion order
+        self.open_set = PriorityQueue(key=lambda node: (node.cost, node.num_of_conflicts))
+        # fingerprints of the constraint sets of the generated CT nodes
+        self.zobrist_table = ZobristTable()
+        self.fingerprints: Set[int] = set()
 
     def plan(self):
-        root_node = CTNode(
-            constraints={},
-            solution=[],
-            cost=0,
-            individual_planners=[],
-        )
+        root_node = CTNode(solution=[], individual_planners=[])
 
         root_node.individual_planners = [
-            SpaceTimeAstarDP(start_point, goal_point, self.env)
+            SpaceTimeAstarDP(
+                start_point,
+                goal_point,
+                self.env,
+                distance_map=self.heuristic.get_distance_map(goal_point) if self.heuristic else None,
+            )
             for start_point, goal_point in zip(self.start_points, self.goal_points)
         ]
         for agent_id, individual_planner in enumerate(root_node.individual_planners):
@@ -54,9 +75,11 @@ class ConflictBasedSearchDP:
             root_node.solution.append(path)
 
         root_node.cost = self.calculate_cost(root_node.solution)
+        self.update_conflict_graph(root_node)
+        self.fingerprints = {root_node.fingerprint}
 
         # put root node into the priority queue
-        self.open_set.add(root_node)
+        self.open_set.push(root_node)
         ct_size = 0
         planning_avg_time = 0
         pruning_avg_time = 0
@@ -65,14 +88,13 @@ class ConflictBasedSearchDP:
 
         while self.open_set:
             # pop the node with the lowest cost
-            cur_node = min(self.open_set)
-            self.open_set.remove(cur_node)
+            cur_node = self.open_set.pop()
 
             print(f"Current cost: {cur_node.cost}")
             print(f"CT size: {ct_size}")
 
             # find the first conflict
-            conflict = self.find_first_conflict(cur_node.solution)
+            conflict = self.find_first_conflict(cur_node)
 
             # if there is no conflict, return the solution
             if not conflict:
@@ -81,63 +103,63 @@ class ConflictBasedSearchDP:
             generate_start_time = time.time()
             # if there is a conflict, generate two new nodes
             for agent_id in conflict.agent_ids:
-                # if the agent has already passed the conflict time, ignore it
-                if (
-                    type(conflict) == VertexConflict
-                    and len(cur_node.solution[agent_id]) <= conflict.time
-                ) or (
-                    type(conflict) == EdgeConflict
-                    and len(cur_node.solution[agent_id]) <= conflict.times[1]
-                ):
+                # generate constraint from the conflict
+                new_constraint = self.generate_constraint_from_conflict(agent_id, conflict)
+                # skip a branch whose constraint set another branch already reached
+                fingerprint = cur_node.fingerprint ^ self.zobrist_table.get_key(new_constraint)
+                if fingerprint in self.fingerprints:
                     continue
+                self.fingerprints.add(fingerprint)
+
                 # generate child node from the current node
                 copy_start_time = time.time()
-                new_node = cur_node.deepcopy(agent_id)
+                new_node = cur_node.create_child(new_constraint, fingerprint)
                 copy_avg_time += time.time() - copy_start_time
                 # print(f"Deepcopy time: {time.time() - deepcopy_start_time}")
 
                 pruning_start_time = time.time()
-                # generate constraint from the conflict
-                new_constraint = self.generate_constraint_from_conflict(agent_id, conflict)
 
                 # pruning node from the new constraint
                 pruning_node = None
                 if type(conflict) == VertexConflict:
-                    pruning_point = new_node.solution[agent_id][conflict.time][0]
-                    pruning_time = new_node.solution[agent_id][conflict.time][1]
-
+                    pruning_index = conflict.time
                 else:
-                    pruning_point = new_node.solution[agent_id][conflict.times[1]][0]
-                    pruning_time = new_node.solution[agent_id][conflict.times[1]][1]
-
-                for closed_node in new_node.individual_planners[agent_id].closed_set:
-                    if closed_node.point == pruning_point and closed_node.time == pruning_time:
-                        pruning_node = closed_node
-                        break
-
-                # add the constraint to the child node
-                new_node.constraints.setdefault(agent_id, []).append(new_constraint)
+                    pruning_index = conflict.times[1]
+
+                # an agent that already waits at its goal has no node to prune,
+                # the new constraint only makes it arrive later
+                if pruning_index < len(new_node.solution[agent_id]):
+                    pruning_point, pruning_time = new_node.solution[agent_id][pruning_index]
+                    pruning_cell = self.env.point_to_cell(pruning_point)
+                    for closed_node in new_node.individual_planners[agent_id].closed_set:
+                        if closed_node.cell == pruning_cell and closed_node.time == pruning_time:
+                            pruning_node = closed_node
+                            break
 
                 # pruning the node from the new constraint
-                self.prune_successor(
-                    pruning_node,
-                    new_node.individual_planners[agent_id].open_set,
-                    new_node.individual_planners[agent_id].closed_set,
-                )
-                pruning_node.parent.children.remove(pruning_node)
-                pruning_node.parent = None
+                if pruning_node is not None:
+                    self.prune_successor(
+                        pruning_node,
+                        new_node.individual_planners[agent_id].open_list,
+                        new_node.individual_planners[agent_id].closed_set,
+                        new_node.individual_planners[agent_id].deferred_set,
+                    )
+                    pruning_node.parent.children.remove(pruning_node)
+                    pruning_node.parent = None
                 pruning_avg_time += time.time() - pruning_start_time
                 # print(f"Pruning time: {time.time() - pruning_start_time}")
 
                 plan_start_time = time.time()
-                new_node.solution[agent_id] = new_node.individual_planners[agent_id].plan(
-                    constraints=new_node.constraints[agent_id]
+                path = new_node.individual_planners[agent_id].plan(
+                    constraints=new_node.get_constraints(agent_id)
                 )
                 # print(f"Plan time: {time.time() - plan_start_time}")
-                if not new_node.solution[agent_id]:
+                if not path:
                     continue
-                new_node.cost = self.calculate_cost(new_node.solution)
-                self.open_set.add(new_node)
+                new_node.solution[agent_id] = path
+                new_node.cost += len(path) - len(cur_node.solution[agent_id])
+                self.update_conflict_graph(new_node)
+                self.open_set.push(new_node)
                 ct_size += 1
                 planning_avg_time += time.time() - plan_start_time
             generate_avg_time += time.time() - generate_start_time
@@ -147,21 +169,18 @@ class ConflictBasedSearchDP:
             print(f"Generate avg time: {generate_avg_time / ct_size}")
         return None
 
-    def prune_successor(self, node, open_set, closed_set):
+    def prune_successor(self, node, open_list, closed_set, deferred_set):
         while node.children:
             child = node.children.pop(0)
             child.parent = None
-            self.prune_successor(child, open_set, closed_set)
+            self.prune_successor(child, open_list, closed_set, deferred_set)
 
-        if node in open_set:
-            open_set.remove(node)
-        else:
-            closed_set.remove(node)
-            # if not node.children:
-            #     open_set.add(node)
-            #     node.parent.children.append(node)
-            # else:
-            #     node.parent = None
+        if node in open_list:
+            open_list.remove(node)
+        elif node in deferred_set:
+            deferred_set.remove(node)
+        # the goal node of the last path is both open and closed
+        closed_set.discard(node)
 
     @staticmethod
     def generate_constraint_from_conflict(agent_id: int, conflict: Conflict) -> Constraint:
@@ -180,48 +199,27 @@ class ConflictBasedSearchDP:
         else:
             raise ValueError(f"Unknown conflict type: {type(conflict)}")
 
-    @staticmethod
-    def get_state(agent_id: int, time: int, solution: List[List[Tuple[Point, int]]]):
-        if time >= len(solution[agent_id]):
-            return solution[agent_id][-1][0]
-        else:
-            return solution[agent_id][time][0]
-
     def calculate_cost(self, solution: List[List[Tuple[Point, int]]]) -> int:
         cost = 0
         for i in range(self.robot_num):
             cost += len(solution[i]) - 1
         return cost
 
-    def find_first_conflict(self, solution: List[List[Tuple[Point, int]]]) -> Conflict:
-        # Vertex Conflict
-        for agent1, agent2 in combinations(range(self.robot_num), 2):
-            max_time = max(len(solution[agent1]), len(solution[agent2]))
-            for time in range(max_time):
-                point1 = self.get_state(agent1, time, solution)
-                point2 = self.get_state(agent2, time, solution)
-                if point1 == point2:
-                    return VertexConflict(
-                        agent_ids=[agent1, agent2],
-                        point=point1,
-                        time=time,
-                    )
-
-        # Edge Conflict
-        for agent1, agent2 in combinations(range(self.robot_num), 2):
-            max_time = max(len(solution[agent1]), len(solution[agent2]))
-            for time in range(max_time - 1):
-                prev_point1 = self.get_state(agent1, time, solution)
-                next_point1 = self.get_state(agent1, time + 1, solution)
-                prev_point2 = self.get_state(agent2, time, solution)
-                next_point2 = self.get_state(agent2, time + 1, solution)
-
-                if prev_point1 == next_point2 and prev_point2 == next_point1:
-                    return EdgeConflict(
-                        agent_ids=[agent1, agent2],
-                        points={
-                            agent1: (prev_point1, next_point1),
-                            agent2: (prev_point2, next_point2),
-                        },
-                        times=(time, time + 1),
-                    )
+    def find_first_conflict(self, node: CTNode) -> Conflict | None:
+        # the earliest conflict lies between the agents of the earliest conflicting pair
+        pair = node.conflict_graph.get_first_pair()
+        if pair is None:
+            return None
+        return find_first_conflict(node.solution, self.env.point_to_cell, agent_ids=pair)
+
+    def update_conflict_graph(self, node: CTNode) -> None:
+        # the root compares all paths, a child only the replanned one
+        if node.parent is None:
+            node.conflict_graph = ConflictGraph.from_solution(node.solution, self.env.point_to_cell)
+        else:
+            agent_id = node.constraint.agent_id
+            node.conflict_graph = node.parent.conflict_graph.replace_path(
+                agent_id, node.solution[agent_id], self.env.point_to_cell
+            )
+        # number of conflicts over all agent pairs and times
+        node.num_of_conflicts = node.conflict_graph.num_of_conflicts
@@ -1,37 +1,60 @@
 from dataclasses import dataclass
-from typing import List, Tuple, Dict
-from copy import deepcopy
+from typing import List, Tuple
 
 from multi_agent_path_finding.common.point import Point
+from multi_agent_path_finding.common.conflict import ConflictGraph
 from multi_agent_path_finding.common.constraint import Constraint
 from multi_agent_path_finding.stastar_dp.stastar_dp import SpaceTimeAstarDP
 from multi_agent_path_finding.stastar_dp.node import Node
 
 
-@dataclass
+# compared and hashed by the fingerprint of its constraint set, the open list
+# orders the nodes by key
+@dataclass(eq=False)
 class CTNode:
-    constraints: Dict[int, List[Constraint]]
+    # path references of all agents, shared with the parent except the replanned one
     solution: List[List[Tuple[Point, int]]]
     cost: int = 0
     individual_planners: List[SpaceTimeAstarDP] = None
+    # number of conflicts in the solution, over all agent pairs and times, breaks
+    # ties on the cost
+    num_of_conflicts: int = 0
+    # conflicting agent pairs of the solution with their numbers of conflicts,
+    # see ConflictGraph
+    conflict_graph: ConflictGraph = None
+    # Zobrist fingerprint of the constraints of the node, see ZobristTable
+    fingerprint: int = 0
+    # the constraint added to the parent, None at the root
+    constraint: Constraint = None
+    parent: "CTNode" = None
 
-    def __lt__(self, other):
-        return self.cost < other.cost
+    def __eq__(self, other):
+        return isinstance(other, CTNode) and self.fingerprint == other.fingerprint
 
     def __hash__(self):
-        return hash(str(self.solution) + str(self.cost))
+        return self.fingerprint
 
-    def __eq__(self, other):
-        if isinstance(other, CTNode):
-            return self.solution == other.solution and self.cost == other.cost
-        return False
+    def get_constraints(self, agent_id: int) -> List[Constraint]:
+        # constraints of the agent along the chain from the root to this node
+        constraints = []
+        node = self
+        while node is not None:
+            if node.constraint is not None and node.constraint.agent_id == agent_id:
+                constraints.append(node.constraint)
+            node = node.parent
+        return constraints[::-1]
 
-    def deepcopy(self, agent_id: int = None):
+    def create_child(self, constraint: Constraint, fingerprint: int) -> "CTNode":
+        # the search of the constrained agent is copied, everything else is
+        # shared until its path is replanned
         return CTNode(
-            constraints=self.constraints.copy(),
             solution=self.solution.copy(),
             cost=self.cost,
-            individual_planners=self.copy_planners(agent_id),
+            individual_planners=self.copy_planners(constraint.agent_id),
+            num_of_conflicts=self.num_of_conflicts,
+            fingerprint=fingerprint,
+            constraint=constraint,
+            parent=self,
         )
 
     def copy_planners(self, agent_id: int = None):
@@ -44,9 +67,22 @@ class CTNode:
             start_point=self.individual_planners[agent_id].start_point,
             goal_point=self.individual_planners[agent_id].goal_point,
             env=self.individual_planners[agent_id].env,
+            bucket_queue=self.individual_planners[agent_id].bucket_queue,
+            distance_map=self.individual_planners[agent_id].distance_map,
+            max_expansions=self.individual_planners[agent_id].max_expansions,
+            max_time_step=self.individual_planners[agent_id].max_time_step,
+            deadline=self.individual_planners[agent_id].deadline,
         )
 
-        new_individual_planner.open_set.remove(new_individual_planner.start_node)
+        # the start node is open in a fresh planner, it takes the sets of the
+        # copied one like every other node
+        new_individual_planner.open_list.remove(new_individual_planner.start_node)
+        self.copy_membership(
+            self.individual_planners[agent_id].start_node,
+            new_individual_planner.start_node,
+            new_individual_planner,
+            agent_id,
+        )
 
         self.post_order_copy(
             self.individual_planners[agent_id].start_node,
@@ -54,20 +90,24 @@ class CTNode:
             new_individual_planner,
             agent_id,
         )
-
-        new_individual_planner.closed_set.add(new_individual_planner.start_node)
         return new_individual_planner
 
     def post_order_copy(self, org_node, new_node, new_individual_planner, agent_id):
         for org_child in org_node.children:
-            new_child = Node(org_child.point, org_child.time)
+            new_child = Node(org_child.cell, org_child.time)
             new_child.parent = new_node
             new_node.children.append(new_child)
             new_child.g_score = org_child.g_score
             new_child.h_score = org_child.h_score
             new_child.f_score = org_child.f_score
-            if org_child in self.individual_planners[agent_id].open_set:
-                new_individual_planner.open_set.add(new_child)
-            if org_child in self.individual_planners[agent_id].closed_set:
-                new_individual_planner.closed_set.add(new_child)
+            self.copy_membership(org_child, new_child, new_individual_planner, agent_id)
             self.post_order_copy(org_child, new_child, new_individual_planner, agent_id)
+
+    def copy_membership(self, org_node, new_node, new_individual_planner, agent_id):
+        # the goal node of the last path is both open and closed
+        if org_node in self.individual_planners[agent_id].open_list:
+            new_individual_planner.open_list.push(new_node)
+        if org_node in self.individual_planners[agent_id].closed_set:
+            new_individual_planner.closed_set.add(new_node)
+        if org_node in self.individual_planners[agent_id].deferred_set:
+            new_individual_planner.deferred_set.add(new_node)
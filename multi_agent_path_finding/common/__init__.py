@@ -0,0 +1,4 @@
+from multi_agent_path_finding.common.environment import Environment
+from multi_agent_path_finding.common.point import Point, Point2D, Point3D
+
+__all__ = ["Environment", "Point", "Point2D", "Point3D"]
@@ -1,6 +1,8 @@
 from abc import ABC
 from dataclasses import dataclass
-from typing import List, Tuple, Dict
+from enum import Enum
+from typing import Callable, Dict, Hashable, Iterable, List, Tuple
+
 from multi_agent_path_finding.common.point import Point
 
 
@@ -24,3 +26,196 @@ class EdgeConflict(Conflict):
     #     agent_id: (previous_point, next_point)
     # }
     points: Dict[int, Tuple[Point, Point]]
+
+
+class ConflictType(Enum):
+    """Effect of a conflict on the cost of the agents, see ``common/mdd.py``.
+
+    Splitting on a cardinal conflict raises the cost of both children, on a
+    semi-cardinal one the cost of one child, and on a non-cardinal one the
+    cost of neither.
+    """
+
+    CARDINAL = "cardinal"
+    SEMI_CARDINAL = "semi-cardinal"
+    NON_CARDINAL = "non-cardinal"
+
+
+def find_conflicts(
+    solution: List[List[Tuple[Point, int]]],
+    first_only: bool = False,
+    encode: Callable[[Point], Hashable] = None,
+    agent_ids: Iterable[int] = None,
+) -> List[Conflict]:
+    """Vertex and swap conflicts of a solution in time order.
+
+    The paths are swept one time step at a time and the states are hashed by
+    (point, time) and (previous point, next point, time), so the work is linear
+    in the total path length instead of quadratic in the number of agents. An
+    agent stays at the last point of its path for good and conflicts with every
+    agent that passes there later. Every conflicting pair is reported once per
+    time, with the agent ids in increasing order; ``first_only`` stops at the
+    earliest conflict. Points are used as keys through ``encode`` if given,
+    e.g. ``Environment.point_to_cell``, and ``agent_ids`` restricts the search
+    to the conflicts among these agents.
+    """
+    conflicts: List[Conflict] = []
+    vertices: Dict[Tuple[Hashable, int], List[int]] = {}
+    edges: Dict[Tuple[Hashable, Hashable, int], List[int]] = {}
+    # agents waiting at the last point of their path and the time they arrived
+    parked: Dict[Hashable, List[Tuple[int, int]]] = {}
+    if agent_ids is None:
+        agent_ids = range(len(solution))
+    active = sorted(agent_id for agent_id in agent_ids if solution[agent_id])
+    keys: Dict[int, List[Hashable]] = {}
+    for agent_id in active:
+        path = solution[agent_id]
+        keys[agent_id] = [encode(point) for point, _ in path] if encode else [p for p, _ in path]
+    time = 0
+    while active:
+        for agent_id in active:
+            key = keys[agent_id][time]
+            point = solution[agent_id][time][0]
+            for other_id, arrival_time in parked.get(key, []):
+                if arrival_time < time:
+                    conflicts.append(
+                        VertexConflict(
+                            agent_ids=sorted([other_id, agent_id]), time=time, point=point
+                        )
+                    )
+            occupants = vertices.setdefault((key, time), [])
+            for other_id in occupants:
+                conflicts.append(
+                    VertexConflict(agent_ids=[other_id, agent_id], time=time, point=point)
+                )
+            occupants.append(agent_id)
+
+            if time == 0:
+                continue
+            prev_key = keys[agent_id][time - 1]
+            if prev_key == key:
+                continue
+            prev_point = solution[agent_id][time - 1][0]
+            # a swap meets the reverse move at the same time
+            for other_id in edges.get((key, prev_key, time), []):
+                conflicts.append(
+                    EdgeConflict(
+                        agent_ids=[other_id, agent_id],
+                        points={
+                            other_id: (point, prev_point),
+                            agent_id: (prev_point, point),
+                        },
+                        times=(time - 1, time),
+                    )
+                )
+            edges.setdefault((prev_key, key, time), []).append(agent_id)
+
+        if first_only and conflicts:
+            return conflicts[:1]
+        for agent_id in active:
+            if len(solution[agent_id]) == time + 1:
+                parked.setdefault(keys[agent_id][time], []).append((agent_id, time))
+        time += 1
+        active = [agent_id for agent_id in active if len(solution[agent_id]) > time]
+    return conflicts
+
+
+def find_first_conflict(
+    solution: List[List[Tuple[Point, int]]],
+    encode: Callable[[Point], Hashable] = None,
+    agent_ids: Iterable[int] = None,
+) -> Conflict | None:
+    # earliest conflict of the solution, None if it is conflict-free
+    conflicts = find_conflicts(solution, first_only=True, encode=encode, agent_ids=agent_ids)
+    return conflicts[0] if conflicts else None
+
+
+def count_pair_conflicts(cells: List[int], other_cells: List[int]) -> Tuple[int, int]:
+    # number of conflicts between two paths given as cells, counted like
+    # find_conflicts, and the time of the first one, -1 if there is none
+    num_of_conflicts = 0
+    first_time = -1
+    last_time, other_last_time = len(cells) - 1, len(other_cells) - 1
+    prev_cell = other_prev_cell = None
+    for time in range(max(last_time, other_last_time) + 1):
+        cell = cells[min(time, last_time)]
+        other_cell = other_cells[min(time, other_last_time)]
+        # a swap meets the reverse move at the same time
+        if cell == other_cell or (
+            cell == other_prev_cell and other_cell == prev_cell and cell != prev_cell
+        ):
+            num_of_conflicts += 1
+            if first_time < 0:
+                first_time = time
+        prev_cell, other_prev_cell = cell, other_cell
+    return num_of_conflicts, first_time
+
+
+class ConflictGraph:
+    """Agent pairs in conflict, kept up to date path by path.
+
+    Every pair of conflicting agents maps to its number of conflicts and the
+    time of its first one. A child CT node replaces one path, so its graph
+    copies the pairs of the other agents from the parent and only compares
+    the new path with the others, on the cells of the paths, which are shared
+    between the graphs like the paths themselves.
+    """
+
+    def __init__(
+        self,
+        path_cells: List[List[int]],
+        pairs: Dict[Tuple[int, int], Tuple[int, int]],
+        num_of_conflicts: int,
+    ):
+        self.path_cells = path_cells
+        self.pairs = pairs
+        self.num_of_conflicts = num_of_conflicts
+
+    @classmethod
+    def from_solution(
+        cls, solution: List[List[Tuple[Point, int]]], encode: Callable[[Point], int]
+    ) -> "ConflictGraph":
+        pairs: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        conflicts = find_conflicts(solution, encode=encode)
+        for conflict in conflicts:
+            pair = tuple(conflict.agent_ids)
+            time = conflict.time if isinstance(conflict, VertexConflict) else conflict.times[1]
+            num_of_conflicts, first_time = pairs.get(pair, (0, time))
+            pairs[pair] = (num_of_conflicts + 1, first_time)
+        path_cells = [cls.encode_path(path, encode) for path in solution]
+        return cls(path_cells, pairs, len(conflicts))
+
+    @staticmethod
+    def encode_path(path: List[Tuple[Point, int]], encode: Callable[[Point], int]) -> List[int]:
+        return [encode(point) for point, _ in path]
+
+    def replace_path(
+        self, agent_id: int, path: List[Tuple[Point, int]], encode: Callable[[Point], int]
+    ) -> "ConflictGraph":
+        # graph of the solution with the path of the agent replaced
+        path_cells = self.path_cells.copy()
+        path_cells[agent_id] = self.encode_path(path, encode)
+        pairs: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        num_of_conflicts = self.num_of_conflicts
+        for pair, (pair_conflicts, first_time) in self.pairs.items():
+            if agent_id in pair:
+                num_of_conflicts -= pair_conflicts
+            else:
+                pairs[pair] = (pair_conflicts, first_time)
+        for other_id, other_cells in enumerate(path_cells):
+            if other_id == agent_id:
+                continue
+            pair_conflicts, first_time = count_pair_conflicts(path_cells[agent_id], other_cells)
+            if pair_conflicts:
+                pairs[(min(agent_id, other_id), max(agent_id, other_id))] = (
+                    pair_conflicts,
+                    first_time,
+                )
+                num_of_conflicts += pair_conflicts
+        return ConflictGraph(path_cells, pairs, num_of_conflicts)
+
+    def get_first_pair(self) -> Tuple[int, int] | None:
+        # the pair with the earliest conflict, None if there is no conflict
+        if not self.pairs:
+            return None
+        return min(self.pairs, key=lambda pair: (self.pairs[pair][1], pair))
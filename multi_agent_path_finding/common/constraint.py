@@ -1,6 +1,7 @@
+import random
 from abc import ABC
 from dataclasses import dataclass
-from typing import Tuple
+from typing import Callable, Dict, Hashable, List, Set, Tuple
 from multi_agent_path_finding.common.point import Point
 
 
@@ -32,3 +33,215 @@ class EdgeConstraint(Constraint):
         if isinstance(other, EdgeConstraint):
             return self.times == other.times and self.points == other.points
         return False
+
+
+def get_path_point(path: List[Tuple[Point, int]], time: int) -> Point:
+    # the agent stays at the last point of its path for good
+    return path[min(time, len(path) - 1)][0]
+
+
+@dataclass
+class PositiveVertexConstraint(Constraint):
+    """The agent must be at the point at the time, and no other agent may be."""
+
+    time: int
+    point: Point
+
+    def __eq__(self, other):
+        if isinstance(other, PositiveVertexConstraint):
+            return self.time == other.time and self.point == other.point
+        return False
+
+    def get_negative_constraints(self, agent_id: int) -> List[Constraint]:
+        # constraints of another agent implied by the positive constraint
+        return [VertexConstraint(agent_id=agent_id, time=self.time, point=self.point)]
+
+    def is_violated_by(self, path: List[Tuple[Point, int]]) -> bool:
+        # whether the path of another agent breaks the implied constraints
+        return get_path_point(path, self.time) == self.point
+
+
+@dataclass
+class PositiveEdgeConstraint(Constraint):
+    """The agent must move along the edge at the times, and no other agent may
+    be at its ends at these times or move along it the other way."""
+
+    times: Tuple[int, int]
+    # The first point is the previous point
+    # The second point is the next point
+    points: Tuple[Point, Point]
+
+    def __eq__(self, other):
+        if isinstance(other, PositiveEdgeConstraint):
+            return self.times == other.times and self.points == other.points
+        return False
+
+    def get_negative_constraints(self, agent_id: int) -> List[Constraint]:
+        prev_time, next_time = self.times
+        prev_point, next_point = self.points
+        return [
+            VertexConstraint(agent_id=agent_id, time=prev_time, point=prev_point),
+            VertexConstraint(agent_id=agent_id, time=next_time, point=next_point),
+            EdgeConstraint(agent_id=agent_id, times=self.times, points=(next_point, prev_point)),
+        ]
+
+    def is_violated_by(self, path: List[Tuple[Point, int]]) -> bool:
+        prev_time, next_time = self.times
+        prev_point, next_point = self.points
+        path_points = (get_path_point(path, prev_time), get_path_point(path, next_time))
+        return (
+            path_points[0] == prev_point
+            or path_points[1] == next_point
+            or path_points == (next_point, prev_point)
+        )
+
+
+PositiveConstraint = PositiveVertexConstraint | PositiveEdgeConstraint
+
+
+class ConstraintTable:
+    """Hashed view of the constraints of one agent for the low-level search.
+
+    Vertex constraints are indexed by (point, time) and edge constraints by
+    (previous point, next point, previous time, next time), so a transition is
+    checked in O(1) however deep the constraint tree is. The table also keeps
+    the latest time at which an agent may not stay at each point, the time of
+    a vertex constraint or the first time of a wait edge on the point, so the
+    goal test of a planner is O(1) as well.
+
+    A positive constraint of the agent keeps it at its point at its time, which
+    rules out every other point then; such points are indexed by time, and a
+    positive edge constraint is the two positive vertex constraints at its ends.
+
+    Points are used as keys as they are, or through ``encode`` when the search
+    works on another state encoding such as flat cell indices.
+    """
+
+    def __init__(
+        self,
+        constraints: List[Constraint] = None,
+        encode: Callable[[Point], Hashable] = None,
+    ):
+        self.constraints: List[Constraint] = []
+        self.encode = encode
+        self.vertex_constraints: Set[Tuple[Hashable, int]] = set()
+        self.edge_constraints: Set[Tuple[Hashable, Hashable, int, int]] = set()
+        self.latest_times: Dict[Hashable, int] = {}
+        # the point the agent must be at, by time
+        self.positive_points: Dict[int, Hashable] = {}
+        # latest time of any constraint in the table, -1 if there is none
+        self.latest_time = -1
+        if constraints is not None:
+            for constraint in constraints:
+                self.add(constraint)
+
+    @classmethod
+    def from_constraints(
+        cls,
+        constraints: List[Constraint] | "ConstraintTable" = None,
+        encode: Callable[[Point], Hashable] = None,
+    ) -> "ConstraintTable":
+        # reuse a table that is already keyed the requested way
+        if isinstance(constraints, ConstraintTable):
+            if constraints.encode == encode:
+                return constraints
+            constraints = constraints.constraints
+        return cls(constraints, encode)
+
+    def add(self, constraint: Constraint) -> None:
+        self.constraints.append(constraint)
+        if isinstance(constraint, VertexConstraint):
+            point = self.encode(constraint.point) if self.encode else constraint.point
+            self.vertex_constraints.add((point, constraint.time))
+            self.update_latest_time(point, constraint.time)
+        elif isinstance(constraint, EdgeConstraint):
+            prev_point, next_point = constraint.points
+            if self.encode:
+                prev_point, next_point = self.encode(prev_point), self.encode(next_point)
+            self.edge_constraints.add((prev_point, next_point, *constraint.times))
+            if prev_point == next_point:
+                self.update_latest_time(next_point, constraint.times[0])
+            self.latest_time = max(self.latest_time, constraint.times[1])
+        elif isinstance(constraint, PositiveVertexConstraint):
+            point = self.encode(constraint.point) if self.encode else constraint.point
+            self.add_positive_point(point, constraint.time)
+        elif isinstance(constraint, PositiveEdgeConstraint):
+            for point, time in zip(constraint.points, constraint.times):
+                self.add_positive_point(self.encode(point) if self.encode else point, time)
+        else:
+            raise ValueError(f"Unknown constraint type: {type(constraint)}")
+
+    def update_latest_time(self, point: Hashable, time: int) -> None:
+        self.latest_times[point] = max(self.latest_times.get(point, -1), time)
+        self.latest_time = max(self.latest_time, time)
+
+    def add_positive_point(self, point: Hashable, time: int) -> None:
+        self.positive_points[time] = point
+        self.latest_time = max(self.latest_time, time)
+
+    def is_constrained(
+        self, prev_point: Hashable, next_point: Hashable, prev_time: int, next_time: int
+    ) -> bool:
+        if (next_point, next_time) in self.vertex_constraints or (
+            prev_point,
+            next_point,
+            prev_time,
+            next_time,
+        ) in self.edge_constraints:
+            return True
+        return bool(self.positive_points) and (
+            self.positive_points.get(next_time, next_point) != next_point
+        )
+
+    def get_latest_time(self, point: Hashable) -> int:
+        # latest time at which an agent may not stay at the point, -1 if there is
+        # none, an agent at the point after that time may stay there for good
+        latest_time = self.latest_times.get(point, -1)
+        for time, positive_point in self.positive_points.items():
+            if positive_point != point and time > latest_time:
+                latest_time = time
+        return latest_time
+
+    def __len__(self) -> int:
+        return len(self.constraints)
+
+
+class ZobristTable:
+    """Random 64-bit keys of constraints for constraint-set fingerprints.
+
+    The fingerprint of a set of constraints is the XOR of the keys of its
+    constraints, so it does not depend on the order in which the constraints
+    were added and a child CT node gets its fingerprint from the parent's in
+    O(1). Two CT nodes with the same fingerprint hold the same constraints, up
+    to a collision probability of 2^-64 per pair, and thus have the same
+    optimal solution. A key is drawn the first time a constraint is seen.
+    """
+
+    def __init__(self, seed: int = None):
+        self.random = random.Random(seed)
+        self.keys: Dict[Hashable, int] = {}
+
+    def get_key(self, constraint: Constraint) -> int:
+        if isinstance(constraint, VertexConstraint):
+            constraint_key = (constraint.agent_id, constraint.point, constraint.time)
+        elif isinstance(constraint, EdgeConstraint):
+            constraint_key = (constraint.agent_id, *constraint.points, *constraint.times)
+        # a positive constraint gets another key than the negative one it mirrors
+        elif isinstance(constraint, PositiveVertexConstraint):
+            constraint_key = (constraint.agent_id, constraint.point, constraint.time, True)
+        elif isinstance(constraint, PositiveEdgeConstraint):
+            constraint_key = (constraint.agent_id, *constraint.points, *constraint.times, True)
+        else:
+            raise ValueError(f"Unknown constraint type: {type(constraint)}")
+        key = self.keys.get(constraint_key)
+        if key is None:
+            key = self.keys[constraint_key] = self.random.getrandbits(64)
+        return key
+
+    def get_fingerprint(self, constraints: List[Constraint]) -> int:
+        # a constraint listed twice, e.g. implied by two positive constraints,
+        # counts once
+        fingerprint = 0
+        for key in {self.get_key(constraint) for constraint in constraints}:
+            fingerprint ^= key
+        return fingerprint
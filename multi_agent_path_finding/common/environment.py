@@ -1,10 +1,85 @@
-from typing import List, Tuple
+import math
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
 from multi_agent_path_finding.common.obstacle import (
     StaticObstacle,
     DynamicObstacle,
     Obstacle,
 )
-from multi_agent_path_finding.common.point import Point
+from multi_agent_path_finding.common.point import Point, Point2D, Point3D
+
+
+class DynamicObstacleIndex:
+    """Blocked time intervals of the dynamic obstacles, indexed per cell.
+
+    The intervals of every cell are merged and sorted so that both queries
+    below are a dictionary lookup plus a binary search. An end time of -1
+    (blocked forever) is stored as infinity.
+    """
+
+    def __init__(self, blocked_times: Iterable[Tuple[int, Tuple[int, int]]]):
+        intervals: Dict[int, List[Tuple[int, float]]] = {}
+        for cell, (start_time, end_time) in blocked_times:
+            end_time = math.inf if end_time == -1 else end_time
+            intervals.setdefault(cell, []).append((start_time, end_time))
+
+        self.start_times: Dict[int, List[int]] = {}
+        self.end_times: Dict[int, List[float]] = {}
+        for cell, cell_intervals in intervals.items():
+            merged: List[List] = []
+            for start_time, end_time in sorted(cell_intervals):
+                if merged and start_time <= merged[-1][1] + 1:
+                    merged[-1][1] = max(merged[-1][1], end_time)
+                else:
+                    merged.append([start_time, end_time])
+            self.start_times[cell] = [start_time for start_time, _ in merged]
+            self.end_times[cell] = [end_time for _, end_time in merged]
+
+        # last time at which a cell changes between free and blocked, -1 if never
+        self.latest_time = max(
+            (
+                start_time if end_time == math.inf else int(end_time) + 1
+                for cell in self.start_times
+                for start_time, end_time in zip(self.start_times[cell], self.end_times[cell])
+            ),
+            default=-1,
+        )
+
+    def is_blocked(self, cell: int, time: int) -> bool:
+        start_times = self.start_times.get(cell)
+        if start_times is None:
+            return False
+        i = bisect_right(start_times, time) - 1
+        return i >= 0 and time <= self.end_times[cell][i]
+
+    def next_free_time(self, cell: int, time: int) -> Optional[int]:
+        # earliest time from the given time on at which the cell is free,
+        # None if the cell stays blocked forever
+        start_times = self.start_times.get(cell)
+        if start_times is None:
+            return time
+        i = bisect_right(start_times, time) - 1
+        if i < 0 or time > self.end_times[cell][i]:
+            return time
+        end_time = self.end_times[cell][i]
+        return None if end_time == math.inf else int(end_time) + 1
+
+    def safe_intervals(self, cell: int) -> List[Tuple[int, float]]:
+        # maximal free intervals of the cell, the last one may end at infinity
+        safe_intervals = []
+        free_from = 0
+        for start_time, end_time in zip(
+            self.start_times.get(cell, []), self.end_times.get(cell, [])
+        ):
+            if free_from < start_time:
+                safe_intervals.append((free_from, start_time - 1))
+            free_from = end_time + 1
+        if free_from != math.inf:
+            safe_intervals.append((free_from, math.inf))
+        return safe_intervals
 
 
 class Environment:
@@ -24,6 +99,7 @@ class Environment:
             )
 
         self.obstacles: List[Obstacle] = []
+        self.dynamic_obstacles: List[DynamicObstacle] = []
         if static_obstacles is not None:
             for static_obstacle in static_obstacles:
                 if self.dimension != len(static_obstacle.__dict__.keys()):
@@ -40,3 +116,192 @@ class Environment:
                 self.obstacles.append(
                     DynamicObstacle(dynamic_obstacle[0], dynamic_obstacle[1])
                 )
+                self.dynamic_obstacles.append(self.obstacles[-1])
+
+        # cells are numbered in C order, the stride of an axis is the index
+        # distance between two cells that are adjacent along that axis
+        self.num_of_cells = int(np.prod(self.space_limit))
+        self.strides = [
+            int(np.prod(self.space_limit[axis + 1 :])) for axis in range(self.dimension)
+        ]
+
+        # bit-packed occupancy of the static obstacles, one bit per cell
+        static_occupancy_grid = self.build_static_occupancy_grid()
+        self.num_of_free_cells = self.num_of_cells - int(static_occupancy_grid.sum())
+        self.static_occupancy = np.packbits(static_occupancy_grid.ravel())
+        self.static_occupancy_view = memoryview(self.static_occupancy)
+        self.dynamic_obstacle_index = DynamicObstacleIndex(
+            (self.point_to_cell(obstacle.point), obstacle.time)
+            for obstacle in self.dynamic_obstacles
+            if self.point_to_cell(obstacle.point) is not None
+        )
+
+        # adjacency of the free cells, built on first use, see get_adjacency
+        self.adjacency: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self.adjacency_view: Optional[Tuple[memoryview, memoryview]] = None
+        # connected component of every cell, built on first use, see get_component_labels
+        self.component_labels: Optional[np.ndarray] = None
+        self.component_labels_view: Optional[memoryview] = None
+
+    def build_static_occupancy_grid(self) -> np.ndarray:
+        grid = np.zeros(self.space_limit, dtype=bool)
+        coordinates = np.array(
+            [
+                list(obstacle.point.__dict__.values())
+                for obstacle in self.obstacles
+                if isinstance(obstacle, StaticObstacle)
+            ],
+            dtype=np.int64,
+        ).reshape(-1, self.dimension)
+        # obstacles outside of the space can never collide with anything
+        is_inside = np.all((coordinates >= 0) & (coordinates < self.space_limit), axis=1)
+        grid[tuple(coordinates[is_inside].T)] = True
+        return grid
+
+    def static_occupancy_grid(self) -> np.ndarray:
+        # unpacked boolean grid of the static obstacles for vectorized consumers
+        return (
+            np.unpackbits(self.static_occupancy, count=self.num_of_cells)
+            .astype(bool)
+            .reshape(self.space_limit)
+        )
+
+    def get_safe_horizon(
+        self, latest_constraint_time: int = -1, goal_cell: int = None, max_distance: int = None
+    ) -> int:
+        # after the last constraint and the last change of a dynamic obstacle
+        # the map is static, so from any state at that time the goal is reached
+        # within max_distance steps, or the number of free cells if unknown,
+        # and no search node beyond this time is ever needed
+        latest_time = max(latest_constraint_time, self.dynamic_obstacle_index.latest_time, 0)
+        if max_distance is None:
+            max_distance = self.num_of_free_cells
+        horizon = latest_time + max_distance
+        if goal_cell is not None:
+            # the goal cannot be reached once it is blocked for good
+            safe_intervals = self.dynamic_obstacle_index.safe_intervals(goal_cell)
+            if not safe_intervals:
+                return 0
+            horizon = min(horizon, safe_intervals[-1][1])
+        return horizon
+
+    def get_goal_time(self, goal_cell: int, latest_goal_constraint_time: int = -1) -> float:
+        # earliest time from which an agent can stay at the goal for good, after
+        # the last constraint on the goal and once no dynamic obstacle comes back
+        # to it, infinity if the goal is blocked for good
+        safe_intervals = self.dynamic_obstacle_index.safe_intervals(goal_cell)
+        if not safe_intervals or safe_intervals[-1][1] != math.inf:
+            return math.inf
+        return max(safe_intervals[-1][0], latest_goal_constraint_time + 1)
+
+    def point_to_cell(self, point: Point) -> Optional[int]:
+        # flat index of the point in C order, None if it is outside of the space
+        cell = 0
+        for coordinate, limit in zip(point.__dict__.values(), self.space_limit):
+            if coordinate < 0 or coordinate >= limit:
+                return None
+            cell = cell * limit + coordinate
+        return cell
+
+    def cell_to_point(self, cell: int) -> Point:
+        coordinates = [cell // stride % limit for stride, limit in zip(self.strides, self.space_limit)]
+        if self.dimension == 2:
+            return Point2D(*coordinates)
+        return Point3D(*coordinates)
+
+    def manhattan_distance(self, cell: int, other_cell: int) -> int:
+        distance = 0
+        for stride, limit in zip(self.strides, self.space_limit):
+            distance += abs(cell // stride % limit - other_cell // stride % limit)
+        return distance
+
+    def is_free_cell(self, cell: int) -> bool:
+        return not self.static_occupancy_view[cell >> 3] & (0x80 >> (cell & 7))
+
+    def build_adjacency(self) -> Tuple[np.ndarray, np.ndarray]:
+        # compressed sparse rows: the neighbors of a cell are
+        # indices[indptr[cell] : indptr[cell + 1]] in the order of
+        # Point.get_neighbor_points, wait last, and obstacle cells have none
+        free = ~self.static_occupancy_grid().ravel()
+        cells = np.arange(self.num_of_cells, dtype=np.int64)
+        neighbors = []
+        is_valid = []
+        for stride, limit in zip(self.strides, self.space_limit):
+            coordinates = cells // stride % limit
+            for step, is_inside in [(stride, coordinates < limit - 1), (-stride, coordinates > 0)]:
+                neighbor_cells = np.where(is_inside, cells + step, cells)
+                neighbors.append(neighbor_cells)
+                is_valid.append(free & is_inside & free[neighbor_cells])
+        neighbors.append(cells)
+        is_valid.append(free)
+
+        neighbors = np.stack(neighbors, axis=1)
+        is_valid = np.stack(is_valid, axis=1)
+        indptr = np.zeros(self.num_of_cells + 1, dtype=np.int64)
+        np.cumsum(is_valid.sum(axis=1), out=indptr[1:])
+        indices = neighbors[is_valid].astype(np.int64)
+        return indptr, indices
+
+    def get_adjacency(self) -> Tuple[memoryview, memoryview]:
+        # the adjacency is built once and shared by every planner and replan
+        if self.adjacency_view is None:
+            self.adjacency = self.build_adjacency()
+            self.adjacency_view = (memoryview(self.adjacency[0]), memoryview(self.adjacency[1]))
+        return self.adjacency_view
+
+    def build_component_labels(self) -> np.ndarray:
+        # label of the connected component of every free cell, the smallest
+        # cell in it, and -1 for obstacle cells; each label is hooked to the
+        # smallest label next to it and shortened by pointer jumping, over all
+        # edges at once, until no edge joins two labels
+        self.get_adjacency()
+        indptr, indices = self.adjacency
+        cells = np.repeat(np.arange(self.num_of_cells, dtype=np.int64), np.diff(indptr))
+        labels = np.arange(self.num_of_cells, dtype=np.int64)
+        while True:
+            parents = labels.copy()
+            np.minimum.at(parents, labels[cells], labels[indices])
+            while True:
+                grandparents = parents[parents]
+                if np.array_equal(grandparents, parents):
+                    break
+                parents = grandparents
+            if np.array_equal(parents, labels):
+                break
+            labels = parents
+        labels[np.diff(indptr) == 0] = -1
+        return labels
+
+    def get_component_labels(self) -> memoryview:
+        # the labels are built once and shared by every solver and planner
+        if self.component_labels_view is None:
+            self.component_labels = self.build_component_labels()
+            self.component_labels_view = memoryview(self.component_labels)
+        return self.component_labels_view
+
+    def is_reachable_cell(self, cell: int, other_cell: int) -> bool:
+        # both cells are free and connected over the static obstacles
+        labels = self.get_component_labels()
+        return labels[cell] != -1 and labels[cell] == labels[other_cell]
+
+    def is_reachable(self, point: Point, other_point: Point) -> bool:
+        cell = self.point_to_cell(point)
+        other_cell = self.point_to_cell(other_point)
+        if cell is None or other_cell is None:
+            return False
+        return self.is_reachable_cell(cell, other_cell)
+
+    def get_neighbor_cells(self, cell: int) -> Sequence[int]:
+        # free cells reachable in one step, including the cell itself (wait)
+        indptr, indices = self.get_adjacency()
+        return indices[indptr[cell] : indptr[cell + 1]]
+
+    def is_free(self, point: Point) -> bool:
+        # True if the point is inside the space and not a static obstacle
+        cell = self.point_to_cell(point)
+        return cell is not None and self.is_free_cell(cell)
+
+    def is_blocked(self, point: Point, time: int) -> bool:
+        # True if a dynamic obstacle occupies the point at the given time
+        cell = self.point_to_cell(point)
+        return cell is not None and self.dynamic_obstacle_index.is_blocked(cell, time)
@@ -0,0 +1,105 @@
+from typing import Dict, List
+
+import numpy as np
+
+from multi_agent_path_finding.common.environment import Environment
+from multi_agent_path_finding.common.point import Point
+
+# distance of the cells that cannot reach the goal
+UNREACHABLE = -1
+
+
+def get_distance_view(distance_map: np.ndarray) -> memoryview:
+    # flat view of a distance map, indexed by cell, see Environment.point_to_cell
+    return memoryview(np.ascontiguousarray(distance_map).ravel())
+
+
+class TrueDistanceHeuristic:
+    """Shortest-path distances to every goal over the static obstacles.
+
+    The distances are computed once with a backward breadth-first search from
+    each goal, vectorized over the grid and batched over the goals, so every
+    low-level planner of a solver can look up an exact static distance in O(1)
+    instead of using the Manhattan distance. Dynamic obstacles and constraints
+    are ignored because waiting can only make a path longer, which keeps the
+    heuristic admissible and consistent.
+    """
+
+    def __init__(
+        self, env: Environment, goal_points: List[Point], batch_size: int = 32
+    ):
+        self.env = env
+        self.distance_maps: Dict[Point, np.ndarray] = {}
+
+        goals = list(dict.fromkeys(goal_points))
+        for i in range(0, len(goals), batch_size):
+            batch = goals[i : i + batch_size]
+            for goal_point, distance_map in zip(batch, self.compute(batch)):
+                self.distance_maps[goal_point] = distance_map
+
+    def get_distance_map(self, goal_point: Point) -> np.ndarray:
+        if goal_point not in self.distance_maps:
+            self.distance_maps[goal_point] = self.compute([goal_point])[0]
+        return self.distance_maps[goal_point]
+
+    def compute(self, goal_points: List[Point]) -> np.ndarray:
+        shape = self.env.space_limit
+        num_of_cells = int(np.prod(shape))
+        strides = [int(np.prod(shape[axis + 1 :])) for axis in range(len(shape))]
+
+        free = ~self.env.static_occupancy_grid().ravel()
+
+        # the frontier holds (goal index, flat cell index) pairs of all goals
+        distances = np.full((len(goal_points), num_of_cells), UNREACHABLE, dtype=np.int32)
+        frontier_goals = np.arange(len(goal_points))
+        frontier_cells = np.array(
+            [np.ravel_multi_index(tuple(goal_point.__dict__.values()), shape) for goal_point in goal_points],
+            dtype=np.int64,
+        )
+        distances[frontier_goals, frontier_cells] = 0
+
+        distance = 0
+        while frontier_cells.size:
+            distance += 1
+            next_goals = []
+            next_cells = []
+            for axis, stride in enumerate(strides):
+                coordinates = frontier_cells // stride % shape[axis]
+                for step, is_inside in [
+                    (stride, coordinates < shape[axis] - 1),
+                    (-stride, coordinates > 0),
+                ]:
+                    next_goals.append(frontier_goals[is_inside])
+                    next_cells.append(frontier_cells[is_inside] + step)
+            next_goals = np.concatenate(next_goals)
+            next_cells = np.concatenate(next_cells)
+
+            is_new = free[next_cells] & (distances[next_goals, next_cells] == UNREACHABLE)
+            keys = np.unique(next_goals[is_new] * num_of_cells + next_cells[is_new])
+            frontier_goals = keys // num_of_cells
+            frontier_cells = keys % num_of_cells
+            distances[frontier_goals, frontier_cells] = distance
+        return distances.reshape((len(goal_points), *shape))
+
+
+class DistanceMapHeuristic:
+    """Heuristic of a single-agent planner towards its goal cell.
+
+    With a distance map of TrueDistanceHeuristic the heuristic is the exact
+    static distance, otherwise the Manhattan distance. A planner sets the map
+    from its constructor with ``init_heuristic``.
+    """
+
+    def init_heuristic(self, distance_map: np.ndarray = None) -> None:
+        # exact static distances to the goal, see TrueDistanceHeuristic
+        self.distance_map = distance_map
+        self.distance_view = None if distance_map is None else get_distance_view(distance_map)
+        # longest finite distance to the goal, bounds the safe horizon
+        self.max_distance = None if distance_map is None else int(distance_map.max())
+
+    def heuristic(self, node) -> int:
+        if self.distance_view is not None:
+            # return true distance, UNREACHABLE if the goal cannot be reached
+            return self.distance_view[node.cell]
+        # return manhattan distance
+        return self.env.manhattan_distance(node.cell, self.goal_cell)
@@ -0,0 +1,194 @@
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Set
+
+import numpy as np
+
+from multi_agent_path_finding.common.conflict import (
+    Conflict,
+    ConflictType,
+    EdgeConflict,
+    VertexConflict,
+)
+from multi_agent_path_finding.common.constraint import ConstraintTable
+from multi_agent_path_finding.common.environment import Environment
+from multi_agent_path_finding.common.heuristic import UNREACHABLE
+
+
+class MDD:
+    """Multi-valued decision diagram of the paths of one agent with a given cost.
+
+    Level t holds the cells that at least one path of the cost, under the
+    constraints of the agent and the dynamic obstacles, occupies at time t.
+    Such a path ends at the goal at time cost and stays there for good, so
+    every level after the cost is the goal alone. A level with a single cell
+    means that every path of the cost goes through it, which is what makes a
+    conflict there cardinal.
+    """
+
+    def __init__(self, levels: List[Set[int]], successors: List[Dict[int, List[int]]]):
+        self.levels = levels
+        # successors[t][cell] are the cells of level t + 1 the cell leads to
+        self.successors = successors
+        self.num_of_nodes = sum(len(level) for level in levels)
+
+    @classmethod
+    def build(
+        cls,
+        env: Environment,
+        start_cell: int,
+        goal_cell: int,
+        cost: int,
+        constraint_table: ConstraintTable,
+        distance_map: np.ndarray = None,
+    ) -> "MDD":
+        # no path of the cost, the MDD is empty
+        goal_time = env.get_goal_time(goal_cell, constraint_table.get_latest_time(goal_cell))
+        if cost < goal_time:
+            return cls([], [])
+        distance_view = (
+            None if distance_map is None else memoryview(np.ascontiguousarray(distance_map).ravel())
+        )
+        indptr, indices = env.get_adjacency()
+        dynamic_obstacle_index = env.dynamic_obstacle_index
+
+        # forward pass over the cells that can still reach the goal in time,
+        # with the predecessors of every cell of a level
+        levels: List[Set[int]] = [{start_cell}]
+        predecessors: List[Dict[int, List[int]]] = [{}]
+        for time in range(1, cost + 1):
+            level_predecessors: Dict[int, List[int]] = {}
+            for cell in levels[-1]:
+                for neighbor_cell in indices[indptr[cell] : indptr[cell + 1]]:
+                    if distance_view is not None:
+                        distance = distance_view[neighbor_cell]
+                        if distance == UNREACHABLE:
+                            continue
+                    else:
+                        distance = env.manhattan_distance(neighbor_cell, goal_cell)
+                    if distance > cost - time:
+                        continue
+                    if dynamic_obstacle_index.is_blocked(neighbor_cell, time):
+                        continue
+                    if constraint_table and constraint_table.is_constrained(
+                        cell, neighbor_cell, time - 1, time
+                    ):
+                        continue
+                    level_predecessors.setdefault(neighbor_cell, []).append(cell)
+            levels.append(set(level_predecessors))
+            predecessors.append(level_predecessors)
+        if goal_cell not in levels[cost]:
+            return cls([], [])
+
+        # backward pass keeps the cells and moves that lead to the goal
+        levels[cost] = {goal_cell}
+        successors: List[Dict[int, List[int]]] = [{} for _ in range(cost)]
+        for time in range(cost, 0, -1):
+            for cell in levels[time]:
+                for predecessor in predecessors[time][cell]:
+                    successors[time - 1].setdefault(predecessor, []).append(cell)
+            levels[time - 1] = set(successors[time - 1])
+        return cls(levels, successors)
+
+    def get_cells(self, time: int) -> Set[int]:
+        if not self.levels:
+            return set()
+        return self.levels[min(time, len(self.levels) - 1)]
+
+    def get_successors(self, cell: int, time: int) -> List[int]:
+        # the agent stays at the goal after the last level
+        if time < len(self.successors):
+            return self.successors[time].get(cell, [])
+        return [cell]
+
+    def get_width(self, time: int) -> int:
+        return len(self.get_cells(time))
+
+    def is_forced(self, conflict: Conflict) -> bool:
+        # every path of the cost takes part in the conflict
+        if isinstance(conflict, VertexConflict):
+            return self.get_width(conflict.time) == 1
+        elif isinstance(conflict, EdgeConflict):
+            return all(self.get_width(time) == 1 for time in conflict.times)
+        else:
+            raise ValueError(f"Unknown conflict type: {type(conflict)}")
+
+    def __len__(self) -> int:
+        return self.num_of_nodes
+
+
+class MDDCache:
+    """Least recently used MDDs, keyed by (agent, cost, constraint fingerprint).
+
+    The size of the cache is the total number of MDD nodes, so its memory is
+    bounded by ``max_num_of_nodes`` whatever the sizes of the MDDs; the least
+    recently used MDDs are evicted first.
+    """
+
+    def __init__(self, max_num_of_nodes: int = 1_000_000):
+        self.max_num_of_nodes = max_num_of_nodes
+        self.num_of_nodes = 0
+        self.mdds: OrderedDict[Hashable, MDD] = OrderedDict()
+
+    def get(self, key: Hashable) -> MDD | None:
+        mdd = self.mdds.get(key)
+        if mdd is not None:
+            self.mdds.move_to_end(key)
+        return mdd
+
+    def put(self, key: Hashable, mdd: MDD) -> None:
+        if key in self.mdds:
+            self.num_of_nodes -= len(self.mdds.pop(key))
+        self.mdds[key] = mdd
+        self.num_of_nodes += len(mdd)
+        while self.num_of_nodes > self.max_num_of_nodes and len(self.mdds) > 1:
+            _, evicted_mdd = self.mdds.popitem(last=False)
+            self.num_of_nodes -= len(evicted_mdd)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.mdds
+
+    def __len__(self) -> int:
+        return len(self.mdds)
+
+
+def classify_conflict(conflict: Conflict, mdds: Dict[int, MDD]) -> ConflictType:
+    # cardinal if both agents must take part in the conflict at their cost,
+    # semi-cardinal if only one of them must
+    num_of_forced_agents = sum(
+        mdds[agent_id].is_forced(conflict) for agent_id in conflict.agent_ids
+    )
+    if num_of_forced_agents == 2:
+        return ConflictType.CARDINAL
+    if num_of_forced_agents == 1:
+        return ConflictType.SEMI_CARDINAL
+    return ConflictType.NON_CARDINAL
+
+
+def is_dependent(mdd: MDD, other_mdd: MDD) -> bool:
+    """Whether no two paths of the MDDs are free of conflicts with each other.
+
+    The pairs of cells the two agents can occupy together are swept level by
+    level, which is the joint MDD of the two agents without its dead ends; the
+    agents are dependent if the sweep dies out before both are at their goals.
+    """
+    if not mdd.levels or not other_mdd.levels:
+        return True
+    start_cell, other_start_cell = next(iter(mdd.levels[0])), next(iter(other_mdd.levels[0]))
+    if start_cell == other_start_cell:
+        return True
+    frontier = {(start_cell, other_start_cell)}
+    for time in range(max(len(mdd.levels), len(other_mdd.levels)) - 1):
+        next_frontier = set()
+        for cell, other_cell in frontier:
+            for next_cell in mdd.get_successors(cell, time):
+                for other_next_cell in other_mdd.get_successors(other_cell, time):
+                    # a swap meets the reverse move at the same time
+                    if next_cell == other_next_cell or (
+                        next_cell == other_cell and other_next_cell == cell and next_cell != cell
+                    ):
+                        continue
+                    next_frontier.add((next_cell, other_next_cell))
+        if not next_frontier:
+            return True
+        frontier = next_frontier
+    return False
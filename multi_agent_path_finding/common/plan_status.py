@@ -0,0 +1,53 @@
+import time
+from enum import Enum
+
+
+class PlanStatus(Enum):
+    """Outcome of the last ``plan`` call of a low-level planner.
+
+    A planner returns None whenever it does not find a path; its ``status``
+    tells a proof that no path exists apart from each exhausted budget.
+    """
+
+    SUCCESS = "success"
+    # the search space up to the safe horizon was exhausted, there is no path
+    NO_PATH = "no path"
+    EXPANSIONS_EXHAUSTED = "expansions exhausted"
+    TIME_STEPS_EXHAUSTED = "time steps exhausted"
+    DEADLINE_EXCEEDED = "deadline exceeded"
+
+
+class PlanBudget:
+    """Expansion, time-step and deadline budgets of the ``plan`` calls of a
+    low-level planner, and the status of the last call.
+
+    A planner sets the budgets from its constructor with ``init_budgets``,
+    resets ``num_of_expansions`` when a plan call starts and asks
+    ``is_budget_exhausted`` once per expansion.
+    """
+
+    def init_budgets(
+        self, max_expansions: int = None, max_time_step: int = None, deadline: float = None
+    ) -> None:
+        # optional budgets of a plan call, the deadline is a time.time() value
+        self.max_expansions = max_expansions
+        self.max_time_step = max_time_step
+        self.deadline = deadline
+        self.status: PlanStatus = None
+        self.num_of_expansions = 0
+
+    def is_budget_exhausted(self) -> bool:
+        # count the expansion and set the status if a budget has run out,
+        # the clock is only read every 64 expansions
+        self.num_of_expansions += 1
+        if self.max_expansions is not None and self.num_of_expansions > self.max_expansions:
+            self.status = PlanStatus.EXPANSIONS_EXHAUSTED
+            return True
+        if (
+            self.deadline is not None
+            and self.num_of_expansions & 63 == 1
+            and time.time() > self.deadline
+        ):
+            self.status = PlanStatus.DEADLINE_EXCEEDED
+            return True
+        return False
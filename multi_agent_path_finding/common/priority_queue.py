@@ -0,0 +1,113 @@
+import heapq
+from itertools import count
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+
+class PriorityQueue:
+    """Binary heap ordered by ``key(item)`` with lazy deletion.
+
+    Pushing an item that is already queued replaces its entry, which is how
+    decrease-key is done: the old entry stays in the heap marked as removed and
+    is skipped when it reaches the top. Ties on the key are broken by insertion
+    order so the pop order is deterministic.
+    """
+
+    def __init__(self, key: Callable[[Any], Tuple]):
+        self.key = key
+        self.heap: List[list] = []
+        self.entry_finder: Dict[Any, list] = {}
+        self.counter = count()
+
+    def push(self, item) -> None:
+        if item in self.entry_finder:
+            self.entry_finder.pop(item)[-1] = False
+        entry = [*self.key(item), next(self.counter), item, True]
+        self.entry_finder[item] = entry
+        heapq.heappush(self.heap, entry)
+
+    def pop(self):
+        while self.heap:
+            entry = heapq.heappop(self.heap)
+            if entry[-1]:
+                del self.entry_finder[entry[-2]]
+                return entry[-2]
+        raise KeyError("pop from an empty priority queue")
+
+    def peek(self):
+        while self.heap:
+            entry = self.heap[0]
+            if entry[-1]:
+                return entry[-2]
+            heapq.heappop(self.heap)
+        raise KeyError("peek from an empty priority queue")
+
+    def remove(self, item) -> None:
+        self.entry_finder.pop(item)[-1] = False
+
+    def get(self, item, default=None):
+        # return the queued item that is equal to the given one
+        entry = self.entry_finder.get(item)
+        return default if entry is None else entry[-2]
+
+    def clear(self) -> None:
+        self.heap.clear()
+        self.entry_finder.clear()
+
+    def __contains__(self, item) -> bool:
+        return item in self.entry_finder
+
+    def __len__(self) -> int:
+        return len(self.entry_finder)
+
+    def __iter__(self) -> Iterator:
+        return iter([entry[-2] for entry in self.entry_finder.values()])
+
+
+class BucketQueue(PriorityQueue):
+    """Bucket queue for small integer keys such as f-scores on unit-cost grids.
+
+    ``key(item)`` must return a tuple whose first element is an int. Items are
+    kept in one bucket per key and popped last-in first-out inside a bucket,
+    which favors the most recently generated (deepest) node among equal keys.
+    """
+
+    def __init__(self, key: Callable[[Any], Tuple]):
+        super().__init__(key)
+        self.buckets: Dict[int, List[list]] = {}
+        self.min_key = None
+
+    def push(self, item) -> None:
+        if item in self.entry_finder:
+            self.entry_finder.pop(item)[-1] = False
+        bucket_key = self.key(item)[0]
+        entry = [bucket_key, item, True]
+        self.entry_finder[item] = entry
+        self.buckets.setdefault(bucket_key, []).append(entry)
+        if self.min_key is None or bucket_key < self.min_key:
+            self.min_key = bucket_key
+
+    def pop(self):
+        entry = self.top_entry()
+        self.buckets[entry[0]].pop()
+        del self.entry_finder[entry[-2]]
+        return entry[-2]
+
+    def peek(self):
+        return self.top_entry()[-2]
+
+    def top_entry(self) -> list:
+        while self.entry_finder:
+            bucket = self.buckets.get(self.min_key)
+            while bucket:
+                if bucket[-1][-1]:
+                    return bucket[-1]
+                bucket.pop()
+            self.buckets.pop(self.min_key, None)
+            self.min_key += 1
+        self.clear()
+        raise KeyError("pop from an empty bucket queue")
+
+    def clear(self) -> None:
+        self.buckets.clear()
+        self.entry_finder.clear()
+        self.min_key = None
@@ -0,0 +1,74 @@
+from array import array
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+# events of a search trace
+EXPAND = 0
+GENERATE = 1
+
+# (event, cell, time, parent cell, parent time) of every recorded node
+RECORD_SIZE = 5
+
+
+class SearchTrace:
+    """Compact in-memory record of a space-time search for offline replay.
+
+    A planner given a trace appends one fixed-size integer record per expanded
+    node, which also moves it to the closed set, and one per generated node
+    with its parent, which puts it in the open set. Replaying the records in
+    order rebuilds the open and closed sets and the search tree at every
+    expansion, see ``visualizer/2d_sapf_visualizer.py``. Planners without a
+    trace only pay for an ``is None`` check per expansion.
+    """
+
+    def __init__(self, space_limit: List[int]):
+        self.space_limit = list(space_limit)
+        self.records = array("q")
+
+    def expand(self, node) -> None:
+        self.records.extend((EXPAND, node.cell, node.time, -1, -1))
+
+    def generate(self, node) -> None:
+        parent = node.parent
+        if parent is None:
+            self.records.extend((GENERATE, node.cell, node.time, -1, -1))
+        else:
+            self.records.extend((GENERATE, node.cell, node.time, parent.cell, parent.time))
+
+    def clear(self) -> None:
+        self.records = array("q")
+
+    def to_array(self) -> np.ndarray:
+        # one row per record, see RECORD_SIZE
+        return np.frombuffer(self.records, dtype=np.int64).reshape(-1, RECORD_SIZE)
+
+    def save(self, file) -> None:
+        np.savez_compressed(file, space_limit=self.space_limit, records=self.to_array())
+
+    @classmethod
+    def load(cls, file) -> "SearchTrace":
+        with np.load(file) as data:
+            trace = cls(data["space_limit"].tolist())
+            trace.records.frombytes(data["records"].astype(np.int64).tobytes())
+        return trace
+
+    def events(self) -> Iterator[Tuple[int, Tuple[int, ...], int, Tuple[int, ...], int]]:
+        # decoded records as (event, coordinates, time, parent coordinates, parent time),
+        # the parent coordinates are None for expansions and for the start node
+        records = self.to_array()
+        coordinates = np.stack(np.unravel_index(records[:, 1], self.space_limit), axis=1)
+        parent_coordinates = np.stack(
+            np.unravel_index(np.maximum(records[:, 3], 0), self.space_limit), axis=1
+        )
+        for record, point, parent_point in zip(
+            records.tolist(), coordinates.tolist(), parent_coordinates.tolist()
+        ):
+            event, _, time, _, parent_time = record
+            if event == EXPAND or parent_time < 0:
+                yield event, tuple(point), time, None, parent_time
+            else:
+                yield event, tuple(point), time, tuple(parent_point), parent_time
+
+    def __len__(self) -> int:
+        return len(self.records) // RECORD_SIZE
@@ -1,23 +1,78 @@
 from dataclasses import dataclass
-from typing import List, Tuple, Dict
+from typing import List, Tuple
 
 from multi_agent_path_finding.common.point import Point
-from multi_agent_path_finding.common.constraint import Constraint
+from multi_agent_path_finding.common.conflict import ConflictGraph
+from multi_agent_path_finding.common.constraint import Constraint, PositiveConstraint
 
 
-@dataclass
+# compared and hashed by the fingerprint of its constraint set, the focal list
+# orders the nodes by __lt__
+@dataclass(eq=False)
 class CTNode:
-    constraints: Dict[int, List[Constraint]]
+    # path references of all agents, shared with the parent except the replanned one
     solution: List[List[Tuple[Point, int]]]
     cost: int
     f_mins: List[int]
     lower_bound: int
     focal_heuristic: int
+    # conflicting agent pairs of the solution with their numbers of conflicts,
+    # see ConflictGraph
+    conflict_graph: ConflictGraph = None
+    # Zobrist fingerprint of the constraints of the node, see ZobristTable
+    fingerprint: int = 0
+    # the constraint added to the parent, None at the root; a positive one also
+    # constrains every other agent
+    constraint: Constraint = None
+    parent: "CTNode" = None
+
+    def __eq__(self, other):
+        return isinstance(other, CTNode) and self.fingerprint == other.fingerprint
+
+    def __hash__(self):
+        return self.fingerprint
 
     def __lt__(self, other):
         if self.focal_heuristic != other.focal_heuristic:
             return self.focal_heuristic < other.focal_heuristic
         return self.cost < other.cost
 
-    def __hash__(self):
-        return hash(str(self.solution))
+    def get_constraints(self, agent_id: int) -> List[Constraint]:
+        # constraints of the agent along the chain from the root to this node,
+        # with the ones implied by the positive constraints of other agents
+        constraints = []
+        node = self
+        while node is not None:
+            constraint = node.constraint
+            if constraint is not None:
+                if constraint.agent_id == agent_id:
+                    constraints.append(constraint)
+                elif isinstance(constraint, PositiveConstraint):
+                    constraints.extend(constraint.get_negative_constraints(agent_id)[::-1])
+            node = node.parent
+        return constraints[::-1]
+
+    def create_child(
+        self, constraint: Constraint, path: List[Tuple[Point, int]], f_min: int, fingerprint: int
+    ) -> "CTNode":
+        # only the replanned path is new
+        child = CTNode(
+            solution=self.solution.copy(),
+            cost=self.cost,
+            f_mins=self.f_mins.copy(),
+            lower_bound=self.lower_bound,
+            focal_heuristic=0,
+            fingerprint=fingerprint,
+            constraint=constraint,
+            parent=self,
+        )
+        child.replace_path(constraint.agent_id, path, f_min)
+        return child
+
+    def replace_path(self, agent_id: int, path: List[Tuple[Point, int]], f_min: int) -> None:
+        # the solution and f_mins lists belong to the node, the cost and the
+        # lower bound change by the differences
+        self.cost += len(path) - len(self.solution[agent_id])
+        self.lower_bound += f_min - self.f_mins[agent_id]
+        self.solution[agent_id] = path
+        self.f_mins[agent_id] = f_min
@@ -1,20 +1,25 @@
 import heapq
 import time
-from copy import deepcopy
-from itertools import combinations
-from typing import List, Tuple
+from typing import List, Set, Tuple
 
 from multi_agent_path_finding.common.conflict import (
     Conflict,
     VertexConflict,
     EdgeConflict,
+    ConflictGraph,
+    find_first_conflict,
 )
 from multi_agent_path_finding.common.constraint import (
     Constraint,
     VertexConstraint,
     EdgeConstraint,
+    PositiveConstraint,
+    PositiveEdgeConstraint,
+    PositiveVertexConstraint,
+    ZobristTable,
 )
 from multi_agent_path_finding.common.environment import Environment
+from multi_agent_path_finding.common.heuristic import TrueDistanceHeuristic
 from multi_agent_path_finding.common.point import Point
 from multi_agent_path_finding.ecbs.ct_node import CTNode
 from multi_agent_path_finding.stastar_epsilon.stastar_epsilon import (
@@ -29,23 +34,45 @@ class EnhancedConflictBasedSearch:
         goal_points: List[Point],
         env: Environment,
         w: float,
+        heuristic: TrueDistanceHeuristic = None,
+        disjoint_splitting: bool = False,
     ):
         # check if the length of start_points and goal_points are the same
         if len(start_points) != len(goal_points):
             raise ValueError(
                 f"Length of start_points and goal_points are not the same: {len(start_points)} != {len(goal_points)}"
             )
+        # a goal in another connected component would be searched for without end
+        for agent_id, (start_point, goal_point) in enumerate(zip(start_points, goal_points)):
+            if not env.is_reachable(start_point, goal_point):
+                raise ValueError(
+                    f"Goal point of agent {agent_id} is not reachable from its start: {start_point} -> {goal_point}"
+                )
 
         self.start_points = start_points
         self.goal_points = goal_points
         self.robot_num = len(start_points)
         self.env = env
         self.w = w
+        # optional true-distance heuristic shared by all individual planners
+        self.heuristic = heuristic
+        # split a conflict into a negative and a positive constraint of one of
+        # its agents, so the solutions of the children are disjoint
+        self.disjoint_splitting = disjoint_splitting
 
         self.open_set: List[CTNode] = list()
         self.focal_set: List[CTNode] = list()
+        # fingerprints of the constraint sets of the generated CT nodes
+        self.zobrist_table = ZobristTable()
+        self.fingerprints: Set[int] = set()
         self.individual_planners = [
-            SpaceTimeAstarEpsilon(start_point, goal_point, env, w)
+            SpaceTimeAstarEpsilon(
+                start_point,
+                goal_point,
+                env,
+                w,
+                distance_map=heuristic.get_distance_map(goal_point) if heuristic else None,
+            )
             for start_point, goal_point in zip(start_points, goal_points)
         ]
 
@@ -64,7 +91,6 @@ class EnhancedConflictBasedSearch:
     def plan(self):
         # generate root node
         root_node = CTNode(
-            constraints={},
             solution=[],
             cost=0,
             f_mins=[],
@@ -82,7 +108,8 @@ class EnhancedConflictBasedSearch:
 
         root_node.cost = self.calculate_cost(root_node.solution)
         root_node.lower_bound = sum(root_node.f_mins)
-        root_node.focal_heuristic = self.focal_heuristic(root_node.solution)
+        self.update_conflict_graph(root_node)
+        self.fingerprints = {root_node.fingerprint}
 
         # put root node into the priority queue
         heapq.heappush(self.open_set, root_node)
@@ -113,7 +140,7 @@ class EnhancedConflictBasedSearch:
             self.open_set.remove(cur_node)
 
             # find the first conflict
-            conflict = self.find_first_conflict(cur_node.solution)
+            conflict = self.find_first_conflict(cur_node)
 
             print(f"Conflict: {conflict}")
 
@@ -123,38 +150,28 @@ class EnhancedConflictBasedSearch:
 
             generate_start_time = time.time()
             # if there is a conflict, generate two child nodes
-            for agent_id in conflict.agent_ids:
-                # if the agent has already passed the conflict time, ignore it
-                if (type(conflict) == VertexConflict and len(cur_node.solution[agent_id]) <= conflict.time) or (
-                    type(conflict) == EdgeConflict and len(cur_node.solution[agent_id]) <= conflict.times[1]
-                ):
+            for new_constraint in self.generate_constraints(conflict):
+                # skip a branch whose constraint set another branch already reached
+                fingerprint = cur_node.fingerprint ^ self.zobrist_table.get_key(new_constraint)
+                if fingerprint in self.fingerprints:
                     continue
-                # generate child node from the current node
-                copy_start_time = time.time()
-                new_node = deepcopy(cur_node)
-                copy_avg_time += time.time() - copy_start_time
-
-                # generate constraint from the conflict
-                new_constraint = self.generate_constraint_from_conflict(agent_id, conflict)
-
-                # add constraint to the child node
-                new_node.constraints.setdefault(agent_id, []).append(new_constraint)
+                self.fingerprints.add(fingerprint)
 
                 plan_start_time = time.time()
-                # update reservation table
-                self.env.reservation_table = new_node.solution
-                self.env.reservation_table[agent_id] = []
-                # generate new path for the agent that has the conflict
-                result = self.individual_planners[agent_id].plan(constraints=new_node.constraints[agent_id])
-                if not result:
+                # generate child node from the current node, with its cost,
+                # f_mins, lower_bound, and focal_heuristic
+                copy_start_time = time.time()
+                agent_id = new_constraint.agent_id
+                new_node = cur_node.create_child(
+                    new_constraint,
+                    cur_node.solution[agent_id],
+                    cur_node.f_mins[agent_id],
+                    fingerprint,
+                )
+                copy_avg_time += time.time() - copy_start_time
+                # generate new paths for the agents under the constraints of the child node
+                if not self.replan(new_node):
                     continue
-                new_node.solution[agent_id], new_f_min = result
-
-                # update cost, f_mins, lower_bound, and focal_heuristic
-                new_node.cost = self.calculate_cost(new_node.solution)
-                new_node.f_mins[agent_id] = new_f_min
-                new_node.lower_bound = sum(new_node.f_mins)
-                new_node.focal_heuristic = self.focal_heuristic(new_node.solution)
 
                 # add the child node to the open set
                 heapq.heappush(self.open_set, new_node)
@@ -172,16 +189,35 @@ class EnhancedConflictBasedSearch:
             print(f"Generate avg time: {generate_avg_time / ct_size}")
         return None
 
+    def generate_constraints(self, conflict: Conflict) -> List[Constraint]:
+        # one constraint per child node
+        if not self.disjoint_splitting:
+            return [
+                self.generate_constraint_from_conflict(agent_id, conflict)
+                for agent_id in conflict.agent_ids
+            ]
+        # the first agent avoids the conflict in one child and takes part in it
+        # in the other, where the other agents avoid it
+        agent_id = conflict.agent_ids[0]
+        return [
+            self.generate_constraint_from_conflict(agent_id, conflict),
+            self.generate_constraint_from_conflict(agent_id, conflict, positive=True),
+        ]
+
     @staticmethod
-    def generate_constraint_from_conflict(agent_id: int, conflict: Conflict) -> Constraint:
+    def generate_constraint_from_conflict(
+        agent_id: int, conflict: Conflict, positive: bool = False
+    ) -> Constraint:
         if isinstance(conflict, VertexConflict):
-            return VertexConstraint(
+            constraint_class = PositiveVertexConstraint if positive else VertexConstraint
+            return constraint_class(
                 agent_id=agent_id,
                 point=conflict.point,
                 time=conflict.time,
             )
         elif isinstance(conflict, EdgeConflict):
-            return EdgeConstraint(
+            constraint_class = PositiveEdgeConstraint if positive else EdgeConstraint
+            return constraint_class(
                 agent_id=agent_id,
                 points=conflict.points[agent_id],
                 times=conflict.times,
@@ -189,12 +225,31 @@ class EnhancedConflictBasedSearch:
         else:
             raise ValueError(f"Unknown conflict type: {type(conflict)}")
 
-    @staticmethod
-    def get_state(agent_id: int, time: int, solution: List[List[Tuple[Point, int]]]):
-        if time >= len(solution[agent_id]):
-            return solution[agent_id][-1][0]
+    def replan(self, node: CTNode) -> bool:
+        # replan the agents whose paths break the constraint added to the node,
+        # False if one of them has no path left
+        constraint = node.constraint
+        if isinstance(constraint, PositiveConstraint):
+            # the constrained agent already takes part in the conflict
+            agent_ids = [
+                agent_id
+                for agent_id, path in enumerate(node.solution)
+                if agent_id != constraint.agent_id and constraint.is_violated_by(path)
+            ]
         else:
-            return solution[agent_id][time][0]
+            agent_ids = [constraint.agent_id]
+        for agent_id in agent_ids:
+            # update reservation table, the paths of the node stay untouched
+            self.env.reservation_table = node.solution.copy()
+            self.env.reservation_table[agent_id] = []
+            result = self.individual_planners[agent_id].plan(
+                constraints=node.get_constraints(agent_id)
+            )
+            if not result:
+                return False
+            node.replace_path(agent_id, *result)
+        self.update_conflict_graph(node, agent_ids)
+        return True
 
     def calculate_cost(self, solution: List[List[Tuple[Point, int]]]) -> int:
         cost = 0
@@ -202,65 +257,28 @@ class EnhancedConflictBasedSearch:
             cost += len(solution[i]) - 1
         return cost
 
-    def find_first_conflict(self, solution: List[List[Tuple[Point, int]]]) -> Conflict:
-        # Vertex Conflict
-        for agent1, agent2 in combinations(range(self.robot_num), 2):
-            max_time = max(len(solution[agent1]), len(solution[agent2]))
-            for time in range(1, max_time):
-                point1 = self.get_state(agent1, time, solution)
-                point2 = self.get_state(agent2, time, solution)
-                if point1 == point2:
-                    return VertexConflict(
-                        agent_ids=[agent1, agent2],
-                        point=point1,
-                        time=time,
-                    )
-
-                prev_point1 = self.get_state(agent1, time - 1, solution)
-                next_point1 = self.get_state(agent1, time, solution)
-                prev_point2 = self.get_state(agent2, time - 1, solution)
-                next_point2 = self.get_state(agent2, time, solution)
-
-                if prev_point1 == next_point2 and prev_point2 == next_point1:
-                    return EdgeConflict(
-                        agent_ids=[agent1, agent2],
-                        points={
-                            agent1: (prev_point1, next_point1),
-                            agent2: (prev_point2, next_point2),
-                        },
-                        times=(time - 1, time),
-                    )
-
-    def focal_heuristic(self, solution: List[List[Tuple[Point, int]]]) -> int:
-        num_of_conflicts = 0
-        for agent1, agent2 in combinations(range(self.robot_num), 2):
-            max_time = max(len(solution[agent1]), len(solution[agent2]))
-            for time in range(1, max_time):
-                point1 = self.get_state(agent1, time, solution)
-                point2 = self.get_state(agent2, time, solution)
-                if point1 == point2:
-                    num_of_conflicts += 1
-
-                prev_point1 = self.get_state(agent1, time - 1, solution)
-                next_point1 = self.get_state(agent1, time, solution)
-                prev_point2 = self.get_state(agent2, time - 1, solution)
-                next_point2 = self.get_state(agent2, time, solution)
-
-                if prev_point1 == next_point2 and prev_point2 == next_point1:
-                    num_of_conflicts += 1
-
-        return num_of_conflicts
+    def find_first_conflict(self, node: CTNode) -> Conflict | None:
+        # the earliest conflict lies between the agents of the earliest conflicting pair
+        pair = node.conflict_graph.get_first_pair()
+        if pair is None:
+            return None
+        return find_first_conflict(node.solution, self.env.point_to_cell, agent_ids=pair)
+
+    def update_conflict_graph(self, node: CTNode, agent_ids: List[int] = None) -> None:
+        # the root compares all paths, a child only the replanned ones, by
+        # default the path of the agent of its constraint
+        if node.parent is None:
+            node.conflict_graph = ConflictGraph.from_solution(node.solution, self.env.point_to_cell)
+        else:
+            if agent_ids is None:
+                agent_ids = [node.constraint.agent_id]
+            node.conflict_graph = node.parent.conflict_graph
+            for agent_id in agent_ids:
+                node.conflict_graph = node.conflict_graph.replace_path(
+                    agent_id, node.solution[agent_id], self.env.point_to_cell
+                )
+        # number of conflicts over all agent pairs and times
+        node.focal_heuristic = node.conflict_graph.num_of_conflicts
 
     def is_valid_point(self, point: Point, time: int) -> bool:
-        if not self.is_valid_space(point):
-            return False
-        for obstacle in self.env.obstacles:
-            if obstacle.is_colliding(point=point, time=time):
-                return False
-        return True
-
-    def is_valid_space(self, point: Point) -> bool:
-        for i, coordinate in enumerate(point.__dict__.values()):
-            if coordinate < 0 or coordinate >= self.env.space_limit[i]:
-                return False
-        return True
+        return self.env.is_free(point) and not self.env.is_blocked(point, time)
@@ -0,0 +1,3 @@
+from multi_agent_path_finding.jps.jps import JumpPointSearch
+
+__all__ = ["JumpPointSearch"]
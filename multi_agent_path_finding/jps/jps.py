@@ -0,0 +1,316 @@
+import math
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+
+from multi_agent_path_finding.common.constraint import Constraint, ConstraintTable
+from multi_agent_path_finding.common.environment import Environment
+from multi_agent_path_finding.common.heuristic import UNREACHABLE, DistanceMapHeuristic
+from multi_agent_path_finding.common.plan_status import PlanBudget, PlanStatus
+from multi_agent_path_finding.common.point import Point
+from multi_agent_path_finding.common.priority_queue import BucketQueue, PriorityQueue
+from multi_agent_path_finding.common.search_trace import SearchTrace
+from multi_agent_path_finding.jps.node import Node
+
+# result of a jump that runs into an obstacle or the border of the space
+DEAD_END = -1
+
+
+class JumpPointSearch(DistanceMapHeuristic, PlanBudget):
+    """Space-time A* that jumps over the static part of the search.
+
+    Until the latest constrained time and the last change of the dynamic
+    obstacles the search takes ordinary space-time steps. From then on the
+    map is static and the search continues with Jump Point Search for
+    4-connected grids, generalized to the 6-connected 3D grid: the axes are
+    ordered, a jump along an axis stops at the goal, at a cell with a forced
+    neighbor along an outer axis, or at a cell from which a jump along an
+    inner axis finds a jump point, and only the canonical moves of a jump
+    point are expanded. Jumps only depend on the static obstacles and the
+    goal, so they are cached across plan calls. Paths and costs are the ones
+    of SpaceTimeAstar.
+    """
+
+    def __init__(
+        self,
+        start_point: Point,
+        goal_point: Point,
+        env: Environment,
+        bucket_queue: bool = False,
+        distance_map: np.ndarray = None,
+        trace: SearchTrace = None,
+        max_expansions: int = None,
+        max_time_step: int = None,
+        deadline: float = None,
+    ):
+        self.env = env
+        self.start_point = start_point
+        self.goal_point = goal_point
+        self.init_heuristic(distance_map)
+        # optional recorder of the expansions for offline replay
+        self.trace = trace
+        self.init_budgets(max_expansions, max_time_step, deadline)
+        # a bucket queue is enough for unit-cost grids with integer f-scores
+        self.bucket_queue = bucket_queue
+        # a cell blocked at the last change of the dynamic obstacles is blocked
+        # for good and is an obstacle to the jumps
+        self.static_obstacle_time = max(env.dynamic_obstacle_index.latest_time, 0)
+        # jump point or DEAD_END of every (cell, axis, sign) jump made so far
+        self.jump_points: Dict[Tuple[int, int, int], int] = {}
+        if env.dimension != len(start_point.__dict__.keys()):
+            raise ValueError(f"Dimension does not match the length of start: {start_point}")
+        if env.dimension != len(goal_point.__dict__.keys()):
+            raise ValueError(f"Dimension does not match the length of goal: {goal_point}")
+        if not self.is_valid_point(start_point, 0):
+            raise ValueError(f"Start point is not valid: {start_point}")
+        if not self.is_valid_point(goal_point, 0):
+            raise ValueError(f"Goal point is not valid: {goal_point}")
+        self.start_cell = env.point_to_cell(start_point)
+        self.goal_cell = env.point_to_cell(goal_point)
+
+    def plan(
+        self, constraints: List[Constraint] | ConstraintTable = None
+    ) -> List[Tuple[Point, int]] | None:
+        # the goal lies in another connected component of the free space
+        if not self.env.is_reachable_cell(self.start_cell, self.goal_cell):
+            self.status = PlanStatus.NO_PATH
+            return None
+        # index the constraints by cell once for the whole search
+        constraint_table = ConstraintTable.from_constraints(constraints, self.env.point_to_cell)
+        trace = self.trace
+        # nodes after the horizon are not expanded, see Environment.get_safe_horizon
+        horizon = self.env.get_safe_horizon(
+            constraint_table.latest_time, self.goal_cell, self.max_distance
+        )
+        is_time_step_limited = self.max_time_step is not None and self.max_time_step < horizon
+        if is_time_step_limited:
+            horizon = self.max_time_step
+        is_horizon_reached = False
+        # an agent at the goal from this time on may stay there for good
+        goal_time = self.env.get_goal_time(
+            self.goal_cell, constraint_table.get_latest_time(self.goal_cell)
+        )
+        if goal_time == math.inf:
+            self.status = PlanStatus.NO_PATH
+            return None
+        self.num_of_expansions = 0
+        # from this time on neither the map, the constraints nor the goal test
+        # change, the search jumps and the cells are closed regardless of time
+        static_time = max(
+            constraint_table.latest_time, self.env.dynamic_obstacle_index.latest_time, goal_time
+        )
+        static_closed_set: Dict[int, int] = {}
+        # ties on f are broken towards the node closer to the goal
+        open_list = (BucketQueue if self.bucket_queue else PriorityQueue)(
+            key=lambda node: (node.f_score, node.h_score)
+        )
+        closed_set: Set[Node] = set()
+        start_node = Node(self.start_cell, 0)
+        start_node.h_score = self.heuristic(start_node)
+        start_node.f_score = start_node.g_score + start_node.h_score
+        if start_node.h_score == UNREACHABLE:
+            self.status = PlanStatus.NO_PATH
+            return None
+        open_list.push(start_node)
+        if trace is not None:
+            trace.generate(start_node)
+        while open_list:
+            current = open_list.pop()
+            if trace is not None:
+                trace.expand(current)
+            if current.cell == self.goal_cell and current.time >= goal_time:
+                self.status = PlanStatus.SUCCESS
+                return self.reconstruct_path(current)
+            if current.time < static_time:
+                closed_set.add(current)
+            elif current.cell in static_closed_set:
+                continue
+            else:
+                static_closed_set[current.cell] = current.time
+                if self.distance_view is not None:
+                    # the rest is a static shortest path along the exact distances
+                    goal_node = self.follow_distance_map(current)
+                    if goal_node is not None:
+                        self.status = PlanStatus.SUCCESS
+                        return self.reconstruct_path(goal_node)
+            if current.time >= horizon:
+                is_horizon_reached = True
+                continue
+            if self.is_budget_exhausted():
+                return None
+            if current.time < static_time:
+                neighbors = self.get_neighbors(current, constraint_table)
+            else:
+                neighbors = self.get_jump_points(current)
+            for neighbor in neighbors:
+                if neighbor.time < static_time:
+                    if neighbor in closed_set:
+                        continue
+                elif neighbor.cell in static_closed_set:
+                    continue
+                if neighbor.time > horizon:
+                    is_horizon_reached = True
+                    continue
+
+                g_score = neighbor.time
+                queued = open_list.get(neighbor)
+                if queued is not None:
+                    if g_score > queued.g_score:
+                        continue
+                    if g_score == queued.g_score:
+                        # reached by two jumps at once, keep all the moves
+                        if queued.axis != neighbor.axis or queued.sign != neighbor.sign:
+                            queued.axis, queued.sign = -1, 0
+                        continue
+                    queued.axis, queued.sign = neighbor.axis, neighbor.sign
+                    neighbor = queued
+
+                # push the new node, or re-push the queued one with a lower key
+                neighbor.parent = current
+                neighbor.g_score = g_score
+                neighbor.h_score = self.heuristic(neighbor)
+                if neighbor.h_score == UNREACHABLE:
+                    continue
+                neighbor.f_score = neighbor.g_score + neighbor.h_score
+                open_list.push(neighbor)
+                if trace is not None:
+                    trace.generate(neighbor)
+
+        if is_time_step_limited and is_horizon_reached:
+            self.status = PlanStatus.TIME_STEPS_EXHAUSTED
+        else:
+            self.status = PlanStatus.NO_PATH
+        return None
+
+    def follow_distance_map(self, node: Node) -> Node | None:
+        # descend the distance map from the node to the goal, None if a cell on
+        # the way is blocked by a dynamic obstacle for good
+        indptr, indices = self.env.get_adjacency()
+        is_blocked = self.env.dynamic_obstacle_index.is_blocked
+        while node.cell != self.goal_cell:
+            next_distance = self.distance_view[node.cell] - 1
+            for neighbor_cell in indices[indptr[node.cell] : indptr[node.cell + 1]]:
+                if self.distance_view[neighbor_cell] == next_distance and not is_blocked(
+                    neighbor_cell, node.time + 1
+                ):
+                    break
+            else:
+                return None
+            next_node = Node(neighbor_cell, node.time + 1)
+            next_node.parent = node
+            node = next_node
+        return node
+
+    def reconstruct_path(self, node: Node) -> List[Tuple[Point, int]]:
+        # a jump is a straight line, its cells are filled in one step at a time
+        path: List[Tuple[Point, int]] = [(self.env.cell_to_point(node.cell), node.time)]
+        while node.parent is not None:
+            parent = node.parent
+            step = (node.cell - parent.cell) // (node.time - parent.time)
+            for cell_time in range(node.time - 1, parent.time - 1, -1):
+                cell = parent.cell + step * (cell_time - parent.time)
+                path.append((self.env.cell_to_point(cell), cell_time))
+            node = parent
+        return path[::-1]
+
+    def get_neighbors(self, node: Node, constraint_table: ConstraintTable) -> List[Node]:
+        neighbors: List[Node] = []
+        next_time = node.time + 1
+        is_blocked = self.env.dynamic_obstacle_index.is_blocked
+        # move and wait actions from the shared adjacency of the free cells
+        indptr, indices = self.env.get_adjacency()
+        for neighbor_cell in indices[indptr[node.cell] : indptr[node.cell + 1]]:
+            if is_blocked(neighbor_cell, next_time):
+                continue
+            if constraint_table and not self.is_valid_given_constraints(
+                node.cell, neighbor_cell, node.time, next_time, constraint_table
+            ):
+                continue
+            neighbors.append(Node(neighbor_cell, next_time))
+
+        return neighbors
+
+    def get_jump_points(self, node: Node) -> List[Node]:
+        # jump along the canonical moves of the node: straight on, every inner
+        # axis, and the outer axes with a forced neighbor
+        if node.axis < 0:
+            moves = [(axis, sign) for axis in range(self.env.dimension) for sign in (1, -1)]
+        else:
+            moves = [(node.axis, node.sign)]
+            behind = node.cell - node.sign * self.env.strides[node.axis]
+            for axis in range(node.axis):
+                for sign in (1, -1):
+                    if self.can_move(node.cell, axis, sign) and not self.can_move(
+                        behind, axis, sign
+                    ):
+                        moves.append((axis, sign))
+            for axis in range(node.axis + 1, self.env.dimension):
+                moves += [(axis, 1), (axis, -1)]
+
+        jump_points: List[Node] = []
+        for axis, sign in moves:
+            jump_point = self.jump(node.cell, axis, sign)
+            if jump_point == DEAD_END:
+                continue
+            distance = abs(jump_point - node.cell) // self.env.strides[axis]
+            jump_points.append(Node(jump_point, node.time + distance, axis=axis, sign=sign))
+        return jump_points
+
+    def jump(self, cell: int, axis: int, sign: int) -> int:
+        # first jump point from the cell along the axis, DEAD_END if none
+        key = (cell, axis, sign)
+        jump_point = self.jump_points.get(key)
+        if jump_point is not None:
+            return jump_point
+
+        step = sign * self.env.strides[axis]
+        jump_point = DEAD_END
+        next_cell = cell
+        while self.can_move(next_cell, axis, sign):
+            behind = next_cell
+            next_cell += step
+            if next_cell == self.goal_cell or self.is_jump_point(next_cell, behind, axis):
+                jump_point = next_cell
+                break
+        self.jump_points[key] = jump_point
+        return jump_point
+
+    def is_jump_point(self, cell: int, behind: int, axis: int) -> bool:
+        for other_axis in range(self.env.dimension):
+            if other_axis == axis:
+                continue
+            for sign in (1, -1):
+                if other_axis < axis:
+                    # a forced neighbor is not reachable from the cell behind
+                    if self.can_move(cell, other_axis, sign) and not self.can_move(
+                        behind, other_axis, sign
+                    ):
+                        return True
+                elif self.jump(cell, other_axis, sign) != DEAD_END:
+                    return True
+        return False
+
+    def can_move(self, cell: int, axis: int, sign: int) -> bool:
+        # the next cell along the axis is inside of the space, free and not
+        # blocked for good by a dynamic obstacle
+        stride = self.env.strides[axis]
+        coordinate = cell // stride % self.env.space_limit[axis] + sign
+        if coordinate < 0 or coordinate >= self.env.space_limit[axis]:
+            return False
+        next_cell = cell + sign * stride
+        return self.env.is_free_cell(next_cell) and not self.env.dynamic_obstacle_index.is_blocked(
+            next_cell, self.static_obstacle_time
+        )
+
+    def is_valid_point(self, point: Point, time: int) -> bool:
+        return self.env.is_free(point) and not self.env.is_blocked(point, time)
+
+    @staticmethod
+    def is_valid_given_constraints(
+        prev_cell: int,
+        next_cell: int,
+        prev_time: int,
+        next_time: int,
+        constraint_table: ConstraintTable,
+    ) -> bool:
+        return not constraint_table.is_constrained(prev_cell, next_cell, prev_time, next_time)
@@ -0,0 +1,28 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class Node:
+    # flat cell index, see Environment.point_to_cell
+    cell: int
+    time: int
+    g_score: int = 0
+    h_score: int = 0
+    f_score: int = 0
+    parent: "Node" = None
+    # axis and sign of the jump that reached the node, -1 and 0 if the node
+    # was reached by a space-time step and none of its moves are pruned
+    axis: int = -1
+    sign: int = 0
+
+    def __lt__(self, other):
+        return self.f_score < other.f_score
+
+    def __hash__(self):
+        # an int hashes to itself, cheaper than hashing a tuple
+        return self.time << 32 | self.cell
+
+    def __eq__(self, other):
+        if isinstance(other, Node):
+            return self.cell == other.cell and self.time == other.time
+        return False
@@ -0,0 +1,3 @@
+from multi_agent_path_finding.od_astar.od_astar import OperatorDecompositionAstar
+
+__all__ = ["OperatorDecompositionAstar"]
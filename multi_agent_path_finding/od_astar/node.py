@@ -0,0 +1,46 @@
+from dataclasses import dataclass
+from typing import Tuple
+
+
+@dataclass(eq=False)
+class Node:
+    # flat cells of the agents at the time, see Environment.point_to_cell
+    cells: Tuple[int, ...]
+    time: int
+    # next cells of the agents that have moved already, the agents move one at
+    # a time and a standard node, where every agent is at the time, has none
+    next_cells: Tuple[int, ...] = ()
+    # time from which every agent is at its goal, -1 if it is not there
+    arrival_times: Tuple[int, ...] = ()
+    # the time as far as the identity of the node goes, the search stops
+    # counting it once nothing changes any more
+    state_time: int = 0
+    g_score: int = 0
+    h_score: int = 0
+    f_score: int = 0
+    parent: "Node" = None
+
+    def __post_init__(self):
+        # the arrival times count back from the time of the node, so two nodes
+        # after the static time match only if their agents have waited at their
+        # goals equally long, and the earlier one dominates the later one
+        self.key = (
+            self.cells,
+            self.next_cells,
+            self.state_time,
+            tuple(
+                arrival_time - self.time if arrival_time >= 0 else None
+                for arrival_time in self.arrival_times
+            ),
+        )
+
+    def __lt__(self, other):
+        return self.f_score < other.f_score
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __eq__(self, other):
+        if isinstance(other, Node):
+            return self.key == other.key
+        return False
@@ -0,0 +1,232 @@
+import math
+from typing import List, Set, Tuple
+
+import numpy as np
+
+from multi_agent_path_finding.common.constraint import Constraint, ConstraintTable
+from multi_agent_path_finding.common.environment import Environment
+from multi_agent_path_finding.common.heuristic import UNREACHABLE, get_distance_view
+from multi_agent_path_finding.common.plan_status import PlanBudget, PlanStatus
+from multi_agent_path_finding.common.point import Point
+from multi_agent_path_finding.common.priority_queue import PriorityQueue
+from multi_agent_path_finding.od_astar.node import Node
+
+
+class OperatorDecompositionAstar(PlanBudget):
+    """Joint space-time A* of a group of agents with operator decomposition.
+
+    The agents are planned together for the least sum of costs, so their
+    paths are free of conflicts with each other. A joint move is split into
+    one move per agent, and the agents that have moved are kept in an
+    intermediate node. A node thus has at most as many successors as a cell
+    has neighbors, instead of that number to the power of the group size.
+    The cost of an agent is the time from which it stays at its goal for good.
+    Waiting at the goal is only charged once the agent leaves it again, which
+    is why the arrival times are part of the state.
+    """
+
+    def __init__(
+        self,
+        start_points: List[Point],
+        goal_points: List[Point],
+        env: Environment,
+        distance_maps: List[np.ndarray] = None,
+        max_expansions: int = None,
+        deadline: float = None,
+    ):
+        if len(start_points) != len(goal_points):
+            raise ValueError(
+                f"Length of start_points and goal_points are not the same: {len(start_points)} != {len(goal_points)}"
+            )
+        self.env = env
+        self.start_points = start_points
+        self.goal_points = goal_points
+        # exact static distances to the goal of every agent, see TrueDistanceHeuristic
+        self.distance_views = (
+            None
+            if distance_maps is None
+            else [get_distance_view(distance_map) for distance_map in distance_maps]
+        )
+        # without budgets a group with no joint plan may be searched for long
+        self.init_budgets(max_expansions, deadline=deadline)
+        for start_point, goal_point in zip(start_points, goal_points):
+            if env.dimension != len(start_point.__dict__.keys()):
+                raise ValueError(f"Dimension does not match the length of start: {start_point}")
+            if env.dimension != len(goal_point.__dict__.keys()):
+                raise ValueError(f"Dimension does not match the length of goal: {goal_point}")
+            if not self.is_valid_point(start_point, 0):
+                raise ValueError(f"Start point is not valid: {start_point}")
+            if not self.is_valid_point(goal_point, 0):
+                raise ValueError(f"Goal point is not valid: {goal_point}")
+        self.start_cells = tuple(env.point_to_cell(point) for point in start_points)
+        self.goal_cells = tuple(env.point_to_cell(point) for point in goal_points)
+
+    def plan(
+        self, constraints: List[List[Constraint] | ConstraintTable] = None
+    ) -> List[List[Tuple[Point, int]]] | None:
+        # one path per agent, the constraints are given per agent as well
+        num_of_agents = len(self.start_cells)
+        if constraints is None:
+            constraints = [None] * num_of_agents
+        if not all(map(self.env.is_reachable_cell, self.start_cells, self.goal_cells)):
+            self.status = PlanStatus.NO_PATH
+            return None
+        constraint_tables = [
+            ConstraintTable.from_constraints(agent_constraints, self.env.point_to_cell)
+            for agent_constraints in constraints
+        ]
+        # every agent at its goal from this time on may stay there for good
+        goal_time = max(
+            self.env.get_goal_time(goal_cell, constraint_table.get_latest_time(goal_cell))
+            for goal_cell, constraint_table in zip(self.goal_cells, constraint_tables)
+        )
+        if goal_time == math.inf:
+            self.status = PlanStatus.NO_PATH
+            return None
+        # from this time on nothing changes, so a later node with the same
+        # cells and waits at the goals is dominated and the time is not counted
+        static_time = max(
+            [constraint_table.latest_time for constraint_table in constraint_tables]
+            + [self.env.dynamic_obstacle_index.latest_time, goal_time]
+        )
+        # after the static time an optimal plan never repeats the cells of all
+        # agents, as cutting out the loop lowers its cost, so its goal node is
+        # no later than one step per arrangement of the agents on the free cells
+        horizon = static_time + math.perm(self.env.num_of_free_cells, num_of_agents) - 1
+        self.num_of_expansions = 0
+        is_blocked = self.env.dynamic_obstacle_index.is_blocked
+        indptr, indices = self.env.get_adjacency()
+        # ties on f are broken towards the node closer to the goals
+        open_list = PriorityQueue(key=lambda node: (node.f_score, node.h_score))
+        closed_set: Set[Node] = set()
+
+        start_node = Node(
+            self.start_cells,
+            0,
+            arrival_times=tuple(
+                0 if start_cell == goal_cell else -1
+                for start_cell, goal_cell in zip(self.start_cells, self.goal_cells)
+            ),
+        )
+        start_node.h_score = sum(map(self.heuristic, range(num_of_agents), self.start_cells))
+        start_node.f_score = start_node.h_score
+        open_list.push(start_node)
+        while open_list:
+            current = open_list.pop()
+            if (
+                not current.next_cells
+                and current.cells == self.goal_cells
+                and current.time >= goal_time
+            ):
+                self.status = PlanStatus.SUCCESS
+                return self.reconstruct_paths(current)
+            closed_set.add(current)
+            if current.time >= horizon:
+                continue
+            if self.is_budget_exhausted():
+                return None
+
+            # the next agent moves, the ones before it have moved already
+            agent_id = len(current.next_cells)
+            cell = current.cells[agent_id]
+            goal_cell = self.goal_cells[agent_id]
+            arrival_time = current.arrival_times[agent_id]
+            next_time = current.time + 1
+            for next_cell in indices[indptr[cell] : indptr[cell + 1]]:
+                if is_blocked(next_cell, next_time):
+                    continue
+                if constraint_tables[agent_id].is_constrained(
+                    cell, next_cell, current.time, next_time
+                ):
+                    continue
+                if self.is_conflicting(current, cell, next_cell):
+                    continue
+                h_score = self.heuristic(agent_id, next_cell)
+                if h_score == UNREACHABLE:
+                    continue
+
+                # the waits at the goal are charged once the agent leaves it
+                if arrival_time >= 0:
+                    cost = 0 if next_cell == cell else next_time - arrival_time
+                else:
+                    cost = 1
+                next_arrival_time = arrival_time if next_cell == cell else -1
+                if next_cell == goal_cell and arrival_time < 0:
+                    next_arrival_time = next_time
+                arrival_times = (
+                    current.arrival_times[:agent_id]
+                    + (next_arrival_time,)
+                    + current.arrival_times[agent_id + 1 :]
+                )
+                if agent_id + 1 < num_of_agents:
+                    successor = Node(
+                        current.cells,
+                        current.time,
+                        next_cells=current.next_cells + (next_cell,),
+                        arrival_times=arrival_times,
+                        state_time=current.state_time,
+                    )
+                else:
+                    successor = Node(
+                        current.next_cells + (next_cell,),
+                        next_time,
+                        arrival_times=arrival_times,
+                        state_time=min(next_time, static_time),
+                    )
+                if successor in closed_set:
+                    continue
+
+                g_score = current.g_score + cost
+                queued = open_list.get(successor)
+                if queued is not None and g_score >= queued.g_score:
+                    continue
+
+                # push the new node, which replaces a queued one that matches
+                # it, as the queued one may be at another time
+                successor.parent = current
+                successor.g_score = g_score
+                successor.h_score = current.h_score - self.heuristic(agent_id, cell) + h_score
+                successor.f_score = successor.g_score + successor.h_score
+                open_list.push(successor)
+
+        self.status = PlanStatus.NO_PATH
+        return None
+
+    @staticmethod
+    def is_conflicting(node: Node, cell: int, next_cell: int) -> bool:
+        # the move meets an agent that has moved already at its next cell, or
+        # swaps cells with it
+        for other_cell, other_next_cell in zip(node.cells, node.next_cells):
+            if other_next_cell == next_cell:
+                return True
+            if other_next_cell == cell and other_cell == next_cell and next_cell != cell:
+                return True
+        return False
+
+    def heuristic(self, agent_id: int, cell: int) -> int:
+        if self.distance_views is not None:
+            # return true distance, UNREACHABLE if the goal cannot be reached
+            return self.distance_views[agent_id][cell]
+        # return manhattan distance
+        return self.env.manhattan_distance(cell, self.goal_cells[agent_id])
+
+    def reconstruct_paths(self, node: Node) -> List[List[Tuple[Point, int]]]:
+        # the cells of the standard nodes from the start, every path ends when
+        # its agent arrives at its goal for good
+        cells_by_time: List[Tuple[int, ...]] = []
+        arrival_times = node.arrival_times
+        while node is not None:
+            if not node.next_cells:
+                cells_by_time.append(node.cells)
+            node = node.parent
+        cells_by_time.reverse()
+        return [
+            [
+                (self.env.cell_to_point(cells[agent_id]), time_step)
+                for time_step, cells in enumerate(cells_by_time[: arrival_time + 1])
+            ]
+            for agent_id, arrival_time in enumerate(arrival_times)
+        ]
+
+    def is_valid_point(self, point: Point, time: int) -> bool:
+        return self.env.is_free(point) and not self.env.is_blocked(point, time)
@@ -0,0 +1,3 @@
+from multi_agent_path_finding.sipp.sipp import SafeIntervalPathPlanning
+
+__all__ = ["SafeIntervalPathPlanning"]
@@ -0,0 +1,27 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class Node:
+    # flat cell index, see Environment.point_to_cell
+    cell: int
+    # index of the safe interval of the cell, see SafeIntervalPathPlanning.get_safe_intervals
+    interval: int
+    # earliest arrival time in the interval
+    time: int
+    g_score: int = 0
+    h_score: int = 0
+    f_score: int = 0
+    parent: "Node" = None
+
+    def __lt__(self, other):
+        return self.f_score < other.f_score
+
+    def __hash__(self):
+        # an int hashes to itself, cheaper than hashing a tuple
+        return self.interval << 32 | self.cell
+
+    def __eq__(self, other):
+        if isinstance(other, Node):
+            return self.cell == other.cell and self.interval == other.interval
+        return False
@@ -0,0 +1,234 @@
+import math
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+
+from multi_agent_path_finding.common.constraint import Constraint, ConstraintTable
+from multi_agent_path_finding.common.environment import Environment
+from multi_agent_path_finding.common.heuristic import UNREACHABLE, DistanceMapHeuristic
+from multi_agent_path_finding.common.plan_status import PlanBudget, PlanStatus
+from multi_agent_path_finding.common.point import Point
+from multi_agent_path_finding.common.priority_queue import BucketQueue, PriorityQueue
+from multi_agent_path_finding.common.search_trace import SearchTrace
+from multi_agent_path_finding.sipp.node import Node
+
+
+class SafeIntervalPathPlanning(DistanceMapHeuristic, PlanBudget):
+    """Safe Interval Path Planning with the contract of SpaceTimeAstar.
+
+    The free times of every cell are collapsed into maximal safe intervals.
+    They are cut by the dynamic obstacles, by the vertex and wait-edge
+    constraints of the agent, and by its positive constraints on other
+    cells. A search state is a (cell, interval) pair reached at its earliest
+    arrival time. Waiting inside an interval is implicit, so the search grows
+    one state per interval instead of one per (cell, time) and returns the
+    same optimal paths.
+    """
+
+    def __init__(
+        self,
+        start_point: Point,
+        goal_point: Point,
+        env: Environment,
+        bucket_queue: bool = False,
+        distance_map: np.ndarray = None,
+        trace: SearchTrace = None,
+        max_expansions: int = None,
+        max_time_step: int = None,
+        deadline: float = None,
+    ):
+        self.env = env
+        self.start_point = start_point
+        self.goal_point = goal_point
+        self.init_heuristic(distance_map)
+        # optional recorder of the expansions for offline replay
+        self.trace = trace
+        self.init_budgets(max_expansions, max_time_step, deadline)
+        # a bucket queue is enough for unit-cost grids with integer f-scores
+        self.bucket_queue = bucket_queue
+
+        # safe intervals of the cells seen by the current plan call, and the
+        # constrained times that cut them
+        self.safe_intervals: Dict[int, List[Tuple[int, float]]] = {}
+        self.vertex_times: Dict[int, List[int]] = {}
+        self.wait_times: Dict[int, List[int]] = {}
+        self.positive_cells: Dict[int, int] = {}
+
+        if env.dimension != len(start_point.__dict__.keys()):
+            raise ValueError(f"Dimension does not match the length of start: {start_point}")
+        if env.dimension != len(goal_point.__dict__.keys()):
+            raise ValueError(f"Dimension does not match the length of goal: {goal_point}")
+        if not self.is_valid_point(start_point, 0):
+            raise ValueError(f"Start point is not valid: {start_point}")
+        if not self.is_valid_point(goal_point, 0):
+            raise ValueError(f"Goal point is not valid: {goal_point}")
+        self.start_cell = env.point_to_cell(start_point)
+        self.goal_cell = env.point_to_cell(goal_point)
+
+    def plan(
+        self, constraints: List[Constraint] | ConstraintTable = None
+    ) -> List[Tuple[Point, int]] | None:
+        # the goal lies in another connected component of the free space
+        if not self.env.is_reachable_cell(self.start_cell, self.goal_cell):
+            self.status = PlanStatus.NO_PATH
+            return None
+        # index the constraints by cell once for the whole search
+        constraint_table = ConstraintTable.from_constraints(constraints, self.env.point_to_cell)
+        self.build_constrained_times(constraint_table)
+        trace = self.trace
+        is_time_step_limited = False
+        self.num_of_expansions = 0
+        # ties on f are broken towards the node closer to the goal
+        open_list = (BucketQueue if self.bucket_queue else PriorityQueue)(
+            key=lambda node: (node.f_score, node.h_score)
+        )
+        closed_set: Set[Node] = set()
+
+        start_intervals = self.get_safe_intervals(self.start_cell)
+        if not start_intervals or start_intervals[0][0] != 0:
+            self.status = PlanStatus.NO_PATH
+            return None
+        start_node = Node(self.start_cell, 0, 0)
+        start_node.h_score = self.heuristic(start_node)
+        start_node.f_score = start_node.g_score + start_node.h_score
+        if start_node.h_score == UNREACHABLE:
+            self.status = PlanStatus.NO_PATH
+            return None
+        open_list.push(start_node)
+        if trace is not None:
+            trace.generate(start_node)
+        while open_list:
+            current = open_list.pop()
+            if trace is not None:
+                trace.expand(current)
+            closed_set.add(current)
+            # the agent may stay at the goal for good only in its last interval
+            if (
+                current.cell == self.goal_cell
+                and self.get_safe_intervals(current.cell)[current.interval][1] == math.inf
+            ):
+                self.status = PlanStatus.SUCCESS
+                return self.reconstruct_path(current)
+            if self.is_budget_exhausted():
+                return None
+            successors = self.get_successors(current, constraint_table)
+            for successor in successors:
+                if successor in closed_set:
+                    continue
+                if self.max_time_step is not None and successor.time > self.max_time_step:
+                    is_time_step_limited = True
+                    continue
+
+                # the g-score of a state is its arrival time
+                queued = open_list.get(successor)
+                if queued is not None:
+                    if successor.time >= queued.time:
+                        continue
+                    queued.time = successor.time
+                    successor = queued
+
+                # push the new node, or re-push the queued one with a lower key
+                successor.parent = current
+                successor.g_score = successor.time
+                successor.h_score = self.heuristic(successor)
+                if successor.h_score == UNREACHABLE:
+                    continue
+                successor.f_score = successor.g_score + successor.h_score
+                open_list.push(successor)
+                if trace is not None:
+                    trace.generate(successor)
+
+        if is_time_step_limited:
+            self.status = PlanStatus.TIME_STEPS_EXHAUSTED
+        else:
+            self.status = PlanStatus.NO_PATH
+        return None
+
+    def reconstruct_path(self, node: Node) -> List[Tuple[Point, int]]:
+        # the agent waits in the parent cell until it leaves for the next one
+        path: List[Tuple[Point, int]] = [(self.env.cell_to_point(node.cell), node.time)]
+        while node.parent is not None:
+            parent_point = self.env.cell_to_point(node.parent.cell)
+            for wait_time in range(node.time - 1, node.parent.time - 1, -1):
+                path.append((parent_point, wait_time))
+            node = node.parent
+        return path[::-1]
+
+    def build_constrained_times(self, constraint_table: ConstraintTable) -> None:
+        self.safe_intervals = {}
+        self.vertex_times = {}
+        self.wait_times = {}
+        for cell, constrained_time in constraint_table.vertex_constraints:
+            self.vertex_times.setdefault(cell, []).append(constrained_time)
+        for prev_cell, next_cell, prev_time, _ in constraint_table.edge_constraints:
+            if prev_cell == next_cell:
+                self.wait_times.setdefault(prev_cell, []).append(prev_time)
+        # the agent must be in the cell at the time, which cuts every other cell
+        self.positive_cells = constraint_table.positive_points
+
+    def get_safe_intervals(self, cell: int) -> List[Tuple[int, float]]:
+        # maximal intervals in which the agent may stay in the cell, the last
+        # one may end at infinity
+        safe_intervals = self.safe_intervals.get(cell)
+        if safe_intervals is not None:
+            return safe_intervals
+
+        safe_intervals = self.env.dynamic_obstacle_index.safe_intervals(cell)
+        positive_times = [t for t, c in self.positive_cells.items() if c != cell]
+        if cell in self.vertex_times or cell in self.wait_times or positive_times:
+            # a vertex constraint removes its time, a wait-edge constraint only
+            # forbids staying from its time to the next one; vertex constraints
+            # come first among equal times
+            events = sorted(
+                [(t, False) for t in self.vertex_times.get(cell, []) + positive_times]
+                + [(t, True) for t in self.wait_times.get(cell, [])]
+            )
+            cut_intervals = []
+            for start_time, end_time in safe_intervals:
+                for event_time, is_wait in events:
+                    if event_time < start_time or event_time + is_wait > end_time:
+                        continue
+                    if is_wait:
+                        cut_intervals.append((start_time, event_time))
+                    elif start_time < event_time:
+                        cut_intervals.append((start_time, event_time - 1))
+                    start_time = event_time + 1
+                if start_time <= end_time:
+                    cut_intervals.append((start_time, end_time))
+            safe_intervals = cut_intervals
+        self.safe_intervals[cell] = safe_intervals
+        return safe_intervals
+
+    def get_successors(self, node: Node, constraint_table: ConstraintTable) -> List[Node]:
+        successors: List[Node] = []
+        # the agent may leave the cell until the end of its interval
+        latest_departure_time = self.get_safe_intervals(node.cell)[node.interval][1]
+        indptr, indices = self.env.get_adjacency()
+        for neighbor_cell in indices[indptr[node.cell] : indptr[node.cell + 1]]:
+            if neighbor_cell == node.cell:
+                # waiting is implicit in the interval
+                continue
+            for interval, (start_time, end_time) in enumerate(
+                self.get_safe_intervals(neighbor_cell)
+            ):
+                if start_time > latest_departure_time + 1:
+                    break
+                arrival_time = max(node.time + 1, start_time)
+                # wait longer while the move itself is constrained
+                while (
+                    arrival_time <= end_time
+                    and arrival_time - 1 <= latest_departure_time
+                    and constraint_table
+                    and constraint_table.is_constrained(
+                        node.cell, neighbor_cell, arrival_time - 1, arrival_time
+                    )
+                ):
+                    arrival_time += 1
+                if arrival_time > end_time or arrival_time - 1 > latest_departure_time:
+                    continue
+                successors.append(Node(neighbor_cell, interval, arrival_time))
+
+        return successors
+
+    def is_valid_point(self, point: Point, time: int) -> bool:
+        return self.env.is_free(point) and not self.env.is_blocked(point, time)
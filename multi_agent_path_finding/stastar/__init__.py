@@ -0,0 +1,3 @@
+from multi_agent_path_finding.stastar.stastar import SpaceTimeAstar
+
+__all__ = ["SpaceTimeAstar"]
@@ -1,24 +1,40 @@
-from typing import List, Set, Tuple
+import math
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
 
 from multi_agent_path_finding.common.environment import Environment
+from multi_agent_path_finding.common.heuristic import UNREACHABLE, DistanceMapHeuristic
+from multi_agent_path_finding.common.plan_status import PlanBudget, PlanStatus
 from multi_agent_path_finding.common.point import Point
-from multi_agent_path_finding.common.constraint import (
-    Constraint,
-    VertexConstraint,
-    EdgeConstraint,
-)
+from multi_agent_path_finding.common.priority_queue import BucketQueue, PriorityQueue
+from multi_agent_path_finding.common.search_trace import SearchTrace
+from multi_agent_path_finding.common.constraint import Constraint, ConstraintTable
 from multi_agent_path_finding.stastar.node import Node
-import matplotlib.pyplot as plt
-
-fig = plt.figure()
-ax = fig.add_subplot(111, projection="3d")
 
 
-class SpaceTimeAstar:
-    def __init__(self, start_point: Point, goal_point: Point, env: Environment):
+class SpaceTimeAstar(DistanceMapHeuristic, PlanBudget):
+    def __init__(
+        self,
+        start_point: Point,
+        goal_point: Point,
+        env: Environment,
+        bucket_queue: bool = False,
+        distance_map: np.ndarray = None,
+        trace: SearchTrace = None,
+        max_expansions: int = None,
+        max_time_step: int = None,
+        deadline: float = None,
+    ):
         self.env = env
         self.start_point = start_point
         self.goal_point = goal_point
+        self.init_heuristic(distance_map)
+        # optional recorder of the expansions for offline replay
+        self.trace = trace
+        self.init_budgets(max_expansions, max_time_step, deadline)
+        # a bucket queue is enough for unit-cost grids with integer f-scores
+        self.bucket_queue = bucket_queue
         if env.dimension != len(start_point.__dict__.keys()):
             raise ValueError(f"Dimension does not match the length of start: {start_point}")
         if env.dimension != len(goal_point.__dict__.keys()):
@@ -27,187 +43,165 @@ class SpaceTimeAstar:
             raise ValueError(f"Start point is not valid: {start_point}")
         if not self.is_valid_point(goal_point, 0):
             raise ValueError(f"Goal point is not valid: {goal_point}")
-
-    def plan(self, constraints: List[Constraint] = None) -> List[Tuple[Point, int]] | None:
-        open_set: Set[Node] = set()
+        self.start_cell = env.point_to_cell(start_point)
+        self.goal_cell = env.point_to_cell(goal_point)
+
+    def plan(
+        self, constraints: List[Constraint] | ConstraintTable = None
+    ) -> List[Tuple[Point, int]] | None:
+        # the goal lies in another connected component of the free space
+        if not self.env.is_reachable_cell(self.start_cell, self.goal_cell):
+            self.status = PlanStatus.NO_PATH
+            return None
+        # index the constraints by cell once for the whole search
+        constraint_table = ConstraintTable.from_constraints(constraints, self.env.point_to_cell)
+        trace = self.trace
+        # nodes after the horizon are not expanded, see Environment.get_safe_horizon
+        horizon = self.env.get_safe_horizon(
+            constraint_table.latest_time, self.goal_cell, self.max_distance
+        )
+        is_time_step_limited = self.max_time_step is not None and self.max_time_step < horizon
+        if is_time_step_limited:
+            horizon = self.max_time_step
+        is_horizon_reached = False
+        # an agent at the goal from this time on may stay there for good
+        goal_time = self.env.get_goal_time(
+            self.goal_cell, constraint_table.get_latest_time(self.goal_cell)
+        )
+        if goal_time == math.inf:
+            self.status = PlanStatus.NO_PATH
+            return None
+        self.num_of_expansions = 0
+        # from this time on neither the map, the constraints nor the goal test
+        # change, so a later arrival in a cell that was expanded is dominated
+        # and the cells are closed regardless of time
+        static_time = max(
+            constraint_table.latest_time, self.env.dynamic_obstacle_index.latest_time, goal_time
+        )
+        static_closed_set: Dict[int, int] = {}
+        # ties on f are broken towards the node closer to the goal
+        open_list = (BucketQueue if self.bucket_queue else PriorityQueue)(
+            key=lambda node: (node.f_score, node.h_score)
+        )
         closed_set: Set[Node] = set()
-        open_set.add(Node(self.start_point, 0))
-        while open_set:
-            current = min(open_set)
-            open_set.remove(current)
-            closed_set.add(current)
-            if current.point == self.goal_point:
-                # self.visualize(current, open_set, closed_set)
-                # plt.show()
+        start_node = Node(self.start_cell, 0)
+        start_node.h_score = self.heuristic(start_node)
+        start_node.f_score = start_node.g_score + start_node.h_score
+        if start_node.h_score == UNREACHABLE:
+            self.status = PlanStatus.NO_PATH
+            return None
+        open_list.push(start_node)
+        if trace is not None:
+            trace.generate(start_node)
+        while open_list:
+            current = open_list.pop()
+            if trace is not None:
+                trace.expand(current)
+            if current.cell == self.goal_cell and current.time >= goal_time:
+                self.status = PlanStatus.SUCCESS
                 return self.reconstruct_path(current)
-            neighbors = self.get_neighbors(current, constraints)
+            if current.time < static_time:
+                closed_set.add(current)
+            elif current.cell in static_closed_set:
+                continue
+            else:
+                static_closed_set[current.cell] = current.time
+                if self.distance_view is not None:
+                    # the rest is a static shortest path along the exact distances
+                    goal_node = self.follow_distance_map(current)
+                    if goal_node is not None:
+                        self.status = PlanStatus.SUCCESS
+                        return self.reconstruct_path(goal_node)
+            if current.time >= horizon:
+                is_horizon_reached = True
+                continue
+            if self.is_budget_exhausted():
+                return None
+            neighbors = self.get_neighbors(current, constraint_table)
             for neighbor in neighbors:
-                if neighbor in closed_set:
+                if neighbor.time < static_time:
+                    if neighbor in closed_set:
+                        continue
+                elif neighbor.cell in static_closed_set:
                     continue
 
-                if neighbor not in open_set:
-                    open_set.add(neighbor)
-                    neighbor.parent = current
-                    neighbor.g_score = current.g_score + 1
-                    neighbor.h_score = self.heuristic(neighbor)
-                    neighbor.f_score = neighbor.g_score + neighbor.h_score
-
-                if current.g_score + 1 < neighbor.g_score:
-                    neighbor.parent = current
-                    neighbor.g_score = current.g_score + 1
-                    neighbor.h_score = self.heuristic(neighbor)
-                    neighbor.f_score = neighbor.g_score + neighbor.h_score
-
-            self.visualize(current, open_set, closed_set)
-
+                g_score = current.g_score + 1
+                queued = open_list.get(neighbor)
+                if queued is not None:
+                    if g_score >= queued.g_score:
+                        continue
+                    neighbor = queued
+
+                # push the new node, or re-push the queued one with a lower key
+                neighbor.parent = current
+                neighbor.g_score = g_score
+                neighbor.h_score = self.heuristic(neighbor)
+                if neighbor.h_score == UNREACHABLE:
+                    continue
+                neighbor.f_score = neighbor.g_score + neighbor.h_score
+                open_list.push(neighbor)
+                if trace is not None:
+                    trace.generate(neighbor)
+
+        if is_time_step_limited and is_horizon_reached:
+            self.status = PlanStatus.TIME_STEPS_EXHAUSTED
+        else:
+            self.status = PlanStatus.NO_PATH
         return None
 
-    def visualize(self, node, open_set: Set[Node], closed_set: Set[Node]):
-        # Clear the plot
-        ax.clear()
-        time_limit = max(10, max([node.time for node in open_set | closed_set]))
-
-        # Plot obstacles
-        for time in range(time_limit):
-            ax.scatter(
-                [obstacle.point.x for obstacle in self.env.obstacles],
-                [obstacle.point.y for obstacle in self.env.obstacles],
-                [time for obstacle in self.env.obstacles],
-                c="black",
-                marker="x",
-            )
-
-        # Plot open set
-        ax.scatter(
-            [node.point.x for node in open_set],
-            [node.point.y for node in open_set],
-            [node.time for node in open_set],
-            c="b",
-            marker="x",
-            label="Open Set",
-        )
-
-        # Plot closed set
-        ax.scatter(
-            [node.point.x for node in closed_set],
-            [node.point.y for node in closed_set],
-            [node.time for node in closed_set],
-            c="r",
-            marker="o",
-            label="Closed Set",
-        )
-
-        # Plot current node
-        ax.scatter(
-            node.point.x,
-            node.point.y,
-            node.time,
-            c="g",
-            marker="o",
-            label="Current Node",
-        )
-
-        # Plot start and goal points without (x, o) markers
-        ax.scatter(
-            self.start_point.x,
-            self.start_point.y,
-            0,
-            c="g",
-            marker="^",
-            label="Start Point",
-        )
-
-        ax.scatter(
-            self.goal_point.x,
-            self.goal_point.y,
-            0,
-            c="r",
-            marker="^",
-            label="Goal Point",
-        )
-
-        # Plot tree edges
-        for node in open_set | closed_set:
-            if node.parent is not None:
-                ax.plot(
-                    [node.point.x, node.parent.point.x],
-                    [node.point.y, node.parent.point.y],
-                    [node.time, node.parent.time],
-                    c="y",
-                )
-
-        # Setting labels and title
-        ax.set_xlabel("X")
-        ax.set_ylabel("Y")
-        ax.set_zlabel("T")
-        ax.set_xlim([0, self.env.space_limit[0]])
-        ax.set_ylim([0, self.env.space_limit[1]])
-        # time_limit = 10
-        ax.set_zlim([0, time_limit])
-        ax.set_title("3D Grid Map Visualization")
-        ax.legend()
-
-        # Show the plot
-        plt.pause(0.5)
-
-    def heuristic(self, node) -> int:
-        # return manhattan distance
-        return node.point.manhattan_distance(self.goal_point)
-
-    @staticmethod
-    def reconstruct_path(node: Node) -> List[Tuple[Point, int]]:
-        path: List[Tuple[Point, int]] = [(node.point, node.time)]
+    def follow_distance_map(self, node: Node) -> Node | None:
+        # descend the distance map from the node to the goal, None if a cell on
+        # the way is blocked by a dynamic obstacle for good
+        indptr, indices = self.env.get_adjacency()
+        is_blocked = self.env.dynamic_obstacle_index.is_blocked
+        while node.cell != self.goal_cell:
+            next_distance = self.distance_view[node.cell] - 1
+            for neighbor_cell in indices[indptr[node.cell] : indptr[node.cell + 1]]:
+                if self.distance_view[neighbor_cell] == next_distance and not is_blocked(
+                    neighbor_cell, node.time + 1
+                ):
+                    break
+            else:
+                return None
+            next_node = Node(neighbor_cell, node.time + 1)
+            next_node.parent = node
+            node = next_node
+        return node
+
+    def reconstruct_path(self, node: Node) -> List[Tuple[Point, int]]:
+        # cells are converted back to points only here
+        path: List[Tuple[Point, int]] = [(self.env.cell_to_point(node.cell), node.time)]
         while node.parent is not None:
-            path.append((node.parent.point, node.parent.time))
+            path.append((self.env.cell_to_point(node.parent.cell), node.parent.time))
             node = node.parent
         return path[::-1]
 
-    def get_neighbors(self, node: Node, constraints: List[Constraint] = None) -> List[Node]:
+    def get_neighbors(self, node: Node, constraint_table: ConstraintTable) -> List[Node]:
         neighbors: List[Node] = []
-        # move action
-        for neighbor_point in node.point.get_neighbor_points():
-            if self.is_valid_point(
-                neighbor_point, node.time + 1
-            ) and self.is_valid_given_constraints(
-                node.point, neighbor_point, node.time, node.time + 1, constraints
+        next_time = node.time + 1
+        is_blocked = self.env.dynamic_obstacle_index.is_blocked
+        # move and wait actions from the shared adjacency of the free cells
+        indptr, indices = self.env.get_adjacency()
+        for neighbor_cell in indices[indptr[node.cell] : indptr[node.cell + 1]]:
+            if is_blocked(neighbor_cell, next_time):
+                continue
+            if constraint_table and not self.is_valid_given_constraints(
+                node.cell, neighbor_cell, node.time, next_time, constraint_table
             ):
-                neighbors.append(Node(neighbor_point, node.time + 1))
+                continue
+            neighbors.append(Node(neighbor_cell, next_time))
 
         return neighbors
 
     def is_valid_point(self, point: Point, time: int) -> bool:
-        if not self.is_valid_space(point):
-            return False
-        for obstacle in self.env.obstacles:
-            if obstacle.is_colliding(point=point, time=time):
-                return False
-        return True
+        return self.env.is_free(point) and not self.env.is_blocked(point, time)
 
     @staticmethod
     def is_valid_given_constraints(
-        prev_point: Point,
-        next_point: Point,
+        prev_cell: int,
+        next_cell: int,
         prev_time: int,
         next_time: int,
-        constraints: List[Constraint],
+        constraint_table: ConstraintTable,
     ) -> bool:
-        if constraints is not None:
-            for constraint in constraints:
-                if isinstance(constraint, VertexConstraint):
-                    if constraint.point == next_point and constraint.time == next_time:
-                        return False
-                elif isinstance(constraint, EdgeConstraint):
-                    if (
-                        constraint.points[0] == prev_point
-                        and constraint.points[1] == next_point
-                        and constraint.times[0] == prev_time
-                        and constraint.times[1] == next_time
-                    ):
-                        return False
-        return True
-
-    def is_valid_space(self, point: Point) -> bool:
-        for i, coordinate in enumerate(point.__dict__.values()):
-            if coordinate < 0 or coordinate >= self.env.space_limit[i]:
-                return False
-        return True
+        return not constraint_table.is_constrained(prev_cell, next_cell, prev_time, next_time)
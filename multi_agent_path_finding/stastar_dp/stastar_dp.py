@@ -1,33 +1,48 @@
+import math
 from typing import List, Set, Tuple
 
-import matplotlib.pyplot as plt
+import numpy as np
 
-from multi_agent_path_finding.common.constraint import (
-    Constraint,
-    VertexConstraint,
-    EdgeConstraint,
-)
+from multi_agent_path_finding.common.constraint import Constraint, ConstraintTable
 from multi_agent_path_finding.common.environment import Environment
+from multi_agent_path_finding.common.heuristic import UNREACHABLE, DistanceMapHeuristic
+from multi_agent_path_finding.common.plan_status import PlanBudget, PlanStatus
 from multi_agent_path_finding.common.point import Point
+from multi_agent_path_finding.common.priority_queue import BucketQueue, PriorityQueue
+from multi_agent_path_finding.common.search_trace import SearchTrace
 from multi_agent_path_finding.stastar_dp.node import Node
 
 
-class SpaceTimeAstarDP:
-    def __init__(self, start_point: Point, goal_point: Point, env: Environment):
+class SpaceTimeAstarDP(DistanceMapHeuristic, PlanBudget):
+    def __init__(
+        self,
+        start_point: Point,
+        goal_point: Point,
+        env: Environment,
+        bucket_queue: bool = False,
+        distance_map: np.ndarray = None,
+        trace: SearchTrace = None,
+        max_expansions: int = None,
+        max_time_step: int = None,
+        deadline: float = None,
+    ):
         self.env = env
         self.start_point = start_point
         self.goal_point = goal_point
-
-        self.open_set: Set[Node] = set()
+        self.init_heuristic(distance_map)
+        # optional recorder of the expansions for offline replay
+        self.trace = trace
+        self.init_budgets(max_expansions, max_time_step, deadline)
+        self.bucket_queue = bucket_queue
+
+        # the open list survives between plans so that it can be pruned and resumed
+        self.open_list = (BucketQueue if bucket_queue else PriorityQueue)(
+            key=lambda node: (node.f_score, node.h_score)
+        )
         self.closed_set: Set[Node] = set()
-
-        self.start_node = Node(self.start_point, 0)
-        self.start_node.parent = None
-        self.start_node.g_score = 0
-        self.start_node.h_score = self.heuristic(self.start_node)
-        self.start_node.f_score = self.start_node.g_score + self.start_node.h_score
-
-        self.open_set.add(self.start_node)
+        # nodes popped at the horizon of an earlier plan, neither open nor closed,
+        # they are searched again once more constraints move the horizon
+        self.deferred_set: Set[Node] = set()
 
         if env.dimension != len(start_point.__dict__.keys()):
             raise ValueError(
@@ -41,191 +56,136 @@ class SpaceTimeAstarDP:
             raise ValueError(f"Start point is not valid: {start_point}")
         if not self.is_valid_point(goal_point, 0):
             raise ValueError(f"Goal point is not valid: {goal_point}")
+        self.start_cell = env.point_to_cell(start_point)
+        self.goal_cell = env.point_to_cell(goal_point)
+
+        self.start_node = Node(self.start_cell, 0)
+        self.start_node.parent = None
+        self.start_node.g_score = 0
+        self.start_node.h_score = self.heuristic(self.start_node)
+        self.start_node.f_score = self.start_node.g_score + self.start_node.h_score
+
+        self.open_list.push(self.start_node)
+        if self.trace is not None:
+            self.trace.generate(self.start_node)
 
     def plan(
-        self, constraints: List[Constraint] = None
+        self, constraints: List[Constraint] | ConstraintTable = None
     ) -> List[Tuple[Point, int]] | None:
-        while self.open_set:
-            current = min(self.open_set)
-            self.open_set.remove(current)
+        # the goal lies in another connected component of the free space
+        if not self.env.is_reachable_cell(self.start_cell, self.goal_cell):
+            self.status = PlanStatus.NO_PATH
+            return None
+        # index the constraints by cell once for the whole search
+        constraint_table = ConstraintTable.from_constraints(constraints, self.env.point_to_cell)
+        trace = self.trace
+        # nodes after the horizon are not expanded, see Environment.get_safe_horizon
+        horizon = self.env.get_safe_horizon(
+            constraint_table.latest_time, self.goal_cell, self.max_distance
+        )
+        is_time_step_limited = self.max_time_step is not None and self.max_time_step < horizon
+        if is_time_step_limited:
+            horizon = self.max_time_step
+        is_horizon_reached = False
+        # an agent at the goal from this time on may stay there for good
+        goal_time = self.env.get_goal_time(
+            self.goal_cell, constraint_table.get_latest_time(self.goal_cell)
+        )
+        if goal_time == math.inf:
+            self.status = PlanStatus.NO_PATH
+            return None
+        self.num_of_expansions = 0
+        for node in [node for node in self.deferred_set if node.time < horizon]:
+            self.deferred_set.remove(node)
+            self.open_list.push(node)
+
+        if self.start_node.h_score == UNREACHABLE:
+            self.status = PlanStatus.NO_PATH
+            return None
+        while self.open_list:
+            # checked before popping so that the search can be resumed later
+            if self.is_budget_exhausted():
+                return None
+            current = self.open_list.pop()
+            if trace is not None:
+                trace.expand(current)
+            is_goal = current.cell == self.goal_cell and current.time >= goal_time
+            if not is_goal and current.time >= horizon:
+                self.deferred_set.add(current)
+                is_horizon_reached = True
+                continue
             self.closed_set.add(current)
-            if current.point == self.goal_point:
-                # self.visualize(current, open_set, closed_set)
-                # plt.show()
+            if is_goal:
+                # the goal node also stays open, a resumed search with a later
+                # goal time tests it again and expands it
+                self.open_list.push(current)
+                self.status = PlanStatus.SUCCESS
                 return self.reconstruct_path(current)
-            neighbors = self.get_neighbors(current, constraints)
+            neighbors = self.get_neighbors(current, constraint_table)
             for neighbor in neighbors:
-                if neighbor in self.closed_set:
+                if neighbor in self.closed_set or neighbor in self.deferred_set:
                     continue
 
-                if neighbor not in self.open_set:
-                    self.open_set.add(neighbor)
-                    neighbor.parent = current
-                    current.children.append(neighbor)
-                    neighbor.g_score = current.g_score + 1
-                    neighbor.h_score = self.heuristic(neighbor)
-                    neighbor.f_score = neighbor.g_score + neighbor.h_score
-
-                if current.g_score + 1 < neighbor.g_score:
+                g_score = current.g_score + 1
+                queued = self.open_list.get(neighbor)
+                if queued is not None:
+                    if g_score >= queued.g_score:
+                        continue
+                    # move the queued node under its new parent
+                    neighbor = queued
                     neighbor.parent.children.remove(neighbor)
-                    neighbor.parent = current
-                    current.children.append(neighbor)
-                    neighbor.g_score = current.g_score + 1
-                    neighbor.h_score = self.heuristic(neighbor)
-                    neighbor.f_score = neighbor.g_score + neighbor.h_score
-
-            # self.visualize(current, open_set, closed_set)
 
+                neighbor.parent = current
+                neighbor.g_score = g_score
+                neighbor.h_score = self.heuristic(neighbor)
+                if neighbor.h_score == UNREACHABLE:
+                    continue
+                current.children.append(neighbor)
+                neighbor.f_score = neighbor.g_score + neighbor.h_score
+                self.open_list.push(neighbor)
+                if trace is not None:
+                    trace.generate(neighbor)
+
+        if is_time_step_limited and is_horizon_reached:
+            self.status = PlanStatus.TIME_STEPS_EXHAUSTED
+        else:
+            self.status = PlanStatus.NO_PATH
         return None
 
-    def visualize(self, node, open_set: Set[Node], closed_set: Set[Node]):
-        # Clear the plot
-        self.ax.clear()
-        time_limit = max(10, max([node.time for node in open_set | closed_set]))
-
-        # Plot obstacles
-        for time in range(time_limit):
-            self.ax.scatter(
-                [obstacle.point.x for obstacle in self.env.obstacles],
-                [obstacle.point.y for obstacle in self.env.obstacles],
-                [time for obstacle in self.env.obstacles],
-                c="black",
-                marker="x",
-            )
-
-        # Plot open set
-        self.ax.scatter(
-            [node.point.x for node in open_set],
-            [node.point.y for node in open_set],
-            [node.time for node in open_set],
-            c="b",
-            marker="x",
-            label="Open Set",
-        )
-
-        # Plot closed set
-        self.ax.scatter(
-            [node.point.x for node in closed_set],
-            [node.point.y for node in closed_set],
-            [node.time for node in closed_set],
-            c="r",
-            marker="o",
-            label="Closed Set",
-        )
-
-        # Plot current node
-        self.ax.scatter(
-            node.point.x,
-            node.point.y,
-            node.time,
-            c="g",
-            marker="o",
-            label="Current Node",
-        )
-
-        # Plot start and goal points without (x, o) markers
-        self.ax.scatter(
-            self.start_point.x,
-            self.start_point.y,
-            0,
-            c="g",
-            marker="^",
-            label="Start Point",
-        )
-
-        self.ax.scatter(
-            self.goal_point.x,
-            self.goal_point.y,
-            0,
-            c="r",
-            marker="^",
-            label="Goal Point",
-        )
-
-        # Plot tree edges
-        for node in open_set | closed_set:
-            if node.parent is not None:
-                self.ax.plot(
-                    [node.point.x, node.parent.point.x],
-                    [node.point.y, node.parent.point.y],
-                    [node.time, node.parent.time],
-                    c="y",
-                )
-
-        # Setting labels and title
-        self.ax.set_xlabel("X")
-        self.ax.set_ylabel("Y")
-        self.ax.set_zlabel("T")
-        self.ax.set_xlim([0, self.env.space_limit[0]])
-        self.ax.set_ylim([0, self.env.space_limit[1]])
-        # time_limit = 10
-        self.ax.set_zlim([0, time_limit])
-        self.ax.set_title("3D Grid Map Visualization")
-        self.ax.legend()
-
-        # Show the plot
-        plt.pause(0.5)
-
-    def heuristic(self, node) -> int:
-        # return manhattan distance
-        return node.point.manhattan_distance(self.goal_point)
-
-    @staticmethod
-    def reconstruct_path(node: Node) -> List[Tuple[Point, int]]:
-        path: List[Tuple[Point, int]] = [(node.point, node.time)]
+    def reconstruct_path(self, node: Node) -> List[Tuple[Point, int]]:
+        # cells are converted back to points only here
+        path: List[Tuple[Point, int]] = [(self.env.cell_to_point(node.cell), node.time)]
         while node.parent is not None:
-            path.append((node.parent.point, node.parent.time))
+            path.append((self.env.cell_to_point(node.parent.cell), node.parent.time))
             node = node.parent
         return path[::-1]
 
-    def get_neighbors(
-        self, node: Node, constraints: List[Constraint] = None
-    ) -> List[Node]:
+    def get_neighbors(self, node: Node, constraint_table: ConstraintTable) -> List[Node]:
         neighbors: List[Node] = []
-        # move action
-        for neighbor_point in node.point.get_neighbor_points():
-            if self.is_valid_point(
-                neighbor_point, node.time + 1
-            ) and self.is_valid_given_constraints(
-                node.point, neighbor_point, node.time, node.time + 1, constraints
+        next_time = node.time + 1
+        is_blocked = self.env.dynamic_obstacle_index.is_blocked
+        # move and wait actions from the shared adjacency of the free cells
+        indptr, indices = self.env.get_adjacency()
+        for neighbor_cell in indices[indptr[node.cell] : indptr[node.cell + 1]]:
+            if is_blocked(neighbor_cell, next_time):
+                continue
+            if constraint_table and not self.is_valid_given_constraints(
+                node.cell, neighbor_cell, node.time, next_time, constraint_table
             ):
-                neighbors.append(Node(neighbor_point, node.time + 1))
+                continue
+            neighbors.append(Node(neighbor_cell, next_time))
 
         return neighbors
 
     def is_valid_point(self, point: Point, time: int) -> bool:
-        if not self.is_valid_space(point):
-            return False
-        for obstacle in self.env.obstacles:
-            if obstacle.is_colliding(point=point, time=time):
-                return False
-        return True
+        return self.env.is_free(point) and not self.env.is_blocked(point, time)
 
     @staticmethod
     def is_valid_given_constraints(
-        prev_point: Point,
-        next_point: Point,
+        prev_cell: int,
+        next_cell: int,
         prev_time: int,
         next_time: int,
-        constraints: List[Constraint],
+        constraint_table: ConstraintTable,
     ) -> bool:
-        if constraints is not None:
-            for constraint in constraints:
-                if isinstance(constraint, VertexConstraint):
-                    if constraint.point == next_point and constraint.time == next_time:
-                        return False
-                elif isinstance(constraint, EdgeConstraint):
-                    if (
-                        constraint.points[0] == prev_point
-                        and constraint.points[1] == next_point
-                        and constraint.times[0] == prev_time
-                        and constraint.times[1] == next_time
-                    ):
-                        return False
-        return True
-
-    def is_valid_space(self, point: Point) -> bool:
-        for i, coordinate in enumerate(point.__dict__.values()):
-            if coordinate < 0 or coordinate >= self.env.space_limit[i]:
-                return False
-        return True
+        return not constraint_table.is_constrained(prev_cell, next_cell, prev_time, next_time)
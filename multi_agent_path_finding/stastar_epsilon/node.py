@@ -1,10 +1,10 @@
 from dataclasses import dataclass
-from multi_agent_path_finding.common.point import Point
 
 
 @dataclass
 class Node:
-    point: Point
+    # flat cell index, see Environment.point_to_cell
+    cell: int
     time: int
     g_score: int = 0
     h_score: int = 0
@@ -18,9 +18,10 @@ class Node:
         return self.d_score < other.d_score
 
     def __hash__(self):
-        return hash((self.point, self.time))
+        # an int hashes to itself, cheaper than hashing a tuple
+        return self.time << 32 | self.cell
 
     def __eq__(self, other):
         if isinstance(other, Node):
-            return self.point == other.point and self.time == other.time
+            return self.cell == other.cell and self.time == other.time
         return False
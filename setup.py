@@ -4,7 +4,10 @@
 
 from setuptools import setup, find_packages
 
-requirements = ["pyyaml", "matplotlib"]
+requirements = ["pyyaml", "numpy"]
+
+# plotting is only needed by the visualizers
+extras_requirements = {"visualization": ["matplotlib"]}
 
 test_requirements = [
     "pytest>=3",
@@ -34,6 +37,7 @@ setup(
         ],
     },
     install_requires=requirements,
+    extras_require=extras_requirements,
     license="MIT license",
     include_package_data=True,
     keywords="multi_agent_path_finding",
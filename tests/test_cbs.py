@@ -3,7 +3,17 @@
 import random
 from itertools import combinations
 
+import pytest
+
 from multi_agent_path_finding.cbs.cbs import ConflictBasedSearch
+from multi_agent_path_finding.cbs.ct_node import CTNode
+from multi_agent_path_finding.common.conflict import find_conflicts
+from multi_agent_path_finding.common.constraint import (
+    PositiveConstraint,
+    PositiveVertexConstraint,
+    VertexConstraint,
+    ZobristTable,
+)
 from multi_agent_path_finding.common.environment import Environment
 from multi_agent_path_finding.common.point import Point2D, Point3D
 
@@ -37,6 +47,59 @@ def find_inter_agent_conflict(solution) -> bool:
     return False
 
 
+def random_instance(space_limits, num_of_obstacles, robot_num, rng=random):
+    points = [Point2D(x, y) for x in range(space_limits[0]) for y in range(space_limits[1])]
+    static_obstacles = rng.sample(points, num_of_obstacles)
+    free_points = [point for point in points if point not in static_obstacles]
+    start_points = rng.sample(free_points, robot_num)
+    goal_points = rng.sample(free_points, robot_num)
+    env = Environment(dimension=2, space_limit=space_limits, static_obstacles=static_obstacles)
+    return start_points, goal_points, env
+
+
+def random_instances(num_of_instances, space_limits, num_of_obstacles, robot_num, seed=0):
+    # a reproducible draw of instances whose goals are reachable, CBS does not
+    # end on a jointly unsolvable one, so the seeds of the tests are known to
+    # give solvable instances only
+    rng = random.Random(seed)
+    instances = []
+    while len(instances) < num_of_instances:
+        start_points, goal_points, env = random_instance(
+            space_limits, num_of_obstacles, robot_num, rng
+        )
+        if all(map(env.is_reachable, start_points, goal_points)):
+            instances.append((start_points, goal_points, env))
+    return instances
+
+
+def crossing_instance():
+    # four agents whose shortest paths cross, plain CBS generates 41 CT nodes
+    # to reach the optimal cost of 29
+    static_obstacles = [Point2D(0, 3), Point2D(1, 3), Point2D(4, 3), Point2D(2, 2)]
+    start_points = [Point2D(1, 2), Point2D(1, 0), Point2D(5, 5), Point2D(2, 4)]
+    goal_points = [Point2D(1, 4), Point2D(4, 4), Point2D(4, 1), Point2D(3, 0)]
+    env = Environment(dimension=2, space_limit=[6, 6], static_obstacles=static_obstacles)
+    return start_points, goal_points, env
+
+
+def is_in_positive_branch(node) -> bool:
+    # a positive constraint lies on the path from the root to the CT node
+    while node is not None:
+        if isinstance(node.constraint, PositiveConstraint):
+            return True
+        node = node.parent
+    return False
+
+
+class RecordingConflictBasedSearch(ConflictBasedSearch):
+    # keeps the CT node of the solution
+    def select_conflict(self, node):
+        conflict = super().select_conflict(node)
+        if conflict is None:
+            self.solution_node = node
+        return conflict
+
+
 class TestConflictBasedSearch:
     def test_open_plan(self):
         for dimension in [2, 3]:
@@ -91,3 +154,184 @@ class TestConflictBasedSearch:
                 assert path[-1] == (goal_points[agent_id], len(path) - 1)
             # check if the solution is collision-free
             assert not find_inter_agent_conflict(interpolated_solution)
+
+    def test_prioritize_conflicts(self):
+        start_points, goal_points, env = crossing_instance()
+        planner = ConflictBasedSearch(start_points, goal_points, env)
+        planner.plan()
+        ct_size = planner.ct_size
+        planner = ConflictBasedSearch(start_points, goal_points, env, prioritize_conflicts=True)
+        solution = planner.plan()
+        assert planner.calculate_cost(solution) == 29
+        # splitting on cardinal conflicts first raises the cost sooner
+        assert planner.ct_size < ct_size
+
+        for start_points, goal_points, env in random_instances(5, [6, 6], 4, 4):
+            solution = ConflictBasedSearch(start_points, goal_points, env).plan()
+            planner = ConflictBasedSearch(
+                start_points, goal_points, env, prioritize_conflicts=True
+            )
+            prioritized_solution = planner.plan()
+            # both are optimal
+            assert planner.calculate_cost(prioritized_solution) == planner.calculate_cost(
+                solution
+            )
+
+    def test_bypass(self):
+        start_points, goal_points, env = crossing_instance()
+        for options in [{}, dict(merge_bound=3), dict(disjoint_splitting=True)]:
+            planner = ConflictBasedSearch(start_points, goal_points, env, **options)
+            planner.plan()
+            ct_size = planner.ct_size
+            planner = ConflictBasedSearch(start_points, goal_points, env, bypass=True, **options)
+            solution = planner.plan()
+            assert planner.calculate_cost(solution) == 29
+            assert not find_conflicts(solution)
+            # a bypassed node goes back to the open list instead of being split
+            assert planner.ct_size < ct_size
+
+        for start_points, goal_points, env in random_instances(5, [6, 6], 4, 4):
+            planner = ConflictBasedSearch(start_points, goal_points, env)
+            cost = planner.calculate_cost(planner.plan())
+            planner = ConflictBasedSearch(start_points, goal_points, env, bypass=True)
+            solution = planner.plan()
+            # adopting paths of the same cost keeps the solution optimal
+            assert planner.calculate_cost(solution) == cost
+            assert not find_conflicts(solution)
+
+    def test_disjoint_splitting(self):
+        start_points, goal_points, env = crossing_instance()
+        planner = RecordingConflictBasedSearch(
+            start_points, goal_points, env, disjoint_splitting=True
+        )
+        solution = planner.plan()
+        assert planner.calculate_cost(solution) == 29
+        assert not find_conflicts(solution)
+        # the solution is found below a positive constraint
+        assert is_in_positive_branch(planner.solution_node)
+
+        for start_points, goal_points, env in random_instances(5, [6, 6], 4, 4):
+            planner = ConflictBasedSearch(start_points, goal_points, env)
+            cost = planner.calculate_cost(planner.plan())
+            planner = ConflictBasedSearch(
+                start_points, goal_points, env, disjoint_splitting=True
+            )
+            solution = planner.plan()
+            # the children split the solutions of the node between them
+            assert planner.calculate_cost(solution) == cost
+            assert not find_conflicts(solution)
+
+    def test_merge_bound(self):
+        # four agents cross in a plus-shaped corridor, see configs/cbs/cross_input.yaml
+        space_limits = [5, 5]
+        static_obstacles = [
+            Point2D(x, y) for x in [0, 1, 3, 4] for y in [0, 1, 3, 4]
+        ]
+        start_points = [Point2D(0, 2), Point2D(4, 2), Point2D(2, 0), Point2D(2, 4)]
+        goal_points = [Point2D(4, 2), Point2D(0, 2), Point2D(2, 4), Point2D(2, 0)]
+        env = Environment(dimension=2, space_limit=space_limits, static_obstacles=static_obstacles)
+
+        planner = ConflictBasedSearch(start_points, goal_points, env, merge_bound=5)
+        solution = planner.plan()
+        assert planner.calculate_cost(solution) == 28
+        assert not find_conflicts(solution)
+
+        start_points, goal_points, env = crossing_instance()
+        planner = ConflictBasedSearch(start_points, goal_points, env)
+        planner.plan()
+        ct_size = planner.ct_size
+        planner = ConflictBasedSearch(start_points, goal_points, env, merge_bound=3)
+        solution = planner.plan()
+        assert planner.calculate_cost(solution) == 29
+        # the merged agents no longer split CT nodes on their conflicts
+        assert planner.ct_size < ct_size
+
+        for start_points, goal_points, env in random_instances(5, [6, 6], 4, 4):
+            planner = ConflictBasedSearch(start_points, goal_points, env)
+            cost = planner.calculate_cost(planner.plan())
+            planner = ConflictBasedSearch(start_points, goal_points, env, merge_bound=1)
+            solution = planner.plan()
+            # a meta-agent is planned optimally under the constraints of its members
+            assert planner.calculate_cost(solution) == cost
+            assert not find_conflicts(solution)
+
+    def test_agent_waiting_at_goal(self):
+        # agent 0 parks in the corridor that agent 1 has to pass through
+        space_limits = [5, 2]
+        static_obstacles = [Point2D(x, 1) for x in [0, 1, 3, 4]]
+        start_points = [Point2D(2, 1), Point2D(0, 0)]
+        goal_points = [Point2D(2, 0), Point2D(4, 0)]
+        env = Environment(dimension=2, space_limit=space_limits, static_obstacles=static_obstacles)
+        planner = ConflictBasedSearch(
+            start_points=start_points,
+            goal_points=goal_points,
+            env=env,
+        )
+        solution = planner.plan()
+
+        # agent 0 waits in the pocket until agent 1 has passed
+        assert solution[0][-1] == (goal_points[0], 3)
+        assert solution[1][-1] == (goal_points[1], 4)
+        assert planner.calculate_cost(solution) == 7
+
+    def test_unreachable_goal(self):
+        # the wall cuts the space in two
+        space_limits = [5, 5]
+        static_obstacles = [Point2D(2, y) for y in range(5)]
+        env = Environment(dimension=2, space_limit=space_limits, static_obstacles=static_obstacles)
+
+        with pytest.raises(ValueError):
+            ConflictBasedSearch(
+                start_points=[Point2D(0, 0), Point2D(4, 0)],
+                goal_points=[Point2D(0, 4), Point2D(0, 0)],
+                env=env,
+            )
+
+    def test_count_conflicts(self):
+        env = Environment(dimension=2, space_limit=[4, 4])
+        start_points = [Point2D(0, 0), Point2D(1, 0), Point2D(1, 2)]
+        goal_points = [Point2D(1, 0), Point2D(0, 0), Point2D(2, 0)]
+        planner = ConflictBasedSearch(start_points=start_points, goal_points=goal_points, env=env)
+        # agents 0 and 1 swap, agent 2 passes agent 0 parked at its goal
+        solution = [
+            [(Point2D(0, 0), 0), (Point2D(1, 0), 1)],
+            [(Point2D(1, 0), 0), (Point2D(0, 0), 1)],
+            [(Point2D(1, 2), 0), (Point2D(1, 1), 1), (Point2D(1, 0), 2), (Point2D(2, 0), 3)],
+        ]
+        root_node = CTNode(solution=solution)
+        planner.update_conflict_graph(root_node)
+        assert root_node.num_of_conflicts == 2
+        assert root_node.conflict_graph.get_first_pair() == (0, 1)
+
+    def test_child_node_shares_parent(self):
+        root_node = CTNode(solution=[[(Point2D(0, 0), 0)], [(Point2D(1, 1), 0)]])
+        constraints = [
+            VertexConstraint(agent_id=0, time=1, point=Point2D(1, 0)),
+            VertexConstraint(agent_id=1, time=1, point=Point2D(1, 0)),
+            VertexConstraint(agent_id=0, time=2, point=Point2D(1, 0)),
+        ]
+        zobrist_table = ZobristTable()
+        node = root_node
+        for constraint in constraints:
+            path = [(Point2D(0, 0), time) for time in range(len(node.solution[0]) + 1)]
+            if constraint.agent_id == 1:
+                path = node.solution[1] + [(Point2D(1, 1), 1)]
+            fingerprint = node.fingerprint ^ zobrist_table.get_key(constraint)
+            node = node.create_child(constraint, path, fingerprint)
+
+        assert node.get_constraints(0) == [constraints[0], constraints[2]]
+        assert node.get_constraints(1) == [constraints[1]]
+        assert root_node.get_constraints(0) == []
+
+        # a positive constraint of agent 0 constrains agent 1 as well
+        positive_constraint = PositiveVertexConstraint(agent_id=0, time=3, point=Point2D(0, 0))
+        fingerprint = node.fingerprint ^ zobrist_table.get_key(positive_constraint)
+        child_node = node.create_child(positive_constraint, node.solution[0], fingerprint)
+        assert child_node.get_constraints(0)[-1] == positive_constraint
+        assert child_node.get_constraints(1) == [
+            constraints[1],
+            VertexConstraint(agent_id=1, time=3, point=Point2D(0, 0)),
+        ]
+        # the paths that were not replanned are shared, not copied
+        assert node.solution[1] is node.parent.solution[1]
+        assert node.cost == sum(len(path) - 1 for path in node.solution)
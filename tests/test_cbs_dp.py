@@ -0,0 +1,46 @@
+"""Tests for `cbs_dp` package."""
+
+from multi_agent_path_finding.cbs.cbs import ConflictBasedSearch
+from multi_agent_path_finding.cbs_dp.cbs_dp import ConflictBasedSearchDP
+from multi_agent_path_finding.common import Environment, Point2D
+from multi_agent_path_finding.common.conflict import find_conflicts
+
+
+class TestConflictBasedSearchDP:
+    def test_parked_agent(self):
+        # agent 0 starts at its goal in a corridor and has to step into the
+        # niche at (2, 1) to let agent 1 pass
+        static_obstacles = [Point2D(x, 1) for x in [0, 1, 3, 4]]
+        env = Environment(dimension=2, space_limit=[5, 2], static_obstacles=static_obstacles)
+        start_points = [Point2D(2, 0), Point2D(0, 0)]
+        goal_points = [Point2D(2, 0), Point2D(4, 0)]
+
+        planner = ConflictBasedSearchDP(start_points, goal_points, env)
+        solution = planner.plan()
+        assert planner.calculate_cost(solution) == 7
+        assert not find_conflicts(solution)
+        for path, start_point, goal_point in zip(solution, start_points, goal_points):
+            assert path[0] == (start_point, 0)
+            assert path[-1] == (goal_point, len(path) - 1)
+
+    def test_same_cost_as_cbs(self):
+        # resumed searches of agents parked at their goals stay optimal
+        instances = [
+            (
+                Environment(dimension=2, space_limit=[3, 3]),
+                [Point2D(2, 2), Point2D(2, 1), Point2D(1, 0), Point2D(0, 0)],
+                [Point2D(2, 1), Point2D(0, 1), Point2D(1, 0), Point2D(2, 0)],
+            ),
+            (
+                Environment(dimension=2, space_limit=[4, 3], static_obstacles=[Point2D(1, 1)]),
+                [Point2D(1, 2), Point2D(1, 0), Point2D(0, 1), Point2D(2, 0)],
+                [Point2D(1, 2), Point2D(0, 2), Point2D(1, 0), Point2D(3, 1)],
+            ),
+        ]
+        for env, start_points, goal_points in instances:
+            planner = ConflictBasedSearch(start_points, goal_points, env)
+            cost = planner.calculate_cost(planner.plan())
+            planner = ConflictBasedSearchDP(start_points, goal_points, env)
+            solution = planner.plan()
+            assert planner.calculate_cost(solution) == cost
+            assert not find_conflicts(solution)
@@ -0,0 +1,122 @@
+"""Tests for `conflict` module."""
+
+import random
+from itertools import combinations
+
+from multi_agent_path_finding.common import Point2D
+from multi_agent_path_finding.common.conflict import (
+    ConflictGraph,
+    EdgeConflict,
+    VertexConflict,
+    find_conflicts,
+    find_first_conflict,
+)
+
+
+def get_state(path, time):
+    # the agent stays at the last point of its path
+    return path[min(time, len(path) - 1)][0]
+
+
+def find_all_conflicts(solution):
+    # compare every pair of agents at every time
+    conflicts = []
+    max_time = max(len(path) for path in solution)
+    for time in range(max_time):
+        for agent1, agent2 in combinations(range(len(solution)), 2):
+            path1, path2 = solution[agent1], solution[agent2]
+            if time >= max(len(path1), len(path2)):
+                continue
+            if get_state(path1, time) == get_state(path2, time):
+                conflicts.append(("vertex", agent1, agent2, time))
+            if (
+                time > 0
+                and get_state(path1, time) != get_state(path1, time - 1)
+                and get_state(path1, time - 1) == get_state(path2, time)
+                and get_state(path2, time - 1) == get_state(path1, time)
+            ):
+                conflicts.append(("edge", agent1, agent2, time))
+    return conflicts
+
+
+def random_path(space_limit):
+    point = Point2D(random.randint(0, space_limit - 1), random.randint(0, space_limit - 1))
+    path = [(point, 0)]
+    for time in range(1, random.randint(1, 10)):
+        point = random.choice(point.get_neighbor_points())
+        path.append((point, time))
+    return path
+
+
+def describe(conflict):
+    if isinstance(conflict, VertexConflict):
+        return ("vertex", *conflict.agent_ids, conflict.time)
+    return ("edge", *conflict.agent_ids, conflict.times[1])
+
+
+class TestConflict:
+    def test_find_conflicts(self):
+        for _ in range(500):
+            solution = [random_path(4) for _ in range(random.randint(1, 6))]
+
+            expected = find_all_conflicts(solution)
+            conflicts = find_conflicts(solution)
+            assert sorted(map(describe, conflicts)) == sorted(expected)
+            # in time order
+            times = [describe(conflict)[-1] for conflict in conflicts]
+            assert times == sorted(times)
+
+            first_conflict = find_first_conflict(solution, encode=lambda point: (point.x, point.y))
+            if not expected:
+                assert first_conflict is None
+            else:
+                assert describe(first_conflict) == describe(conflicts[0])
+
+    def test_parked_agent(self):
+        # agent 1 reaches its goal at time 1, agent 0 passes there at time 2
+        solution = [
+            [(Point2D(0, 0), 0), (Point2D(1, 0), 1), (Point2D(2, 0), 2), (Point2D(3, 0), 3)],
+            [(Point2D(2, 1), 0), (Point2D(2, 0), 1)],
+        ]
+        conflict = find_first_conflict(solution)
+        assert conflict == VertexConflict(agent_ids=[0, 1], time=2, point=Point2D(2, 0))
+
+    def test_swap(self):
+        solution = [
+            [(Point2D(0, 0), 0), (Point2D(1, 0), 1)],
+            [(Point2D(1, 0), 0), (Point2D(0, 0), 1)],
+        ]
+        conflict = find_first_conflict(solution)
+        assert isinstance(conflict, EdgeConflict)
+        assert conflict.points == {
+            0: (Point2D(0, 0), Point2D(1, 0)),
+            1: (Point2D(1, 0), Point2D(0, 0)),
+        }
+        assert conflict.times == (0, 1)
+
+    def test_conflict_graph(self):
+        def encode(point):
+            # the random walks may leave the 4x4 grid
+            return (point.x + 16) * 64 + point.y + 16
+
+        for _ in range(200):
+            solution = [random_path(4) for _ in range(random.randint(2, 6))]
+            conflict_graph = ConflictGraph.from_solution(solution, encode)
+            for _ in range(5):
+                # replace one path and compare with the graph built from scratch
+                agent_id = random.randrange(len(solution))
+                solution = solution.copy()
+                solution[agent_id] = random_path(4)
+                conflict_graph = conflict_graph.replace_path(agent_id, solution[agent_id], encode)
+                expected = ConflictGraph.from_solution(solution, encode)
+                assert conflict_graph.pairs == expected.pairs
+                assert conflict_graph.num_of_conflicts == len(find_conflicts(solution))
+
+                pair = conflict_graph.get_first_pair()
+                first_conflict = find_first_conflict(solution)
+                if first_conflict is None:
+                    assert pair is None
+                else:
+                    assert describe(first_conflict)[-1] == conflict_graph.pairs[pair][1]
+                    conflict = find_first_conflict(solution, agent_ids=pair)
+                    assert describe(conflict)[-1] == describe(first_conflict)[-1]
@@ -0,0 +1,98 @@
+"""Tests for `constraint` module."""
+
+import random
+
+from multi_agent_path_finding.common import Point2D
+from multi_agent_path_finding.common.constraint import (
+    ConstraintTable,
+    EdgeConstraint,
+    PositiveEdgeConstraint,
+    PositiveVertexConstraint,
+    VertexConstraint,
+    ZobristTable,
+)
+
+
+class TestConstraintTable:
+    def test_lookup(self):
+        constraints = [
+            VertexConstraint(agent_id=0, time=3, point=Point2D(1, 1)),
+            VertexConstraint(agent_id=0, time=7, point=Point2D(1, 1)),
+            EdgeConstraint(agent_id=0, times=(4, 5), points=(Point2D(0, 0), Point2D(0, 1))),
+            EdgeConstraint(agent_id=0, times=(8, 9), points=(Point2D(2, 2), Point2D(2, 2))),
+        ]
+        table = ConstraintTable(constraints)
+
+        assert len(table) == 4
+        assert table.is_constrained(Point2D(1, 0), Point2D(1, 1), 2, 3)
+        assert not table.is_constrained(Point2D(1, 0), Point2D(1, 1), 3, 4)
+        assert table.is_constrained(Point2D(0, 0), Point2D(0, 1), 4, 5)
+        # the reverse move is not constrained
+        assert not table.is_constrained(Point2D(0, 1), Point2D(0, 0), 4, 5)
+
+        assert table.get_latest_time(Point2D(1, 1)) == 7
+        # the agent may not stay from 8 to 9, but may stay from 9 on
+        assert table.get_latest_time(Point2D(2, 2)) == 8
+        assert table.get_latest_time(Point2D(0, 1)) == -1
+        assert table.latest_time == 9
+
+    def test_positive_constraints(self):
+        constraints = [
+            PositiveVertexConstraint(agent_id=0, time=2, point=Point2D(1, 1)),
+            PositiveEdgeConstraint(agent_id=0, times=(5, 6), points=(Point2D(2, 2), Point2D(2, 3))),
+        ]
+        table = ConstraintTable(constraints)
+
+        # every other point is ruled out at the times of the positive constraints
+        assert not table.is_constrained(Point2D(1, 0), Point2D(1, 1), 1, 2)
+        assert table.is_constrained(Point2D(1, 0), Point2D(1, 0), 1, 2)
+        assert not table.is_constrained(Point2D(1, 0), Point2D(1, 0), 2, 3)
+        assert table.is_constrained(Point2D(2, 1), Point2D(2, 1), 4, 5)
+        assert not table.is_constrained(Point2D(2, 2), Point2D(2, 3), 5, 6)
+        # the agent may stay at a point for good once the last one has passed
+        assert table.get_latest_time(Point2D(2, 3)) == 5
+        assert table.get_latest_time(Point2D(0, 0)) == 6
+        assert table.latest_time == 6
+
+        # the other agents must keep off the points and the reverse move
+        path = [(Point2D(2, 1), 0), (Point2D(2, 2), 1)]
+        assert constraints[0].get_negative_constraints(1) == [
+            VertexConstraint(agent_id=1, time=2, point=Point2D(1, 1))
+        ]
+        assert not constraints[0].is_violated_by(path)
+        # an agent parked at its goal stays there
+        assert constraints[1].is_violated_by(path)
+        other_table = ConstraintTable(constraints[1].get_negative_constraints(1))
+        assert other_table.is_constrained(Point2D(2, 1), Point2D(2, 2), 4, 5)
+        assert other_table.is_constrained(Point2D(2, 3), Point2D(2, 2), 5, 6)
+        assert not other_table.is_constrained(Point2D(2, 4), Point2D(2, 4), 5, 6)
+
+
+class TestZobristTable:
+    def test_fingerprint(self):
+        def random_constraint():
+            agent_id = random.randint(0, 2)
+            point = Point2D(random.randint(0, 3), random.randint(0, 3))
+            time = random.randint(0, 5)
+            is_positive = random.random() < 0.5
+            if random.random() < 0.5:
+                constraint_class = PositiveVertexConstraint if is_positive else VertexConstraint
+                return constraint_class(agent_id=agent_id, time=time, point=point)
+            next_point = random.choice(point.get_neighbor_points())
+            constraint_class = PositiveEdgeConstraint if is_positive else EdgeConstraint
+            return constraint_class(
+                agent_id=agent_id, times=(time, time + 1), points=(point, next_point)
+            )
+
+        zobrist_table = ZobristTable(seed=0)
+        fingerprints = {}
+        for _ in range(500):
+            constraints = [random_constraint() for _ in range(random.randint(0, 4))]
+            fingerprint = zobrist_table.get_fingerprint(constraints)
+            # the order of the constraints does not matter
+            random.shuffle(constraints)
+            assert zobrist_table.get_fingerprint(constraints) == fingerprint
+
+            # a constraint listed twice counts once
+            constraint_set = frozenset(map(repr, constraints))
+            assert fingerprints.setdefault(fingerprint, constraint_set) == constraint_set
@@ -0,0 +1,58 @@
+"""Tests for `ct_heuristic` module."""
+
+import random
+from itertools import product
+
+from multi_agent_path_finding.cbs.cbs import ConflictBasedSearch
+from multi_agent_path_finding.cbs.ct_heuristic import min_vertex_cover
+from tests.test_cbs import crossing_instance, random_instances
+
+
+class TestCTHeuristic:
+    def test_min_vertex_cover(self):
+        for _ in range(200):
+            num_of_vertices = random.randint(1, 6)
+            edge_weights = {}
+            for vertex in range(num_of_vertices):
+                for other_vertex in range(vertex + 1, num_of_vertices):
+                    if random.random() < 0.4:
+                        edge_weights[(vertex, other_vertex)] = random.randint(0, 3)
+
+            # every assignment of values up to the largest weight
+            max_weight = max(edge_weights.values(), default=0)
+            expected = min(
+                sum(values)
+                for values in product(range(max_weight + 1), repeat=num_of_vertices)
+                if all(values[a] + values[b] >= w for (a, b), w in edge_weights.items())
+            )
+            assert min_vertex_cover(edge_weights) == expected
+
+    def test_large_component(self):
+        # a cycle of 21 vertices, beyond the exact size, needs 11 of them but
+        # is bounded by a matching of 10 edges
+        edge_weights = {(vertex, (vertex + 1) % 21): 1 for vertex in range(21)}
+        assert min_vertex_cover(edge_weights) == 10
+        # the small components beside it are still solved exactly
+        edge_weights.update({(21, 22): 1, (22, 23): 1, (23, 21): 1})
+        assert min_vertex_cover(edge_weights) == 12
+
+    def test_plan(self):
+        start_points, goal_points, env = crossing_instance()
+        planner = ConflictBasedSearch(start_points, goal_points, env)
+        planner.plan()
+        ct_size = planner.ct_size
+        for ct_heuristic in ["cg", "dg", "wdg"]:
+            planner = ConflictBasedSearch(start_points, goal_points, env, ct_heuristic=ct_heuristic)
+            assert planner.calculate_cost(planner.plan()) == 29
+            # the heuristic raises the cost of the nodes that are left to split
+            assert planner.ct_size < ct_size
+
+        for start_points, goal_points, env in random_instances(3, [6, 6], 4, 4):
+            planner = ConflictBasedSearch(start_points, goal_points, env)
+            cost = planner.calculate_cost(planner.plan())
+            for ct_heuristic in ["cg", "dg", "wdg"]:
+                planner = ConflictBasedSearch(
+                    start_points, goal_points, env, ct_heuristic=ct_heuristic
+                )
+                # an admissible heuristic keeps the solution optimal
+                assert planner.calculate_cost(planner.plan()) == cost
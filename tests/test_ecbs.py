@@ -3,9 +3,11 @@
 import random
 from itertools import combinations
 
+from multi_agent_path_finding.common.conflict import find_conflicts
 from multi_agent_path_finding.ecbs.ecbs import EnhancedConflictBasedSearch
 from multi_agent_path_finding.common.environment import Environment
 from multi_agent_path_finding.common.point import Point2D, Point3D
+from tests.test_cbs import crossing_instance, is_in_positive_branch, random_instances
 
 
 def find_first_conflict(solution) -> bool:
@@ -37,6 +39,15 @@ def find_first_conflict(solution) -> bool:
     return False
 
 
+class RecordingEnhancedConflictBasedSearch(EnhancedConflictBasedSearch):
+    # keeps the CT node of the solution
+    def find_first_conflict(self, node):
+        conflict = super().find_first_conflict(node)
+        if conflict is None:
+            self.solution_node = node
+        return conflict
+
+
 class TestEnhancedConflictBasedSearch:
     def test_open_plan(self):
         for dimension in [2, 3]:
@@ -95,3 +106,24 @@ class TestEnhancedConflictBasedSearch:
             assert not find_first_conflict(interpolated_solution)
             # check if the solution is bounded suboptimal
             assert planner.calculate_cost(solution) <= w * lower_bound
+
+    def test_disjoint_splitting(self):
+        start_points, goal_points, env = crossing_instance()
+        planner = RecordingEnhancedConflictBasedSearch(
+            start_points, goal_points, env, 1.5, disjoint_splitting=True
+        )
+        solution, lower_bound = planner.plan()
+        assert not find_conflicts(solution)
+        assert planner.calculate_cost(solution) <= 1.5 * lower_bound
+        # the solution is found below a positive constraint
+        assert is_in_positive_branch(planner.solution_node)
+
+        for w, (start_points, goal_points, env) in zip(
+            [1.1, 1.3, 1.5, 1.7, 1.9], random_instances(5, [6, 6], 4, 4)
+        ):
+            planner = EnhancedConflictBasedSearch(
+                start_points, goal_points, env, w, disjoint_splitting=True
+            )
+            solution, lower_bound = planner.plan()
+            assert not find_conflicts(solution)
+            assert planner.calculate_cost(solution) <= w * lower_bound
@@ -0,0 +1,172 @@
+"""Tests for `environment` module."""
+
+import random
+from itertools import product
+
+from multi_agent_path_finding.common import Environment
+from multi_agent_path_finding.common import Point2D, Point3D
+from multi_agent_path_finding.common.heuristic import UNREACHABLE, TrueDistanceHeuristic
+
+
+class TestEnvironment:
+    def test_is_free(self):
+        for dimension in [2, 3]:
+            space_limits = [random.randint(2, 20) for _ in range(dimension)]
+
+            if dimension == 2:
+                Point = Point2D
+            else:
+                Point = Point3D
+
+            # obstacles may also lie outside of the space
+            static_obstacles = {
+                Point(*[random.randint(-1, space_limits[i]) for i in range(dimension)])
+                for _ in range(random.randint(0, 100))
+            }
+            env = Environment(
+                dimension=dimension,
+                space_limit=space_limits,
+                static_obstacles=list(static_obstacles),
+            )
+
+            ranges = [range(-1, space_limits[i] + 1) for i in range(dimension)]
+            for coordinates in product(*ranges):
+                point = Point(*coordinates)
+                is_inside = all(0 <= c < limit for c, limit in zip(coordinates, space_limits))
+                assert env.is_free(point) == (is_inside and point not in static_obstacles)
+
+            grid = env.static_occupancy_grid()
+            assert grid.shape == tuple(space_limits)
+            num_of_inside_obstacles = 0
+            for point in static_obstacles:
+                coordinates = tuple(point.__dict__.values())
+                if all(0 <= c < limit for c, limit in zip(coordinates, space_limits)):
+                    assert grid[coordinates]
+                    num_of_inside_obstacles += 1
+            assert grid.sum() == num_of_inside_obstacles
+
+    def test_static_occupancy_is_bit_packed(self):
+        env = Environment(dimension=3, space_limit=[100, 100, 100])
+        assert env.static_occupancy.nbytes == 100 * 100 * 100 // 8
+
+    def test_dynamic_obstacle_index(self):
+        space_limits = [4, 4]
+        points = [Point2D(x, y) for x in range(4) for y in range(4)]
+        dynamic_obstacles = []
+        for _ in range(40):
+            start_time = random.randint(0, 30)
+            end_time = random.choice([-1, random.randint(start_time, 40)])
+            dynamic_obstacles.append((random.choice(points), [start_time, end_time]))
+        env = Environment(
+            dimension=2, space_limit=space_limits, dynamic_obstacles=dynamic_obstacles
+        )
+
+        for point in points:
+            cell = env.point_to_cell(point)
+            blocked_times = [
+                time
+                for time in range(60)
+                if any(obstacle.is_colliding(point, time) for obstacle in env.dynamic_obstacles)
+            ]
+            for time in range(60):
+                assert env.is_blocked(point, time) == (time in blocked_times)
+
+                next_free_time = env.dynamic_obstacle_index.next_free_time(cell, time)
+                free_times = [t for t in range(time, 60) if t not in blocked_times]
+                if next_free_time is None:
+                    assert not free_times
+                else:
+                    assert next_free_time == free_times[0]
+
+            for start_time, end_time in env.dynamic_obstacle_index.safe_intervals(cell):
+                for time in range(start_time, min(end_time, 59) + 1):
+                    assert time not in blocked_times
+                assert start_time == 0 or start_time - 1 in blocked_times
+                assert end_time == float("inf") or end_time + 1 in blocked_times
+
+    def test_cell_encoding(self):
+        for dimension in [2, 3]:
+            space_limits = [random.randint(2, 8) for _ in range(dimension)]
+
+            if dimension == 2:
+                Point = Point2D
+            else:
+                Point = Point3D
+
+            static_obstacles = {
+                Point(*[random.randint(0, space_limits[i] - 1) for i in range(dimension)])
+                for _ in range(random.randint(0, 20))
+            }
+            env = Environment(
+                dimension=dimension,
+                space_limit=space_limits,
+                static_obstacles=list(static_obstacles),
+            )
+
+            for coordinates in product(*[range(limit) for limit in space_limits]):
+                point = Point(*coordinates)
+                cell = env.point_to_cell(point)
+                assert env.cell_to_point(cell) == point
+                if point in static_obstacles:
+                    continue
+
+                neighbor_points = [
+                    neighbor_point
+                    for neighbor_point in point.get_neighbor_points()
+                    if env.is_free(neighbor_point)
+                ]
+                neighbor_cells = env.get_neighbor_cells(cell)
+                assert [env.cell_to_point(c) for c in neighbor_cells] == neighbor_points
+                for neighbor_cell in neighbor_cells:
+                    other_point = env.cell_to_point(neighbor_cell)
+                    assert env.manhattan_distance(cell, neighbor_cell) == (
+                        point.manhattan_distance(other_point)
+                    )
+
+    def test_adjacency(self):
+        static_obstacles = [Point3D(1, 1, 1), Point3D(0, 1, 1)]
+        env = Environment(dimension=3, space_limit=[3, 4, 5], static_obstacles=static_obstacles)
+        indptr, indices = env.get_adjacency()
+        assert env.get_adjacency() is env.get_adjacency()
+        assert len(indptr) == env.num_of_cells + 1
+        assert len(indices) == indptr[-1]
+
+        for obstacle_point in static_obstacles:
+            assert len(env.get_neighbor_cells(env.point_to_cell(obstacle_point))) == 0
+        corner_cell = env.point_to_cell(Point3D(0, 0, 0))
+        assert [env.cell_to_point(cell) for cell in env.get_neighbor_cells(corner_cell)] == [
+            Point3D(1, 0, 0),
+            Point3D(0, 1, 0),
+            Point3D(0, 0, 1),
+            Point3D(0, 0, 0),
+        ]
+
+    def test_component_labels(self):
+        for dimension in [2, 3]:
+            space_limits = [random.randint(2, 10) for _ in range(dimension)]
+
+            if dimension == 2:
+                Point = Point2D
+            else:
+                Point = Point3D
+
+            static_obstacles = {
+                Point(*[random.randint(0, space_limits[i] - 1) for i in range(dimension)])
+                for _ in range(random.randint(0, 200))
+            }
+            env = Environment(
+                dimension=dimension,
+                space_limit=space_limits,
+                static_obstacles=list(static_obstacles),
+            )
+            assert env.get_component_labels() is env.get_component_labels()
+
+            points = [Point(*coordinates) for coordinates in product(*map(range, space_limits))]
+            point = random.choice(points)
+            heuristic = TrueDistanceHeuristic(env, [point])
+            distance_map = heuristic.get_distance_map(point)
+            for other_point in points:
+                is_reachable = distance_map[tuple(other_point.__dict__.values())] != UNREACHABLE
+                assert env.is_reachable(point, other_point) == (
+                    is_reachable and point not in static_obstacles
+                )
@@ -0,0 +1,93 @@
+"""Tests for `heuristic` module."""
+
+import random
+from collections import deque
+from itertools import product
+
+from multi_agent_path_finding.common import Environment
+from multi_agent_path_finding.common import Point2D, Point3D
+from multi_agent_path_finding.common.heuristic import TrueDistanceHeuristic, UNREACHABLE
+from multi_agent_path_finding.stastar import SpaceTimeAstar
+
+
+def breadth_first_search(goal_point, static_obstacles, space_limits):
+    distances = {goal_point: 0}
+    queue = deque([goal_point])
+    while queue:
+        point = queue.popleft()
+        for neighbor_point in point.get_neighbor_points():
+            coordinates = list(neighbor_point.__dict__.values())
+            if any(c < 0 or c >= limit for c, limit in zip(coordinates, space_limits)):
+                continue
+            if neighbor_point in static_obstacles or neighbor_point in distances:
+                continue
+            distances[neighbor_point] = distances[point] + 1
+            queue.append(neighbor_point)
+    return distances
+
+
+class TestTrueDistanceHeuristic:
+    def test_distance_map(self):
+        for dimension in [2, 3]:
+            space_limits = [random.randint(2, 12) for _ in range(dimension)]
+
+            if dimension == 2:
+                Point = Point2D
+            else:
+                Point = Point3D
+
+            static_obstacles = {
+                Point(*[random.randint(0, space_limits[i] - 1) for i in range(dimension)])
+                for _ in range(random.randint(0, 40))
+            }
+            goal_points = []
+            while len(goal_points) < 5:
+                goal_point = Point(
+                    *[random.randint(0, space_limits[i] - 1) for i in range(dimension)]
+                )
+                if goal_point not in static_obstacles:
+                    goal_points.append(goal_point)
+
+            env = Environment(
+                dimension=dimension,
+                space_limit=space_limits,
+                static_obstacles=list(static_obstacles),
+            )
+            heuristic = TrueDistanceHeuristic(env, goal_points, batch_size=2)
+
+            for goal_point in goal_points:
+                distance_map = heuristic.get_distance_map(goal_point)
+                distances = breadth_first_search(goal_point, static_obstacles, space_limits)
+                for coordinates in product(*[range(limit) for limit in space_limits]):
+                    distance = distances.get(Point(*coordinates), UNREACHABLE)
+                    assert distance_map[coordinates] == distance
+
+    def test_plan_with_true_distance(self):
+        space_limits = [20, 20]
+        # a wall with a single gap at the bottom
+        static_obstacles = [Point2D(10, y) for y in range(1, 20)]
+        start_point = Point2D(0, 19)
+        goal_point = Point2D(19, 19)
+        env = Environment(dimension=2, space_limit=space_limits, static_obstacles=static_obstacles)
+        heuristic = TrueDistanceHeuristic(env, [goal_point])
+
+        path = SpaceTimeAstar(start_point, goal_point, env).plan()
+        informed_path = SpaceTimeAstar(
+            start_point, goal_point, env, distance_map=heuristic.get_distance_map(goal_point)
+        ).plan()
+
+        assert len(informed_path) == len(path) == 19 + 19 + 19 + 1
+        assert informed_path[-1] == (goal_point, len(informed_path) - 1)
+
+        # the goal is walled off
+        env = Environment(
+            dimension=2,
+            space_limit=space_limits,
+            static_obstacles=static_obstacles + [Point2D(10, 0)],
+        )
+        heuristic = TrueDistanceHeuristic(env, [goal_point])
+        planner = SpaceTimeAstar(
+            start_point, goal_point, env, distance_map=heuristic.get_distance_map(goal_point)
+        )
+        assert planner.plan() is None
+
@@ -0,0 +1,52 @@
+"""Tests for the import time of the planning packages."""
+
+import json
+import os
+import subprocess
+import sys
+
+# seconds a fresh interpreter may spend importing every planner
+IMPORT_TIME_BUDGET = 1.0
+
+PLANNER_MODULES = [
+    "multi_agent_path_finding.stastar.stastar",
+    "multi_agent_path_finding.stastar_dp.stastar_dp",
+    "multi_agent_path_finding.stastar_epsilon.stastar_epsilon",
+    "multi_agent_path_finding.cbs.cbs",
+    "multi_agent_path_finding.cbs_dp.cbs_dp",
+    "multi_agent_path_finding.ecbs.ecbs",
+]
+
+SCRIPT = f"""
+import importlib, json, sys, time
+start_time = time.perf_counter()
+for module in {PLANNER_MODULES!r}:
+    importlib.import_module(module)
+print(json.dumps({{
+    "elapsed": time.perf_counter() - start_time,
+    "plotting": sorted(m for m in sys.modules if m.split(".")[0] == "matplotlib"),
+}}))
+"""
+
+
+class TestImportTime:
+    def test_import_time(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([root, os.environ.get("PYTHONPATH", "")]))
+        # take the best of a few runs so a busy machine does not fail the budget
+        results = [
+            json.loads(
+                subprocess.run(
+                    [sys.executable, "-c", SCRIPT],
+                    cwd=root,
+                    env=env,
+                    capture_output=True,
+                    check=True,
+                    text=True,
+                ).stdout
+            )
+            for _ in range(3)
+        ]
+
+        assert all(not result["plotting"] for result in results)
+        assert min(result["elapsed"] for result in results) < IMPORT_TIME_BUDGET
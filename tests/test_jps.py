@@ -0,0 +1,114 @@
+"""Tests for `jps` package."""
+
+import random
+
+from multi_agent_path_finding.cbs.cbs import ConflictBasedSearch
+from multi_agent_path_finding.common import Environment
+from multi_agent_path_finding.common import Point2D, Point3D
+from multi_agent_path_finding.common.constraint import EdgeConstraint, VertexConstraint
+from multi_agent_path_finding.jps import JumpPointSearch
+from multi_agent_path_finding.stastar import SpaceTimeAstar
+
+
+def is_valid_path(path, env, constraints):
+    for (point, time), (next_point, next_time) in zip(path, path[1:]):
+        if next_time != time + 1 or point.manhattan_distance(next_point) > 1:
+            return False
+        if not env.is_free(next_point) or env.is_blocked(next_point, next_time):
+            return False
+        for constraint in constraints:
+            if isinstance(constraint, VertexConstraint):
+                if constraint.point == next_point and constraint.time == next_time:
+                    return False
+            elif constraint.points == (point, next_point) and constraint.times == (time, next_time):
+                return False
+    return True
+
+
+class TestJumpPointSearch:
+    def test_same_cost_as_space_time_astar(self):
+        for _ in range(100):
+            dimension = random.choice([2, 3])
+            if dimension == 2:
+                Point = Point2D
+                space_limits = [random.randint(3, 12) for _ in range(2)]
+            else:
+                Point = Point3D
+                space_limits = [random.randint(2, 6) for _ in range(3)]
+
+            def random_point():
+                return Point(*[random.randint(0, limit - 1) for limit in space_limits])
+
+            static_obstacles = [random_point() for _ in range(random.randint(0, 30))]
+            dynamic_obstacles = []
+            for _ in range(random.randint(0, 5)):
+                start_time = random.randint(0, 10)
+                end_time = random.choice([-1, start_time + random.randint(0, 5)])
+                dynamic_obstacles.append((random_point(), [start_time, end_time]))
+            env = Environment(
+                dimension=dimension,
+                space_limit=space_limits,
+                static_obstacles=static_obstacles,
+                dynamic_obstacles=dynamic_obstacles,
+            )
+
+            start_point = random_point()
+            goal_point = random_point()
+            if not env.is_free(start_point) or env.is_blocked(start_point, 0):
+                continue
+            if not env.is_free(goal_point) or env.is_blocked(goal_point, 0):
+                continue
+
+            constraints = []
+            for _ in range(random.randint(0, 10)):
+                point = random_point()
+                time = random.randint(1, 10)
+                if random.random() < 0.5:
+                    constraints.append(VertexConstraint(agent_id=0, point=point, time=time))
+                else:
+                    next_point = random.choice(point.get_neighbor_points())
+                    constraints.append(
+                        EdgeConstraint(agent_id=0, points=(point, next_point), times=(time - 1, time))
+                    )
+
+            path = SpaceTimeAstar(start_point, goal_point, env).plan(constraints)
+            planner = JumpPointSearch(start_point, goal_point, env)
+            # the second call reuses the cached jumps
+            for _ in range(2):
+                jps_path = planner.plan(constraints)
+                if path is None:
+                    assert jps_path is None
+                    continue
+                assert len(jps_path) == len(path)
+                assert jps_path[0] == (start_point, 0)
+                assert jps_path[-1] == (goal_point, len(path) - 1)
+                assert is_valid_path(jps_path, env, constraints)
+
+    def test_fewer_expansions(self):
+        # a wall with a single gap at the far end
+        space_limits = [40, 40]
+        static_obstacles = [Point2D(20, y) for y in range(39)]
+        start_point = Point2D(0, 0)
+        goal_point = Point2D(39, 0)
+        env = Environment(dimension=2, space_limit=space_limits, static_obstacles=static_obstacles)
+
+        space_time_astar = SpaceTimeAstar(start_point, goal_point, env)
+        jps = JumpPointSearch(start_point, goal_point, env)
+        path = space_time_astar.plan()
+        jps_path = jps.plan()
+
+        assert jps_path == path
+        assert jps.num_of_expansions * 10 < space_time_astar.num_of_expansions
+
+    def test_as_cbs_planner(self):
+        space_limits = [8, 8]
+        start_points = [Point2D(0, 3), Point2D(7, 3), Point2D(3, 0), Point2D(3, 7)]
+        goal_points = [Point2D(7, 3), Point2D(0, 3), Point2D(3, 7), Point2D(3, 0)]
+        env = Environment(dimension=2, space_limit=space_limits)
+
+        solution = ConflictBasedSearch(start_points, goal_points, env).plan()
+        jps_solution = ConflictBasedSearch(
+            start_points, goal_points, env, planner_class=JumpPointSearch
+        ).plan()
+
+        assert sum(len(path) for path in jps_solution) == sum(len(path) for path in solution)
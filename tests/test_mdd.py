@@ -0,0 +1,160 @@
+"""Tests for `mdd` module."""
+
+import random
+from itertools import product
+
+from multi_agent_path_finding.common import Environment, Point2D
+from multi_agent_path_finding.common.conflict import (
+    ConflictType,
+    EdgeConflict,
+    VertexConflict,
+    find_conflicts,
+)
+from multi_agent_path_finding.common.constraint import (
+    ConstraintTable,
+    EdgeConstraint,
+    VertexConstraint,
+)
+from multi_agent_path_finding.common.mdd import MDD, MDDCache, classify_conflict, is_dependent
+from multi_agent_path_finding.stastar.stastar import SpaceTimeAstar
+
+
+def find_all_paths(env, start_cell, goal_cell, cost, constraint_table):
+    # every path of the cost that ends at the goal and may stay there for good
+    goal_time = env.get_goal_time(goal_cell, constraint_table.get_latest_time(goal_cell))
+    if cost < goal_time:
+        return []
+    paths = []
+    stack = [[start_cell]]
+    while stack:
+        path = stack.pop()
+        if len(path) == cost + 1:
+            if path[-1] == goal_cell:
+                paths.append(path)
+            continue
+        time = len(path)
+        for cell in env.get_neighbor_cells(path[-1]):
+            if env.dynamic_obstacle_index.is_blocked(cell, time):
+                continue
+            if constraint_table.is_constrained(path[-1], cell, time - 1, time):
+                continue
+            stack.append(path + [cell])
+    return paths
+
+
+class TestMDD:
+    def test_build(self):
+        for _ in range(50):
+            space_limits = [3, 3]
+            points = [Point2D(x, y) for x in range(3) for y in range(3)]
+            start_point, goal_point = random.sample(points, 2)
+            static_obstacles = [
+                point
+                for point in random.sample(points, 2)
+                if point not in [start_point, goal_point]
+            ]
+            env = Environment(
+                dimension=2, space_limit=space_limits, static_obstacles=static_obstacles
+            )
+            if not env.is_reachable(start_point, goal_point):
+                continue
+
+            constraints = []
+            for _ in range(random.randint(0, 4)):
+                point = random.choice(points)
+                time = random.randint(1, 4)
+                if random.random() < 0.5:
+                    constraints.append(VertexConstraint(agent_id=0, time=time, point=point))
+                else:
+                    next_point = random.choice(point.get_neighbor_points())
+                    constraints.append(
+                        EdgeConstraint(
+                            agent_id=0, times=(time - 1, time), points=(point, next_point)
+                        )
+                    )
+            constraint_table = ConstraintTable.from_constraints(constraints, env.point_to_cell)
+
+            path = SpaceTimeAstar(start_point, goal_point, env).plan(constraints)
+            if not path:
+                continue
+            start_cell = env.point_to_cell(start_point)
+            goal_cell = env.point_to_cell(goal_point)
+            for cost in [len(path) - 2, len(path) - 1, len(path)]:
+                mdd = MDD.build(env, start_cell, goal_cell, cost, constraint_table)
+                paths = find_all_paths(env, start_cell, goal_cell, cost, constraint_table)
+                if not paths:
+                    assert len(mdd) == 0
+                    continue
+                for time in range(cost + 3):
+                    assert mdd.get_cells(time) == {p[min(time, cost)] for p in paths}
+
+    def test_is_dependent(self):
+        for _ in range(50):
+            points = [Point2D(x, y) for x in range(3) for y in range(3)]
+            env = Environment(dimension=2, space_limit=[3, 3])
+            start_cells = [env.point_to_cell(point) for point in random.sample(points, 2)]
+            goal_cells = [env.point_to_cell(point) for point in random.sample(points, 2)]
+            costs = [
+                env.manhattan_distance(start_cell, goal_cell) + random.randint(0, 1)
+                for start_cell, goal_cell in zip(start_cells, goal_cells)
+            ]
+            mdds = []
+            all_paths = []
+            for start_cell, goal_cell, cost in zip(start_cells, goal_cells, costs):
+                mdds.append(MDD.build(env, start_cell, goal_cell, cost, ConstraintTable()))
+                all_paths.append(
+                    find_all_paths(env, start_cell, goal_cell, cost, ConstraintTable())
+                )
+
+            # some pair of paths is free of conflicts
+            is_independent = False
+            for path, other_path in product(*all_paths):
+                solution = [
+                    [(env.cell_to_point(cell), time) for time, cell in enumerate(path)],
+                    [(env.cell_to_point(cell), time) for time, cell in enumerate(other_path)],
+                ]
+                if not find_conflicts(solution):
+                    is_independent = True
+                    break
+            assert is_dependent(*mdds) != is_independent
+
+    def test_classify_conflict(self):
+        # the corridor has a single path to its end, but two of cost 2 to its middle
+        env = Environment(dimension=2, space_limit=[3, 1])
+        cells = [env.point_to_cell(Point2D(x, 0)) for x in range(3)]
+        straight_mdd = MDD.build(env, cells[0], cells[2], 2, ConstraintTable())
+        wide_mdd = MDD.build(env, cells[0], cells[1], 2, ConstraintTable())
+        assert [straight_mdd.get_width(time) for time in range(4)] == [1, 1, 1, 1]
+        assert [wide_mdd.get_width(time) for time in range(4)] == [1, 2, 1, 1]
+
+        conflict = VertexConflict(agent_ids=[0, 1], time=1, point=Point2D(1, 0))
+        assert classify_conflict(conflict, {0: straight_mdd, 1: straight_mdd}) == (
+            ConflictType.CARDINAL
+        )
+        assert classify_conflict(conflict, {0: straight_mdd, 1: wide_mdd}) == (
+            ConflictType.SEMI_CARDINAL
+        )
+        assert classify_conflict(conflict, {0: wide_mdd, 1: wide_mdd}) == (
+            ConflictType.NON_CARDINAL
+        )
+        conflict = EdgeConflict(
+            agent_ids=[0, 1],
+            times=(1, 2),
+            points={0: (Point2D(1, 0), Point2D(2, 0)), 1: (Point2D(2, 0), Point2D(1, 0))},
+        )
+        assert classify_conflict(conflict, {0: straight_mdd, 1: wide_mdd}) == (
+            ConflictType.SEMI_CARDINAL
+        )
+
+    def test_cache(self):
+        env = Environment(dimension=2, space_limit=[3, 1])
+        mdds = [MDD.build(env, 0, 2, 2, ConstraintTable()) for _ in range(3)]
+        cache = MDDCache(max_num_of_nodes=2 * len(mdds[0]))
+        cache.put(0, mdds[0])
+        cache.put(1, mdds[1])
+        # the least recently used MDD is evicted first
+        assert cache.get(0) is mdds[0]
+        cache.put(2, mdds[2])
+        assert 1 not in cache
+        assert cache.get(0) is mdds[0] and cache.get(2) is mdds[2]
+        assert cache.num_of_nodes == 2 * len(mdds[0])
@@ -0,0 +1,120 @@
+"""Tests for `od_astar` package."""
+
+import random
+
+from multi_agent_path_finding.cbs.cbs import ConflictBasedSearch
+from multi_agent_path_finding.common import Environment, Point2D
+from multi_agent_path_finding.common.conflict import find_conflicts
+from multi_agent_path_finding.common.constraint import (
+    EdgeConstraint,
+    PositiveVertexConstraint,
+    VertexConstraint,
+)
+from multi_agent_path_finding.common.plan_status import PlanStatus
+from multi_agent_path_finding.od_astar import OperatorDecompositionAstar
+from multi_agent_path_finding.stastar import SpaceTimeAstar
+from tests.test_cbs import random_instance, random_instances
+
+
+class TestOperatorDecompositionAstar:
+    def test_same_cost_as_cbs(self):
+        # seeded draws of two and three agents that CBS solves quickly
+        instances = random_instances(10, [4, 4], 3, 2, seed=2)
+        instances += random_instances(10, [4, 4], 3, 3, seed=2)
+        for start_points, goal_points, env in instances:
+            solution = ConflictBasedSearch(start_points, goal_points, env).plan()
+            planner = OperatorDecompositionAstar(start_points, goal_points, env)
+            paths = planner.plan()
+
+            assert planner.status == PlanStatus.SUCCESS
+            assert sum(len(path) for path in paths) == sum(len(path) for path in solution)
+            assert not find_conflicts(paths)
+            for path, start_point, goal_point in zip(paths, start_points, goal_points):
+                assert path[0] == (start_point, 0)
+                assert path[-1] == (goal_point, len(path) - 1)
+
+    def test_constraints(self):
+        # a single agent is planned like SpaceTimeAstar
+        for _ in range(30):
+            start_points, goal_points, env = random_instance([5, 5], 4, 1)
+            if not env.is_reachable(start_points[0], goal_points[0]):
+                continue
+
+            constraints = []
+            for _ in range(random.randint(0, 6)):
+                point = Point2D(random.randint(0, 4), random.randint(0, 4))
+                time = random.randint(1, 8)
+                constraint_type = random.choice(["vertex", "edge", "positive"])
+                if constraint_type == "vertex":
+                    constraints.append(VertexConstraint(agent_id=0, time=time, point=point))
+                elif constraint_type == "edge":
+                    next_point = random.choice(point.get_neighbor_points())
+                    constraints.append(
+                        EdgeConstraint(
+                            agent_id=0, times=(time - 1, time), points=(point, next_point)
+                        )
+                    )
+                elif not any(isinstance(c, PositiveVertexConstraint) for c in constraints):
+                    constraints.append(PositiveVertexConstraint(agent_id=0, time=time, point=point))
+
+            path = SpaceTimeAstar(start_points[0], goal_points[0], env).plan(constraints)
+            planner = OperatorDecompositionAstar(start_points, goal_points, env)
+            paths = planner.plan([constraints])
+            if path is None:
+                assert paths is None
+                assert planner.status == PlanStatus.NO_PATH
+                continue
+            assert len(paths[0]) == len(path)
+
+    def test_agent_leaving_goal(self):
+        # agent 0 starts at its goal in the corridor and has to step aside,
+        # its waits at the goal before it leaves count
+        space_limits = [4, 2]
+        static_obstacles = [Point2D(0, 1), Point2D(2, 1), Point2D(3, 1)]
+        start_points = [Point2D(1, 0), Point2D(0, 0)]
+        goal_points = [Point2D(1, 0), Point2D(3, 0)]
+        env = Environment(dimension=2, space_limit=space_limits, static_obstacles=static_obstacles)
+        paths = OperatorDecompositionAstar(start_points, goal_points, env).plan()
+
+        assert paths[0] == [(Point2D(1, 0), 0), (Point2D(1, 1), 1), (Point2D(1, 0), 2)]
+        assert len(paths[1]) - 1 == 3
+        assert not find_conflicts(paths)
+
+    def test_no_plan(self):
+        # without the pocket agent 0 cannot let agent 1 pass, the search ends
+        # although agent 0 may wait at its goal for ever
+        env = Environment(dimension=2, space_limit=[4, 1])
+        start_points = [Point2D(1, 0), Point2D(0, 0)]
+        goal_points = [Point2D(1, 0), Point2D(3, 0)]
+        planner = OperatorDecompositionAstar(start_points, goal_points, env)
+
+        assert planner.plan() is None
+        assert planner.status == PlanStatus.NO_PATH
+
+    def test_constrained_group(self):
+        # agent 0 may not take the short way, and the agents meet again after
+        # the static time of the search, where the node times still matter
+        space_limits = [6, 3]
+        static_obstacles = [Point2D(5, 1), Point2D(3, 1)]
+        start_points = [Point2D(1, 0), Point2D(0, 1)]
+        goal_points = [Point2D(4, 2), Point2D(4, 1)]
+        env = Environment(dimension=2, space_limit=space_limits, static_obstacles=static_obstacles)
+        constraints = [[VertexConstraint(agent_id=0, time=1, point=Point2D(2, 0))], []]
+        paths = OperatorDecompositionAstar(start_points, goal_points, env).plan(constraints)
+
+        assert sum(len(path) - 1 for path in paths) == 11
+        assert not find_conflicts(paths)
+        for path in paths:
+            assert [time for _, time in path] == list(range(len(path)))
+
+        # merged into a meta-agent, the group keeps CBS optimal
+        start_points.append(Point2D(3, 0))
+        goal_points.append(Point2D(0, 1))
+        solution = ConflictBasedSearch(start_points, goal_points, env).plan()
+        cost = sum(len(path) - 1 for path in solution)
+        for merge_bound in [2, 3]:
+            planner = ConflictBasedSearch(
+                start_points, goal_points, env, bypass=True, merge_bound=merge_bound
+            )
+            solution = planner.plan()
+            assert planner.calculate_cost(solution) == cost
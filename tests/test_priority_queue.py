@@ -0,0 +1,67 @@
+"""Tests for `priority_queue` module."""
+
+import random
+
+import pytest
+
+from multi_agent_path_finding.common.priority_queue import BucketQueue, PriorityQueue
+
+
+class Item:
+    def __init__(self, name, priority):
+        self.name = name
+        self.priority = priority
+
+    def __hash__(self):
+        return hash(self.name)
+
+    def __eq__(self, other):
+        return isinstance(other, Item) and self.name == other.name
+
+
+class TestPriorityQueue:
+    def test_pop_order(self):
+        for queue_type in [PriorityQueue, BucketQueue]:
+            queue = queue_type(key=lambda item: (item.priority,))
+            priorities = [random.randint(0, 50) for _ in range(200)]
+            for name, priority in enumerate(priorities):
+                queue.push(Item(name, priority))
+
+            popped = []
+            while queue:
+                popped.append(queue.pop().priority)
+            assert popped == sorted(priorities)
+
+    def test_decrease_key(self):
+        for queue_type in [PriorityQueue, BucketQueue]:
+            queue = queue_type(key=lambda item: (item.priority,))
+            queue.push(Item("a", 5))
+            queue.push(Item("b", 3))
+            queue.push(Item("a", 1))
+
+            assert len(queue) == 2
+            assert queue.get(Item("a", 0)).priority == 1
+            assert queue.pop().name == "a"
+            assert queue.pop().name == "b"
+            assert not queue
+
+    def test_remove(self):
+        for queue_type in [PriorityQueue, BucketQueue]:
+            queue = queue_type(key=lambda item: (item.priority,))
+            for name in range(10):
+                queue.push(Item(name, name))
+            queue.remove(Item(0, 0))
+            queue.remove(Item(5, 5))
+
+            assert Item(0, 0) not in queue
+            assert Item(1, 1) in queue
+            assert {item.name for item in queue} == {1, 2, 3, 4, 6, 7, 8, 9}
+            assert [queue.pop().name for _ in range(len(queue))] == [1, 2, 3, 4, 6, 7, 8, 9]
+            with pytest.raises(KeyError):
+                queue.pop()
+
+    def test_insertion_order_breaks_ties(self):
+        queue = PriorityQueue(key=lambda item: (item.priority,))
+        for name in range(10):
+            queue.push(Item(name, 0))
+        assert [queue.pop().name for _ in range(10)] == list(range(10))
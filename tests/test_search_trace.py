@@ -0,0 +1,41 @@
+"""Tests for `search_trace` module."""
+
+import random
+
+from multi_agent_path_finding.common import Environment
+from multi_agent_path_finding.common import Point2D
+from multi_agent_path_finding.common.search_trace import EXPAND, GENERATE, SearchTrace
+from multi_agent_path_finding.stastar import SpaceTimeAstar
+
+
+class TestSearchTrace:
+    def test_record_and_replay(self, tmp_path):
+        space_limits = [random.randint(5, 15) for _ in range(2)]
+        env = Environment(dimension=2, space_limit=space_limits)
+        start_point = Point2D(0, 0)
+        goal_point = Point2D(space_limits[0] - 1, space_limits[1] - 1)
+
+        trace = SearchTrace(space_limits)
+        path = SpaceTimeAstar(start_point, goal_point, env, trace=trace).plan()
+        assert path == SpaceTimeAstar(start_point, goal_point, env).plan()
+
+        trace.save(tmp_path / "trace.npz")
+        events = list(SearchTrace.load(tmp_path / "trace.npz").events())
+        assert events == list(trace.events())
+        assert len(events) == len(trace)
+
+        # the start is generated first and the goal is expanded last
+        assert events[0] == (GENERATE, (0, 0), 0, None, -1)
+        assert events[-1][:3] == (EXPAND, tuple(goal_point.__dict__.values()), len(path) - 1)
+
+        # every expanded node was generated before, with a parent expanded before it
+        generated = {}
+        expanded = set()
+        for event, point, time, parent_point, parent_time in events:
+            if event == EXPAND:
+                assert (point, time) in generated
+                expanded.add((point, time))
+            else:
+                if parent_point is not None:
+                    assert (parent_point, parent_time) in expanded
+                generated[(point, time)] = (parent_point, parent_time)
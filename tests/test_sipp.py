@@ -0,0 +1,146 @@
+"""Tests for `sipp` package."""
+
+import random
+
+from multi_agent_path_finding.cbs.cbs import ConflictBasedSearch
+from multi_agent_path_finding.common import Environment
+from multi_agent_path_finding.common import Point2D
+from multi_agent_path_finding.common.constraint import (
+    EdgeConstraint,
+    PositiveVertexConstraint,
+    VertexConstraint,
+)
+from multi_agent_path_finding.common.plan_status import PlanStatus
+from multi_agent_path_finding.sipp import SafeIntervalPathPlanning
+from multi_agent_path_finding.stastar import SpaceTimeAstar
+
+
+def random_point(space_limits):
+    return Point2D(*[random.randint(0, limit - 1) for limit in space_limits])
+
+
+def is_valid_path(path, env, constraints):
+    for (point, time), (next_point, next_time) in zip(path, path[1:]):
+        if next_time != time + 1 or point.manhattan_distance(next_point) > 1:
+            return False
+        if not env.is_free(next_point) or env.is_blocked(next_point, next_time):
+            return False
+        for constraint in constraints:
+            if isinstance(constraint, VertexConstraint):
+                if constraint.point == next_point and constraint.time == next_time:
+                    return False
+            elif constraint.points == (point, next_point) and constraint.times == (time, next_time):
+                return False
+    return True
+
+
+class TestSafeIntervalPathPlanning:
+    def test_same_cost_as_space_time_astar(self):
+        for _ in range(30):
+            space_limits = [random.randint(3, 10) for _ in range(2)]
+            static_obstacles = [random_point(space_limits) for _ in range(random.randint(0, 10))]
+            dynamic_obstacles = []
+            for _ in range(random.randint(0, 10)):
+                start_time = random.randint(0, 15)
+                end_time = random.choice([-1, start_time + random.randint(0, 5)])
+                dynamic_obstacles.append((random_point(space_limits), [start_time, end_time]))
+            env = Environment(
+                dimension=2,
+                space_limit=space_limits,
+                static_obstacles=static_obstacles,
+                dynamic_obstacles=dynamic_obstacles,
+            )
+
+            start_point = random_point(space_limits)
+            goal_point = random_point(space_limits)
+            if not env.is_free(start_point) or env.is_blocked(start_point, 0):
+                continue
+            if not env.is_free(goal_point) or env.is_blocked(goal_point, 0):
+                continue
+
+            constraints = []
+            for _ in range(random.randint(0, 20)):
+                point = random_point(space_limits)
+                time = random.randint(1, 15)
+                if random.random() < 0.5:
+                    constraints.append(VertexConstraint(agent_id=0, point=point, time=time))
+                else:
+                    next_point = random.choice(point.get_neighbor_points())
+                    constraints.append(
+                        EdgeConstraint(agent_id=0, points=(point, next_point), times=(time - 1, time))
+                    )
+
+            path = SpaceTimeAstar(start_point, goal_point, env).plan(constraints)
+            planner = SafeIntervalPathPlanning(start_point, goal_point, env)
+            sipp_path = planner.plan(constraints)
+
+            if path is None:
+                assert sipp_path is None
+                assert planner.status == PlanStatus.NO_PATH
+                continue
+            assert len(sipp_path) == len(path)
+            assert sipp_path[0] == (start_point, 0)
+            assert sipp_path[-1] == (goal_point, len(path) - 1)
+            assert is_valid_path(sipp_path, env, constraints)
+
+    def test_positive_constraints(self):
+        for _ in range(30):
+            space_limits = [random.randint(3, 8) for _ in range(2)]
+            static_obstacles = [random_point(space_limits) for _ in range(random.randint(0, 8))]
+            env = Environment(
+                dimension=2, space_limit=space_limits, static_obstacles=static_obstacles
+            )
+            start_point = random_point(space_limits)
+            goal_point = random_point(space_limits)
+            if not env.is_free(start_point) or not env.is_free(goal_point):
+                continue
+
+            # the agent must pass through a point on its way
+            positive_constraint = PositiveVertexConstraint(
+                agent_id=0, time=random.randint(1, 10), point=random_point(space_limits)
+            )
+            constraints = [positive_constraint]
+            path = SpaceTimeAstar(start_point, goal_point, env).plan(constraints)
+            sipp_path = SafeIntervalPathPlanning(start_point, goal_point, env).plan(constraints)
+
+            if path is None:
+                assert sipp_path is None
+                continue
+            assert len(sipp_path) == len(path)
+            point_at_time = sipp_path[min(positive_constraint.time, len(sipp_path) - 1)][0]
+            assert point_at_time == positive_constraint.point
+            assert is_valid_path(sipp_path, env, [])
+
+    def test_fewer_expansions(self):
+        # a long corridor blocked until late, the agent has to wait
+        space_limits = [30, 3]
+        static_obstacles = [Point2D(x, y) for x in range(30) for y in [0, 2]]
+        start_point = Point2D(0, 1)
+        goal_point = Point2D(29, 1)
+        env = Environment(
+            dimension=2,
+            space_limit=space_limits,
+            static_obstacles=static_obstacles,
+            dynamic_obstacles=[(Point2D(15, 1), [0, 100])],
+        )
+
+        space_time_astar = SpaceTimeAstar(start_point, goal_point, env)
+        sipp = SafeIntervalPathPlanning(start_point, goal_point, env)
+        path = space_time_astar.plan()
+        sipp_path = sipp.plan()
+
+        assert len(sipp_path) == len(path)
+        assert sipp.num_of_expansions * 10 < space_time_astar.num_of_expansions
+
+    def test_as_cbs_planner(self):
+        space_limits = [8, 8]
+        start_points = [Point2D(0, 3), Point2D(7, 3), Point2D(3, 0), Point2D(3, 7)]
+        goal_points = [Point2D(7, 3), Point2D(0, 3), Point2D(3, 7), Point2D(3, 0)]
+        env = Environment(dimension=2, space_limit=space_limits)
+
+        solution = ConflictBasedSearch(start_points, goal_points, env).plan()
+        sipp_solution = ConflictBasedSearch(
+            start_points, goal_points, env, planner_class=SafeIntervalPathPlanning
+        ).plan()
+
+        assert sum(len(path) for path in sipp_solution) == sum(len(path) for path in solution)
@@ -7,6 +7,9 @@ import pytest
 
 from multi_agent_path_finding.common import Environment
 from multi_agent_path_finding.common import Point2D, Point3D
+from multi_agent_path_finding.common.constraint import VertexConstraint
+from multi_agent_path_finding.common.heuristic import TrueDistanceHeuristic
+from multi_agent_path_finding.common.plan_status import PlanStatus
 from multi_agent_path_finding.stastar import SpaceTimeAstar
 
 
@@ -56,7 +59,14 @@ class TestSpaceTimeAstar:
                 *[random.randint(0, space_limits[i] - 1) for i in range(dimension)]
             )
 
-            static_obstacles = start_point.get_neighbor_points()
+            # the neighbor points include the start point itself, which stays free
+            static_obstacles = [
+                point for point in start_point.get_neighbor_points() if point != start_point
+            ]
+            while goal_point in static_obstacles:
+                goal_point = Point(
+                    *[random.randint(0, space_limits[i] - 1) for i in range(dimension)]
+                )
             if dimension == 2:
                 dynamic_obstacles = [(Point(*[start_point.x, start_point.y]), [1, -1])]
             else:
@@ -223,3 +233,95 @@ class TestSpaceTimeAstar:
             planner = SpaceTimeAstar(
                 start_point=start_point, goal_point=goal_point, env=env
             )
+
+    def test_goal_blocked_forever(self):
+        space_limits = [30, 30]
+        start_point = Point2D(0, 0)
+        goal_point = Point2D(29, 29)
+        env = Environment(
+            dimension=2,
+            space_limit=space_limits,
+            dynamic_obstacles=[(goal_point, [5, -1])],
+        )
+        planner = SpaceTimeAstar(start_point=start_point, goal_point=goal_point, env=env)
+
+        # the search stops at the safe horizon instead of running forever
+        assert planner.plan() is None
+        assert planner.status == PlanStatus.NO_PATH
+
+    def test_budgets(self):
+        space_limits = [20, 20]
+        start_point = Point2D(0, 0)
+        goal_point = Point2D(19, 19)
+        env = Environment(dimension=2, space_limit=space_limits)
+
+        planner = SpaceTimeAstar(start_point=start_point, goal_point=goal_point, env=env)
+        assert planner.plan() is not None
+        assert planner.status == PlanStatus.SUCCESS
+
+        for budget, status in [
+            (dict(max_expansions=10), PlanStatus.EXPANSIONS_EXHAUSTED),
+            (dict(max_time_step=20), PlanStatus.TIME_STEPS_EXHAUSTED),
+            (dict(deadline=0), PlanStatus.DEADLINE_EXCEEDED),
+        ]:
+            planner = SpaceTimeAstar(
+                start_point=start_point, goal_point=goal_point, env=env, **budget
+            )
+            assert planner.plan() is None
+            assert planner.status == status
+
+    def test_spatial_search_after_last_event(self):
+        space_limits = [30, 30]
+        # a wall with a single gap at the bottom
+        static_obstacles = [Point2D(15, y) for y in range(1, 30)]
+        start_point = Point2D(0, 29)
+        goal_point = Point2D(29, 29)
+        env = Environment(dimension=2, space_limit=space_limits, static_obstacles=static_obstacles)
+
+        # nothing changes over time, every cell is expanded at most once
+        planner = SpaceTimeAstar(start_point=start_point, goal_point=goal_point, env=env)
+        assert len(planner.plan()) == 29 + 29 + 29 + 1
+        assert planner.num_of_expansions <= env.num_of_free_cells
+
+        # with exact distances the search ends once the dynamic obstacle is gone
+        env = Environment(
+            dimension=2,
+            space_limit=space_limits,
+            static_obstacles=static_obstacles,
+            dynamic_obstacles=[(Point2D(0, 28), [0, 10])],
+        )
+        heuristic = TrueDistanceHeuristic(env, [goal_point])
+        planner = SpaceTimeAstar(
+            start_point=start_point,
+            goal_point=goal_point,
+            env=env,
+            distance_map=heuristic.get_distance_map(goal_point),
+        )
+        path = planner.plan()
+        assert len(path) == 29 + 29 + 29 + 1
+        assert planner.num_of_expansions <= 11
+
+    def test_constraint_at_goal_after_arrival(self):
+        space_limits = [10, 10]
+        start_point = Point2D(0, 0)
+        goal_point = Point2D(3, 0)
+        env = Environment(dimension=2, space_limit=space_limits)
+        planner = SpaceTimeAstar(start_point=start_point, goal_point=goal_point, env=env)
+        constraints = [VertexConstraint(agent_id=0, time=6, point=goal_point)]
+
+        # the agent may not stay at the goal from its arrival at time 3
+        path = planner.plan(constraints)
+        assert path[-1] == (goal_point, 7)
+        assert (goal_point, 6) not in path
+
+    def test_goal_in_other_component(self):
+        space_limits = [20, 20]
+        static_obstacles = [Point2D(10, y) for y in range(20)]
+        env = Environment(dimension=2, space_limit=space_limits, static_obstacles=static_obstacles)
+        planner = SpaceTimeAstar(start_point=Point2D(0, 0), goal_point=Point2D(19, 19), env=env)
+
+        # rejected before a single expansion
+        assert planner.plan() is None
+        assert planner.status == PlanStatus.NO_PATH
+        assert planner.num_of_expansions == 0
+
@@ -7,6 +7,7 @@ import pytest
 
 from multi_agent_path_finding.common import Environment
 from multi_agent_path_finding.common import Point2D, Point3D
+from multi_agent_path_finding.common.plan_status import PlanStatus
 from multi_agent_path_finding.stastar_epsilon.stastar_epsilon import (
     SpaceTimeAstarEpsilon,
 )
@@ -57,7 +58,14 @@ class TestSpaceTimeAstarEpsilon:
                 *[random.randint(0, space_limits[i] - 1) for i in range(dimension)]
             )
 
-            static_obstacles = start_point.get_neighbor_points()
+            # the neighbor points include the start point itself, which stays free
+            static_obstacles = [
+                point for point in start_point.get_neighbor_points() if point != start_point
+            ]
+            while goal_point in static_obstacles:
+                goal_point = Point(
+                    *[random.randint(0, space_limits[i] - 1) for i in range(dimension)]
+                )
             if dimension == 2:
                 dynamic_obstacles = [(Point(*[start_point.x, start_point.y]), [1, -1])]
             else:
@@ -231,3 +239,60 @@ class TestSpaceTimeAstarEpsilon:
             planner = SpaceTimeAstarEpsilon(
                 start_point=start_point, goal_point=goal_point, env=env, w=w
             )
+
+    def test_goal_blocked_forever(self):
+        space_limits = [30, 30]
+        start_point = Point2D(0, 0)
+        goal_point = Point2D(29, 29)
+        env = Environment(
+            dimension=2,
+            space_limit=space_limits,
+            dynamic_obstacles=[(goal_point, [5, -1])],
+        )
+        planner = SpaceTimeAstarEpsilon(start_point=start_point, goal_point=goal_point, env=env, w=1.5)
+
+        # the search stops at the safe horizon instead of running forever
+        assert planner.plan() is None
+        assert planner.status == PlanStatus.NO_PATH
+
+    def test_budgets(self):
+        space_limits = [20, 20]
+        start_point = Point2D(0, 0)
+        goal_point = Point2D(19, 19)
+        env = Environment(dimension=2, space_limit=space_limits)
+
+        planner = SpaceTimeAstarEpsilon(start_point=start_point, goal_point=goal_point, env=env, w=1.5)
+        assert planner.plan() is not None
+        assert planner.status == PlanStatus.SUCCESS
+
+        for budget, status in [
+            (dict(max_expansions=10), PlanStatus.EXPANSIONS_EXHAUSTED),
+            (dict(max_time_step=20), PlanStatus.TIME_STEPS_EXHAUSTED),
+            (dict(deadline=0), PlanStatus.DEADLINE_EXCEEDED),
+        ]:
+            planner = SpaceTimeAstarEpsilon(
+                start_point=start_point, goal_point=goal_point, env=env, w=1.5, **budget
+            )
+            assert planner.plan() is None
+            assert planner.status == status
+
+    def test_avoid_reserved_path(self):
+        # another agent holds (2, 0) until time 2, waiting a step before it
+        # is within the suboptimality bound and free of conflicts
+        env = Environment(dimension=2, space_limit=[5, 2])
+        reserved_path = [
+            (Point2D(2, 0), 0),
+            (Point2D(2, 0), 1),
+            (Point2D(2, 0), 2),
+            (Point2D(2, 1), 3),
+        ]
+        env.reservation_table = [reserved_path]
+        planner = SpaceTimeAstarEpsilon(
+            start_point=Point2D(0, 0), goal_point=Point2D(4, 0), env=env, w=1.5
+        )
+        path, f_min = planner.plan()
+
+        assert f_min == 4
+        assert len(path) - 1 <= 1.5 * f_min
+        assert path[-1][0] == Point2D(4, 0)
+        assert not set(path) & set(reserved_path)
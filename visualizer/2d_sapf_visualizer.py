@@ -3,6 +3,8 @@ import matplotlib.pyplot as plt
 import yaml
 import numpy as np
 
+from multi_agent_path_finding.common.search_trace import EXPAND, SearchTrace
+
 
 def animate(input_data, path_data, interp_steps=10):
     # Calculate interpolated coordinates for smoother transitions
@@ -111,16 +113,89 @@ def animate(input_data, path_data, interp_steps=10):
     plt.show()
 
 
+def animate_trace(input_data, trace: SearchTrace, interval=100):
+    # replay a recorded search as the space-time tree it grew, one expansion per frame
+    events = list(trace.events())
+    frames = [[]]
+    for event in events:
+        if event[0] == EXPAND:
+            frames.append([])
+        frames[-1].append(event)
+    time_limit = max([10] + [time for _, _, time, _, _ in events])
+
+    fig = plt.figure()
+    ax = fig.add_subplot(111, projection="3d")
+    open_nodes = set()
+    closed_nodes = set()
+    edges = []
+
+    def draw(i):
+        for event, point, time, parent_point, parent_time in frames[i]:
+            node = (*point[:2], time)
+            if event == EXPAND:
+                open_nodes.discard(node)
+                closed_nodes.add(node)
+            else:
+                open_nodes.add(node)
+                if parent_point is not None:
+                    edges.append((node, (*parent_point[:2], parent_time)))
+
+        ax.clear()
+        for time in range(time_limit):
+            ax.scatter(
+                [obstacle[0] for obstacle in input_data["static_obstacles"]],
+                [obstacle[1] for obstacle in input_data["static_obstacles"]],
+                [time for _ in input_data["static_obstacles"]],
+                c="black",
+                marker="x",
+            )
+        for nodes, color, marker, label in [
+            (open_nodes, "b", "x", "Open Set"),
+            (closed_nodes, "r", "o", "Closed Set"),
+        ]:
+            ax.scatter(
+                [node[0] for node in nodes],
+                [node[1] for node in nodes],
+                [node[2] for node in nodes],
+                c=color,
+                marker=marker,
+                label=label,
+            )
+        for node, parent_node in edges:
+            ax.plot(*zip(node, parent_node), c="y")
+        ax.scatter(*input_data["start_point"][:2], 0, c="g", marker="^", label="Start Point")
+        ax.scatter(*input_data["goal_point"][:2], 0, c="r", marker="^", label="Goal Point")
+
+        ax.set_xlabel("X")
+        ax.set_ylabel("Y")
+        ax.set_zlabel("T")
+        ax.set_xlim([0, trace.space_limit[0]])
+        ax.set_ylim([0, trace.space_limit[1]])
+        ax.set_zlim([0, time_limit])
+        ax.set_title(f"Expansion {i}")
+        ax.legend()
+
+    anim = animation.FuncAnimation(
+        fig, draw, frames=len(frames), interval=interval, repeat=False
+    )
+    plt.show()
+
+
 if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser()
     parser.add_argument("--input", "-i", type=str, help="Input file path")
     parser.add_argument("--output", "-o", type=str, help="Output file path")
+    parser.add_argument("--trace", "-t", type=str, help="Search trace file path")
     args = parser.parse_args()
     with open(args.input, "r") as stream:
         input_data = yaml.load(stream, Loader=yaml.FullLoader)
 
+    if args.trace is not None:
+        animate_trace(input_data, SearchTrace.load(args.trace))
+        raise SystemExit
+
     with open(args.output, "r") as stream:
         path_data = yaml.load(stream, Loader=yaml.FullLoader)
 